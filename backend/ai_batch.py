@@ -0,0 +1,89 @@
+import argparse
+import http.client
+import json
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+
+
+def read_questions(path: str):
+    """每行一个问题；忽略空行与以 # 开头的注释行。"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+def _remote(url: str, payload, timeout: float):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    try:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        conn.request('POST', '/api/ai_ask/batch', body=body, headers={'Content-Type': 'application/json'})
+        resp = conn.getresponse()
+        if resp.status != 200:
+            raise SystemExit(f'批量问答失败: {resp.status} {resp.read().decode("utf-8", "replace")}')
+        while True:
+            line = resp.readline()
+            if not line:
+                break
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量问答：读取问题文件，并发调用大模型，按完成顺序输出 JSONL')
+    parser.add_argument('questions', help='问题文件（每行一个问题），如 ../docs/questions.txt')
+    parser.add_argument('--url', help='服务地址（调用其 /api/ai_ask/batch）；缺省时在本进程内执行')
+    parser.add_argument('--concurrency', type=int, default=16, help='同时进行的大模型调用数')
+    parser.add_argument('--rate', type=float, default=0.0, help='每秒最多发起的大模型调用数，0 表示不限')
+    parser.add_argument('--timeout', type=float, default=3600.0)
+    parser.add_argument('--mock-latency', type=float,
+                        help='本进程模式下启动模拟大模型并使用该响应延迟（秒），用于演练与压测')
+    parser.add_argument('--out', help='结果输出文件（JSONL），缺省输出到标准输出')
+    args = parser.parse_args(argv)
+
+    questions = read_questions(args.questions)
+    if not questions:
+        raise SystemExit('问题文件为空')
+
+    mock = None
+    if args.url:
+        results = _remote(args.url.rstrip('/'),
+                          {'questions': questions, 'concurrency': args.concurrency, 'rate': args.rate}, args.timeout)
+    else:
+        if args.mock_latency is not None:
+            from mock_llm import MockLLMServer
+            mock = MockLLMServer(latency=args.mock_latency).start()
+            os.environ['LLM_BASE_URL'] = mock.base_url
+            os.environ['LLM_API_KEY'] = 'mock'
+        from routes_ai import answer_batch
+        results = answer_batch(questions, args.concurrency, args.rate)
+
+    out = open(args.out, 'w', encoding='utf-8') if args.out else sys.stdout
+    started = time.perf_counter()
+    done = 0
+    try:
+        for item in results:
+            if item.get('done'):
+                print(f"完成 {item['total']} 个问题（去重后 {item['unique']} 个），失败 {item['errors']} 个，"
+                      f"耗时 {item['elapsedSeconds']} 秒", file=sys.stderr)
+                continue
+            done += 1
+            out.write(json.dumps(item, ensure_ascii=False) + '\n')
+            out.flush()
+            if 'error' in item:
+                print(f"[{done}/{len(questions)}] 失败：{item['question']}：{item['error']}", file=sys.stderr)
+            elif done % 50 == 0 or done == len(questions):
+                print(f"[{done}/{len(questions)}] {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if mock is not None:
+            mock.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
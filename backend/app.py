@@ -3,16 +3,24 @@ from flask import Flask
 from routes_basic import bp as basic_bp
 from routes_analysis import bp as analysis_bp
 from routes_ai import bp as ai_bp
+from metrics import init_app as init_metrics
 
 # ============ Flask 应用初始化 ============
 app = Flask(__name__)
+# 请求计时与 /metrics（Prometheus 文本格式）
+init_metrics(app)
+
+CORS_HEADERS = (
+    ('Access-Control-Allow-Origin', '*'),
+    ('Access-Control-Allow-Headers', 'Content-Type,Authorization'),
+    ('Access-Control-Allow-Methods', 'GET,POST,PUT,DELETE,OPTIONS'),
+)
 
 
 @app.after_request
 def _add_cors_headers(response):
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-    response.headers.add('Access-Control-Allow-Methods', 'GET,POST,PUT,DELETE,OPTIONS')
+    for name, value in CORS_HEADERS:
+        response.headers.add(name, value)
     return response
 
 
@@ -0,0 +1,212 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from app import CORS_HEADERS, app as flask_app
+from metrics import HTTP_DURATION, HTTP_EXCEPTIONS, HTTP_IN_FLIGHT, HTTP_REQUESTS
+from neo4j_ops import close_async_driver
+from routes_ai import answer_batch_async, answer_question_async, close_async_client, parse_batch_request
+
+# 转交给 Flask 的同步路由在此线程池中执行；AI 问答等原生异步路由不占用其中的线程
+ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '32'))
+
+_executor = ThreadPoolExecutor(max_workers=ASGI_WSGI_THREADS, thread_name_prefix='wsgi')
+_CORS = [(k.encode('latin1'), v.encode('latin1')) for k, v in CORS_HEADERS]
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def _send(send, status, headers, body):
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())] + _CORS
+    await _send(send, status, headers, body)
+
+
+# ============ 原生异步路由 ============
+
+async def ai_ask(scope, receive, send):
+    body = await _read_body(receive)
+    try:
+        data = json.loads(body) if body else {}
+    except ValueError:
+        await _send_json(send, 400, {'error': '请求体不是合法的 JSON'})
+        return 400
+    user_question = (data if isinstance(data, dict) else {}).get('question', '你是谁？')
+    try:
+        result = await answer_question_async(user_question)
+    except Exception as e:
+        await _send_json(send, 500, {'error': str(e)})
+        return 500
+    await _send_json(send, 200, result)
+    return 200
+
+
+async def ai_ask_batch(scope, receive, send):
+    body = await _read_body(receive)
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        data = None
+    questions, concurrency, rate, error = parse_batch_request(data)
+    if error:
+        await _send_json(send, 400, {'error': error})
+        return 400
+    # NDJSON 流：每完成一个问题发送一行，最后一行为汇总
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'application/x-ndjson')] + _CORS})
+    results = answer_batch_async(questions, concurrency, rate)
+    try:
+        async for item in results:
+            line = (json.dumps(item, ensure_ascii=False) + '\n').encode('utf-8')
+            await send({'type': 'http.response.body', 'body': line, 'more_body': True})
+    finally:
+        await results.aclose()
+    await send({'type': 'http.response.body', 'body': b''})
+    return 200
+
+
+# (方法, 路径) -> 处理函数；未列出的请求（含 CORS 预检）一律交给 Flask
+ASYNC_ROUTES = {
+    ('POST', '/api/ai_ask'): ai_ask,
+    ('POST', '/api/ai_ask/batch'): ai_ask_batch,
+}
+
+
+async def _native(handler, scope, receive, send):
+    route, method = scope['path'], scope['method']
+    HTTP_IN_FLIGHT.inc(route)
+    start = time.perf_counter()
+    status = 500
+    try:
+        status = await handler(scope, receive, send)
+    except Exception:
+        HTTP_EXCEPTIONS.inc(route)
+        raise
+    finally:
+        HTTP_IN_FLIGHT.dec(route)
+        HTTP_DURATION.observe(time.perf_counter() - start, route, method)
+        HTTP_REQUESTS.inc(route, method, str(status))
+
+
+# ============ 同步路由：转交 Flask（WSGI） ============
+
+def _environ(scope, body: bytes):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': str(client[0]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        key = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if key == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif key != 'CONTENT_LENGTH':
+            key = 'HTTP_' + key
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def _call_wsgi(environ):
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+
+    chunks = flask_app(environ, start_response)
+    try:
+        body = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    return response['status'], response['headers'], body
+
+
+async def _wsgi(scope, receive, send):
+    body = await _read_body(receive)
+    loop = asyncio.get_running_loop()
+    status, headers, payload = await loop.run_in_executor(_executor, _call_wsgi, _environ(scope, body))
+    await _send(send, status, [(k.lower().encode('latin1'), v.encode('latin1')) for k, v in headers], payload)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_async_client()
+            await close_async_driver()
+            _executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI 入口：AI 问答在事件循环中异步处理，其余路由转交线程池中的 Flask 应用。
+
+    单个 worker 可同时挂起大量等待大模型响应的请求，而不会占满处理普通路由的线程。
+    """
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    handler = ASYNC_ROUTES.get((scope['method'], scope['path']))
+    if handler is not None:
+        await _native(handler, scope, receive, send)
+    else:
+        await _wsgi(scope, receive, send)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='以 ASGI 模式启动服务（AI 路由异步处理）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit('ASGI 模式需要 uvicorn：pip install uvicorn（也可使用任意 ASGI 服务器加载 asgi:app）')
+    uvicorn.run('asgi:app', host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
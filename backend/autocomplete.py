@@ -0,0 +1,236 @@
+import bisect
+import heapq
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from neo4j_ops import add_graph_listener, get_graph_version
+from graph_cache import get_snapshot
+
+# 预先维护 top-k 列表的最长前缀长度与 k；更长的前缀或更大的 limit 走有序数组区间扫描
+AUTOCOMPLETE_PREFIX_LEN = int(os.getenv('AUTOCOMPLETE_PREFIX_LEN', '4'))
+AUTOCOMPLETE_TOP_K = int(os.getenv('AUTOCOMPLETE_TOP_K', '10'))
+# 每个前缀列表在 k 之外多保留的条目数，删除或度数变化时不必每次都重新扫描区间
+AUTOCOMPLETE_SLACK = int(os.getenv('AUTOCOMPLETE_SLACK', '10'))
+
+
+def _prefix_end(prefix: str) -> Optional[str]:
+    """以 prefix 开头的字符串都小于返回值（末字符加一）；末字符已是最大码位时返回 None（没有上界）。"""
+    for i in range(len(prefix) - 1, -1, -1):
+        if ord(prefix[i]) < 0x10FFFF:
+            return prefix[:i] + chr(ord(prefix[i]) + 1)
+    return None
+
+
+class AutocompleteIndex:
+    """人物姓名前缀补全索引。
+
+    - `_sorted`：按小写姓名排序的 (name, id) 数组，任意前缀对应其中一段连续区间；
+    - `_top`：长度不超过 AUTOCOMPLETE_PREFIX_LEN 的每个前缀 -> 按度数降序的前 k + slack 个 (−度, 姓名, id)，
+      常见的逐字输入直接查字典返回；列表总是该前缀区间内最靠前的若干条，
+      `_truncated` 记录区间内还有更多条目的前缀；截断的列表少于 k 条时记入 `_stale`，下次查询时才重新扫描；
+    - 通过 neo4j_ops 的写操作监听器对人物增删、改名以及关系增删引起的度数变化做增量维护。
+    """
+
+    def __init__(self, prefix_len: int = AUTOCOMPLETE_PREFIX_LEN, top_k: int = AUTOCOMPLETE_TOP_K,
+                 slack: int = AUTOCOMPLETE_SLACK):
+        self.prefix_len = prefix_len
+        self.top_k = top_k
+        self.capacity = top_k + max(0, slack)
+        self._lock = threading.RLock()
+        self.version = -1
+        self.dirty = True
+        self._entries = {}       # id -> (姓名, 度)
+        self._sorted = []        # [(小写姓名, id)]
+        self._top = {}           # 前缀 -> [(−度, 姓名, id)]
+        self._truncated = set()  # 区间内条目多于列表的前缀
+        self._stale = set()      # 截断且已不足 k 条、待查询时重新扫描的前缀
+        self._rel_ends = {}      # 关系 id -> (source, target)
+        self._node_rels = {}     # 人物 id -> 相连关系 id 集合
+        self._degree = Counter()
+
+    # ---------- 构建 ----------
+
+    def rebuild(self, snapshot) -> None:
+        with self._lock:
+            self._rel_ends = {}
+            self._node_rels = {}
+            self._degree = Counter()
+            for s, t, _, rel_id in snapshot.edges:
+                sid, tid = snapshot.ids[s], snapshot.ids[t]
+                self._add_rel(rel_id, sid, tid)
+                self._degree[sid] += 1
+                self._degree[tid] += 1
+            self._entries = {}
+            for nid, name in zip(snapshot.ids, snapshot.names):
+                if name:
+                    self._entries[nid] = (name, self._degree[nid])
+            self._sorted = sorted((name.lower(), nid) for nid, (name, _) in self._entries.items())
+            top = {}
+            for nid, (name, deg) in self._entries.items():
+                item = (-deg, name, nid)
+                for p in self._prefixes(name):
+                    top.setdefault(p, []).append(item)
+            self._top = {}
+            self._truncated = set()
+            self._stale = set()
+            for p, items in top.items():
+                self._fill(p, heapq.nsmallest(self.capacity + 1, items))
+            self.version = snapshot.version
+            self.dirty = False
+
+    def _prefixes(self, name: str):
+        key = name.lower()
+        return [key[:i] for i in range(1, min(len(key), self.prefix_len) + 1)]
+
+    # ---------- 增量维护 ----------
+
+    def _fill(self, p: str, items: List[tuple]) -> None:
+        """items 为区间内最靠前的至多 capacity + 1 条，多出的一条只用来判断是否截断。"""
+        self._stale.discard(p)
+        if len(items) > self.capacity:
+            self._truncated.add(p)
+            del items[self.capacity:]
+        else:
+            self._truncated.discard(p)
+        if items:
+            self._top[p] = items
+        else:
+            self._top.pop(p, None)
+
+    def _insert(self, nid, name: str, deg: int) -> None:
+        self._entries[nid] = (name, deg)
+        bisect.insort(self._sorted, (name.lower(), nid))
+        item = (-deg, name, nid)
+        for p in self._prefixes(name):
+            lst = self._top.setdefault(p, [])
+            if p not in self._truncated or (lst and item < lst[-1]):
+                bisect.insort(lst, item)
+                if len(lst) > self.capacity:
+                    lst.pop()
+                    self._truncated.add(p)
+            # 截断列表之外的条目无需记录：列表仍是区间内最靠前的若干条
+            elif not lst:
+                del self._top[p]
+
+    def _delete(self, nid) -> None:
+        entry = self._entries.pop(nid, None)
+        if entry is None:
+            return
+        name, deg = entry
+        key = (name.lower(), nid)
+        i = bisect.bisect_left(self._sorted, key)
+        if i < len(self._sorted) and self._sorted[i] == key:
+            self._sorted.pop(i)
+        item = (-deg, name, nid)
+        for p in self._prefixes(name):
+            lst = self._top.get(p)
+            if not lst or item not in lst:
+                continue
+            lst.remove(item)
+            if p in self._truncated:
+                # 多保留的条目用完后才需要补位，推迟到查询该前缀时再扫描
+                if len(lst) < self.top_k:
+                    self._stale.add(p)
+            elif not lst:
+                del self._top[p]
+
+    def _add_rel(self, rel_id, s, t) -> None:
+        self._rel_ends[rel_id] = (s, t)
+        self._node_rels.setdefault(s, set()).add(rel_id)
+        self._node_rels.setdefault(t, set()).add(rel_id)
+
+    def _drop_rel(self, rel_id):
+        ends = self._rel_ends.pop(rel_id, None)
+        if ends is not None:
+            for nid in ends:
+                rels = self._node_rels.get(nid)
+                if rels is not None:
+                    rels.discard(rel_id)
+        return ends
+
+    def _set_degree(self, nid, delta: int) -> None:
+        self._degree[nid] += delta
+        entry = self._entries.get(nid)
+        if entry is None:
+            return
+        self._delete(nid)
+        self._insert(nid, entry[0], self._degree[nid])
+
+    def on_graph_change(self, version: int, event: Optional[str], payload: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            if self.dirty:
+                return
+            if event == 'person_upsert' and payload and payload.get('id') is not None:
+                nid = payload['id']
+                self._delete(nid)
+                if payload.get('name'):
+                    self._insert(nid, payload['name'], self._degree[nid])
+            elif event == 'person_delete' and payload:
+                nid = payload.get('id')
+                self._delete(nid)
+                # DETACH DELETE 同时删除了相连关系，需同步邻居的度数
+                for rel_id in list(self._node_rels.get(nid, ())):
+                    s, t = self._drop_rel(rel_id)
+                    other = t if s == nid else s
+                    if other != nid:
+                        self._set_degree(other, -1)
+                self._node_rels.pop(nid, None)
+                self._degree.pop(nid, None)
+            elif event == 'relationship_add' and payload:
+                # MERGE 可能返回已存在的关系，此时度数不变
+                if payload.get('id') not in self._rel_ends:
+                    self._add_rel(payload.get('id'), payload.get('source'), payload.get('target'))
+                    self._set_degree(payload.get('source'), 1)
+                    self._set_degree(payload.get('target'), 1)
+            elif event == 'relationship_delete' and payload:
+                ends = self._drop_rel(payload.get('id'))
+                if ends is not None:
+                    self._set_degree(ends[0], -1)
+                    self._set_degree(ends[1], -1)
+            else:
+                self.dirty = True
+                return
+            self.version = version
+
+    # ---------- 查询 ----------
+
+    def _scan(self, prefix: str, limit: int) -> List[tuple]:
+        lo = bisect.bisect_left(self._sorted, (prefix,))
+        end = _prefix_end(prefix)
+        hi = len(self._sorted) if end is None else bisect.bisect_left(self._sorted, (end,))
+        items = []
+        for _, nid in self._sorted[lo:hi]:
+            name, deg = self._entries[nid]
+            items.append((-deg, name, nid))
+        return heapq.nsmallest(limit, items)
+
+    def complete(self, prefix: str, limit: int = AUTOCOMPLETE_TOP_K) -> List[Dict[str, Any]]:
+        key = prefix.lower()
+        if not key:
+            return []
+        with self._lock:
+            if len(key) <= self.prefix_len and limit <= self.top_k:
+                if key in self._stale:
+                    self._fill(key, self._scan(key, self.capacity + 1))
+                items = self._top.get(key, ())[:limit]
+            else:
+                items = self._scan(key, limit)
+            return [{'id': nid, 'name': name, 'degree': -neg} for neg, name, nid in items]
+
+
+_autocomplete_index = AutocompleteIndex()
+add_graph_listener(_autocomplete_index.on_graph_change)
+_autocomplete_lock = threading.Lock()
+
+
+def get_autocomplete_index() -> AutocompleteIndex:
+    """返回与当前图版本一致的补全索引；需要时从快照全量重建。"""
+    index = _autocomplete_index
+    if not index.dirty and index.version == get_graph_version():
+        return index
+    with _autocomplete_lock:
+        if index.dirty or index.version != get_graph_version():
+            index.rebuild(get_snapshot())
+    return index
@@ -0,0 +1,430 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from data_loader import EXPORT_DIR
+
+# 基准结果历史（每次运行追加一行 JSON），用于跨提交比较
+HISTORY_PATH = os.path.join(EXPORT_DIR, 'benchmarks', 'history.jsonl')
+DEFAULT_SIZES = (1000, 10000, 100000)
+FULL_SIZES = (1000, 10000, 100000, 1000000)
+# 比历史基线慢超过该比例、且绝对差超过噪声下限时判为性能回退
+REGRESSION_THRESHOLD = 0.25
+NOISE_FLOOR = 0.005
+QUERY_COUNT = 100
+
+
+class Case:
+    """一个基准用例：fn(ctx) 执行被测操作，返回值可写回 ctx[provides] 供依赖它（requires）的用例使用。
+
+    max_nodes 限制该用例参与的最大规模（如 networkx 介数中心性为 O(nm)，大图上不可行）；
+    needs_neo4j 表示被测路径仍直接执行 Cypher，只在 Neo4j 后端上运行。
+    """
+
+    def __init__(self, name: str, fn: Callable[[Dict[str, Any]], Any], max_nodes: Optional[int] = None,
+                 provides: Optional[str] = None, requires: tuple = ('snapshot',), needs_neo4j: bool = False):
+        self.name = name
+        self.fn = fn
+        self.max_nodes = max_nodes
+        self.provides = provides
+        self.requires = requires
+        self.needs_neo4j = needs_neo4j
+
+
+def _random_pairs(ctx, count):
+    rng = ctx['rng']
+    n = len(ctx['snapshot'])
+    return [(rng.randrange(n), rng.randrange(n)) for _ in range(count)]
+
+
+def _random_nodes(ctx, count):
+    rng = ctx['rng']
+    n = len(ctx['snapshot'])
+    return [rng.randrange(n) for _ in range(count)]
+
+
+# ---------- 算法层用例 ----------
+
+def _import(ctx):
+    ctx['store'].replace_graph(ctx['persons'], ctx['relations'])
+    return True
+
+
+def _snapshot(ctx):
+    from graph_cache import get_snapshot
+    return get_snapshot(force=True)
+
+
+def _paths_batch(ctx):
+    from graph_paths import batch_shortest_paths
+    batch_shortest_paths(ctx['snapshot'].adj, _random_pairs(ctx, QUERY_COUNT))
+
+
+def _paths_bidirectional(ctx):
+    from graph_paths import bidirectional_bfs
+    adj = ctx['snapshot'].adj
+    for s, t in _random_pairs(ctx, QUERY_COUNT):
+        bidirectional_bfs(adj, s, t)
+
+
+def _oracle_build(ctx):
+    from graph_oracle import DistanceOracle
+    return DistanceOracle(ctx['snapshot'])
+
+
+def _oracle_query(ctx):
+    oracle = ctx['oracle']
+    for s, t in _random_pairs(ctx, QUERY_COUNT * 10):
+        oracle.bounds(s, t)
+
+
+def _recommend_build(ctx):
+    from graph_recommend import Recommender
+    return Recommender(ctx['snapshot'])
+
+
+def _recommend_query(ctx):
+    rec = ctx['recommender']
+    for idx in _random_nodes(ctx, QUERY_COUNT):
+        rec.recommend(idx, metric='adamic_adar')
+
+
+def _recommend_precompute(ctx):
+    ctx['recommender'].precompute(10)
+
+
+def _similarity_build(ctx):
+    from graph_similarity import SimilarityIndex
+    return SimilarityIndex(ctx['snapshot'])
+
+
+def _similarity_query(ctx):
+    index = ctx['similarity']
+    for idx in _random_nodes(ctx, QUERY_COUNT):
+        index.top_k(idx, 10)
+
+
+def _bridges(ctx):
+    from graph_bridges import Biconnectivity
+    Biconnectivity(ctx['snapshot'])
+
+
+def _cycles(ctx):
+    from graph_cycles import CycleSearch
+    for i, _ in enumerate(CycleSearch(ctx['snapshot'].adj, 3, 5, time_budget=5.0)):
+        if i >= 1000:
+            break
+
+
+def _motifs(ctx):
+    from graph_motifs import MotifCensus
+    MotifCensus(ctx['snapshot'])
+
+
+def _search_build(ctx):
+    from search_index import SearchIndex
+    index = SearchIndex()
+    index.rebuild(ctx['snapshot'])
+    return index
+
+
+def _search_query(ctx):
+    index = ctx['search']
+    names = ctx['snapshot'].names
+    for idx in _random_nodes(ctx, QUERY_COUNT):
+        index.search(names[idx][1:3] or names[idx], field='all')
+
+
+def _autocomplete_build(ctx):
+    from autocomplete import AutocompleteIndex
+    index = AutocompleteIndex()
+    index.rebuild(ctx['snapshot'])
+    return index
+
+
+def _autocomplete_query(ctx):
+    index = ctx['autocomplete']
+    names = ctx['snapshot'].names
+    for idx in _random_nodes(ctx, QUERY_COUNT):
+        index.complete(names[idx][:2])
+
+
+def _centrality(ctx):
+    from graph_proc import GraphProcessor
+    gp = GraphProcessor()
+    data = gp.fetch_nodes_and_rels()
+    gp.compute_centrality(gp.to_networkx(data['nodes'], data['relationships']))
+
+
+def _embed(ctx):
+    from embed_pipeline import build_node_embeddings
+    from graph_proc import GraphProcessor
+    gp = GraphProcessor()
+    build_node_embeddings(gp, gp.fetch_nodes_and_rels()['nodes'], resume=False)
+
+
+# ---------- 接口层用例（Flask 测试客户端，缓存预热后计时） ----------
+
+def _api_case(path_fn):
+    def run(ctx):
+        client = ctx['client']
+        for path in path_fn(ctx):
+            resp = client.get(path)
+            if resp.status_code >= 400:
+                raise RuntimeError(f'{path} -> {resp.status_code}: {resp.get_data(as_text=True)[:200]}')
+    return run
+
+
+def _names_of(ctx, count):
+    names = ctx['snapshot'].names
+    return [names[i] for i in _random_nodes(ctx, count)]
+
+
+def _ids_of(ctx, count):
+    ids = ctx['snapshot'].ids
+    return [ids[i] for i in _random_nodes(ctx, count)]
+
+
+_API_CASES = [
+    ('api.path', lambda ctx: [f'/api/network/path?start={a}&end={b}'
+                              for a, b in zip(_names_of(ctx, 20), _names_of(ctx, 20))], None, False),
+    ('api.distance', lambda ctx: [f'/api/network/distance?start={a}&end={b}'
+                                  for a, b in zip(_names_of(ctx, 20), _names_of(ctx, 20))], None, False),
+    ('api.search', lambda ctx: [f'/api/search?keyword={n[:2]}&field=all' for n in _names_of(ctx, 20)], None, False),
+    ('api.autocomplete', lambda ctx: [f'/api/autocomplete?prefix={n[:1]}' for n in _names_of(ctx, 20)], None, False),
+    ('api.recommend', lambda ctx: [f'/api/network/recommend?id={i}' for i in _ids_of(ctx, 20)], None, False),
+    ('api.similarity', lambda ctx: [f'/api/network/similarity?id={i}' for i in _ids_of(ctx, 20)], None, False),
+    ('api.bridges', lambda ctx: ['/api/network/bridges', '/api/network/bridges?kind=articulation'], None, False),
+    ('api.pattern_chain', lambda ctx: ['/api/network/pattern?type=chain'], None, False),
+    ('api.motifs', lambda ctx: ['/api/network/motifs'], None, False),
+    ('api.graph_stats', lambda ctx: ['/api/graph/stats'], None, False),
+    ('api.centrality', lambda ctx: ['/api/network/centrality?metric=degree'], None, True),
+    ('api.communities', lambda ctx: ['/api/network/communities'], 100000, True),
+    ('api.triangles', lambda ctx: ['/api/network/triangles'], None, True),
+    ('api.density', lambda ctx: ['/api/network/density'], None, True),
+]
+
+CASES = [
+    Case('import.replace_graph', _import, provides='imported', requires=()),
+    Case('snapshot.build', _snapshot, provides='snapshot', requires=('imported',)),
+    Case('paths.batch', _paths_batch),
+    Case('paths.bidirectional', _paths_bidirectional),
+    Case('oracle.build', _oracle_build, provides='oracle'),
+    Case('oracle.query', _oracle_query, requires=('oracle',)),
+    Case('recommend.build', _recommend_build, provides='recommender'),
+    Case('recommend.query', _recommend_query, requires=('recommender',)),
+    Case('recommend.precompute', _recommend_precompute, max_nodes=100000, requires=('recommender',)),
+    Case('similarity.build', _similarity_build, provides='similarity'),
+    Case('similarity.query', _similarity_query, requires=('similarity',)),
+    Case('bridges', _bridges),
+    Case('cycles.len5', _cycles),
+    Case('motifs.census', _motifs),
+    Case('search.build', _search_build, provides='search'),
+    Case('search.query', _search_query, requires=('search',)),
+    Case('autocomplete.build', _autocomplete_build, provides='autocomplete'),
+    Case('autocomplete.query', _autocomplete_query, requires=('autocomplete',)),
+    Case('centrality.networkx', _centrality, max_nodes=5000),
+    Case('retrieval.embed', _embed, max_nodes=100000),
+] + [Case(name, _api_case(fn), max_nodes=max_nodes, needs_neo4j=needs_neo4j)
+     for name, fn, max_nodes, needs_neo4j in _API_CASES]
+
+
+def _plan(selected: Optional[List[str]]) -> List[Case]:
+    """按前缀选出用例，并补上它们（传递）依赖的构建类用例，保持 CASES 中的顺序。"""
+    if not selected:
+        return list(CASES)
+    providers = {c.provides: c for c in CASES if c.provides}
+    wanted = set()
+    stack = [c for c in CASES if any(c.name.startswith(prefix) for prefix in selected)]
+    while stack:
+        case = stack.pop()
+        if case.name in wanted:
+            continue
+        wanted.add(case.name)
+        stack.extend(providers[r] for r in case.requires if r in providers)
+    return [c for c in CASES if c.name in wanted]
+
+
+def _time_case(case: Case, ctx: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    timings = []
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = case.fn(ctx)
+        timings.append(time.perf_counter() - start)
+    if case.provides:
+        ctx[case.provides] = value
+    return {'seconds': statistics.median(timings), 'min': min(timings), 'repeat': repeat}
+
+
+def run_size(num_nodes: int, model: str, store_name: str, selected: Optional[List[str]], repeat: Optional[int],
+             seed: int = 42) -> Dict[str, Dict[str, Any]]:
+    from synthetic_data import generate_dataset
+    from graph_store import SQLiteStore, Neo4jStore, set_store
+
+    start = time.perf_counter()
+    data = generate_dataset(num_nodes, model, seed=seed)
+    generated = time.perf_counter() - start
+    id_to_name = {n['id']: n['name'] for n in data['nodes']}
+    persons = [{k: n.get(k) for k in ('name', 'age', 'occupation', 'description')} for n in data['nodes']]
+    relations = [{'source_name': id_to_name[r['source']], 'target_name': id_to_name[r['target']], 'type': r['type']}
+                 for r in data['relationships']]
+
+    store = set_store(SQLiteStore(':memory:') if store_name == 'sqlite' else Neo4jStore())
+    from app import app
+    ctx = {
+        'store': store,
+        'persons': persons,
+        'relations': relations,
+        'rng': random.Random(seed),
+        'client': app.test_client(),
+    }
+    results = {'generate': {'seconds': generated, 'min': generated, 'repeat': 1}}
+    reps = repeat or (3 if num_nodes <= 10000 else 1)
+    for case in _plan(selected):
+        if any(r not in ctx for r in case.requires):
+            results[case.name] = {'skipped': '依赖的构建用例未成功'}
+            _print_row(num_nodes, case.name, results[case.name])
+            continue
+        if case.max_nodes is not None and num_nodes > case.max_nodes:
+            results[case.name] = {'skipped': f'节点数超过 {case.max_nodes}'}
+            _print_row(num_nodes, case.name, results[case.name])
+            continue
+        if case.needs_neo4j and store_name != 'neo4j':
+            results[case.name] = {'skipped': '需要 Neo4j 后端'}
+            _print_row(num_nodes, case.name, results[case.name])
+            continue
+        try:
+            if case.name.startswith('api.'):
+                # 首次请求负责构建各模块缓存，不计入
+                case.fn(ctx)
+            # 导入与构建类用例重复执行也只保留最后一次的结果供后续用例使用
+            results[case.name] = _time_case(case, ctx, 1 if case.name == 'import.replace_graph' else reps)
+        except Exception as e:
+            results[case.name] = {'error': str(e)[:300]}
+        _print_row(num_nodes, case.name, results[case.name])
+    return results
+
+
+def _print_row(num_nodes, name, result):
+    if 'seconds' in result:
+        value = f"{result['seconds'] * 1000:10.1f} ms"
+    else:
+        value = f"  {result.get('skipped') or '失败: ' + result.get('error', '')}"
+    print(f'{num_nodes:>9}  {name:<24}{value}', flush=True)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def load_history(path: str = HISTORY_PATH) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    runs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    runs.append(json.loads(line))
+                except ValueError:
+                    continue
+    return runs
+
+
+def find_regressions(run: Dict[str, Any], history: List[Dict[str, Any]], window: int = 5,
+                     threshold: float = REGRESSION_THRESHOLD) -> List[Dict[str, Any]]:
+    """与同一模型/后端最近 window 次运行的中位数比较，返回超过阈值的用例列表。"""
+    comparable = [h for h in history if h.get('model') == run['model'] and h.get('store') == run['store']][-window:]
+    regressions = []
+    for size, cases in run['results'].items():
+        for name, result in cases.items():
+            if 'seconds' not in result:
+                continue
+            past = [h['results'].get(size, {}).get(name, {}).get('seconds') for h in comparable]
+            past = [p for p in past if p is not None]
+            if not past:
+                continue
+            baseline = statistics.median(past)
+            current = result['seconds']
+            if current > baseline * (1 + threshold) and current - baseline > NOISE_FLOOR:
+                regressions.append({
+                    'size': size,
+                    'case': name,
+                    'baseline': baseline,
+                    'current': current,
+                    'ratio': current / baseline if baseline else None
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='分析/检索/导入路径的基准测试（合成数据集）')
+    parser.add_argument('--sizes', help='逗号分隔的节点规模，默认 1000,10000,100000')
+    parser.add_argument('--full', action='store_true', help='包含 1,000,000 节点规模')
+    parser.add_argument('--model', choices=('er', 'ba', 'community'), default='ba')
+    parser.add_argument('--store', choices=('sqlite', 'neo4j'), default='sqlite',
+                        help='存储后端；neo4j 会清空目标数据库')
+    parser.add_argument('--cases', help='只运行名称以这些前缀开头的用例（逗号分隔）')
+    parser.add_argument('--repeat', type=int, help='每个用例重复次数（取中位数），默认小图 3 次、大图 1 次')
+    parser.add_argument('--window', type=int, default=5, help='回退判定使用的历史运行次数')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument('--history', default=HISTORY_PATH)
+    parser.add_argument('--no-save', action='store_true', help='不把本次结果写入历史')
+    parser.add_argument('--fail-on-regression', action='store_true', help='检测到回退时以非零状态退出')
+    args = parser.parse_args(argv)
+    # 须在导入 neo4j_ops 之前设置，使用嵌入式后端时不尝试连接 Neo4j
+    os.environ['GRAPH_STORE'] = args.store
+
+    if args.sizes:
+        sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    else:
+        sizes = list(FULL_SIZES if args.full else DEFAULT_SIZES)
+    selected = [c.strip() for c in args.cases.split(',')] if args.cases else None
+
+    run = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'model': args.model,
+        'store': args.store,
+        'results': {}
+    }
+    print(f"{'nodes':>9}  {'case':<24}{'median':>13}")
+    for size in sizes:
+        run['results'][str(size)] = run_size(size, args.model, args.store, selected, args.repeat)
+
+    history = load_history(args.history)
+    regressions = find_regressions(run, history, args.window, args.threshold)
+    if regressions:
+        print('\n性能回退：')
+        for r in regressions:
+            print(f"  {r['size']:>9}  {r['case']:<24}{r['baseline'] * 1000:10.1f} ms -> {r['current'] * 1000:.1f} ms"
+                  f"  (x{r['ratio']:.2f})")
+    elif history:
+        print('\n未发现性能回退')
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(args.history), exist_ok=True)
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(dict(run, regressions=regressions), ensure_ascii=False) + '\n')
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,10 @@ import json
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 EXPORT_DIR = os.path.join(os.path.dirname(BASE_DIR), 'export')
+# RAG 重建导出、问答在存储中没有向量时读取的节点向量文件
+EMBEDDINGS_FILE = os.path.join(EXPORT_DIR, 'embeddings.json')
+# 未安装 sentence-transformers 时由 RAG 重建拟合的 TF-IDF 稀疏索引（见 tfidf_index）
+TFIDF_INDEX_FILE = os.path.join(EXPORT_DIR, 'tfidf_index.pkl')
 SAMPLE_DATA_PATH = os.path.join(DATA_DIR, 'qing_history.json')
 
 
@@ -16,6 +20,13 @@ def load_sample_data(dataset):
         'advanced-analysis': os.path.join(DATA_DIR, 'advanced_analysis.json'),
         'water-margin': os.path.join(DATA_DIR, 'water_margin.json')
     }
+    # 'synthetic-<er|ba|community>-<节点数>' 形式的数据集在内存中按需生成，用于压测与基准测试
+    from synthetic_data import parse_dataset_name, generate_dataset
+    synthetic = parse_dataset_name(dataset)
+    if synthetic:
+        model, num_nodes = synthetic
+        return generate_dataset(num_nodes, model)
+
     file_path = dataset_files.get(dataset, SAMPLE_DATA_PATH)
 
     try:
@@ -0,0 +1,263 @@
+"""大图节点向量的分块并行构建。
+
+文本按长度降序切块后交给进程池编码，每完成一块就写入存储并记入检查点；
+中断后再次运行会跳过检查点中文本未变化的节点，从断点继续。
+未安装 sentence-transformers 时改为在全量语料上拟合 TF-IDF 稀疏索引并保存到文件（见 tfidf_index）。
+
+本模块在进程池的子进程中也会被导入，顶层只依赖轻量模块（不连接数据库、不加载模型）。
+进程池以 spawn 方式启动，子进程会重新导入主模块，入口脚本须有 `if __name__ == '__main__'` 保护。
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from data_loader import EMBEDDINGS_FILE, EXPORT_DIR, TFIDF_INDEX_FILE
+
+# 每块的文本数
+EMBED_CHUNK_SIZE = int(os.getenv('EMBED_CHUNK_SIZE', '512'))
+# 编码进程数：0 表示自动（不止一块时用满 CPU，否则在当前进程内编码）
+EMBED_WORKERS = int(os.getenv('EMBED_WORKERS', '0'))
+# 每个编码进程的计算线程数（torch / BLAS）：0 表示按 CPU 数在各进程间平分
+EMBED_THREADS_PER_WORKER = int(os.getenv('EMBED_THREADS_PER_WORKER', '0'))
+EMBED_CHECKPOINT = os.getenv('EMBED_CHECKPOINT') or os.path.join(EXPORT_DIR, 'embeddings.checkpoint.jsonl')
+
+_THREAD_ENV = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+# 子进程内的编码函数，由 _init_worker 设置
+_worker_encode = None
+
+
+def _make_encoder(model_name):
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name)
+    return lambda texts: model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
+
+
+def _init_worker(model_name, threads):
+    # 线程数须在加载 torch 之前设置，否则 OpenMP 线程池已按 CPU 数建好；并关闭分词器自身的多线程
+    for name in _THREAD_ENV:
+        os.environ[name] = str(threads)
+    os.environ['TOKENIZERS_PARALLELISM'] = 'false'
+    global _worker_encode
+    _worker_encode = _make_encoder(model_name)
+    import torch
+    torch.set_num_threads(threads)
+
+
+def _encode_chunk(index, texts):
+    return index, np.asarray(_worker_encode(texts), dtype=np.float32)
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def _corpus_digest(ids, texts) -> str:
+    digest = hashlib.sha1()
+    for nid, t in zip(ids, texts):
+        digest.update(f'{nid}\0{t}\0'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _build_tfidf_index(ids, texts, path, started, progress):
+    """TF-IDF 的词表取决于全部文本，不能分块或续传：整体拟合一次，保存为稀疏索引。"""
+    from tfidf_index import TfidfIndex
+
+    stats = {'nodes': len(ids), 'skipped': 0, 'encoded': len(ids), 'chunksDone': 0, 'chunks': 0,
+             'workers': 1, 'encoder': 'tfidf', 'dims': None, 'nnz': 0}
+    if ids:
+        index = TfidfIndex.fit(ids, texts, fingerprint=_corpus_digest(ids, texts))
+        index.save(path)
+        stats.update(dims=index.dims, nnz=int(index.matrix.nnz))
+    else:
+        # 空图：删除旧索引，避免检索到上一张图的节点
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    if progress is not None:
+        progress({'chunksDone': 0, 'chunks': 0, 'nodesDone': len(ids), 'nodes': len(ids), 'skipped': 0})
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+class _Checkpoint:
+    """JSONL 检查点：首行 {"fingerprint": ...}，其后每行是一块已写入存储的 {"ids": [...], "hashes": [...]}。"""
+
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+
+    def load(self):
+        """返回 id -> 文本哈希；文件不存在、损坏或 fingerprint 不一致时返回空。"""
+        done = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline() or '{}')
+                if header.get('fingerprint') != self.fingerprint:
+                    return {}
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        # 最后一行可能在写入时被中断
+                        break
+                    done.update(zip(row['ids'], row['hashes']))
+        except (OSError, ValueError):
+            return {}
+        return done
+
+    def start(self, done):
+        """重写检查点，只保留仍然有效的条目。"""
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'fingerprint': self.fingerprint}) + '\n')
+            if done:
+                f.write(json.dumps({'ids': list(done), 'hashes': list(done.values())}) + '\n')
+
+    def append(self, ids, hashes):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'ids': ids, 'hashes': hashes}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def build_node_embeddings(gp, nodes, prop_name: str = 'embedding', chunk_size: int = None, workers: int = None,
+                          threads: int = None, resume: bool = True, checkpoint_path: str = None, progress=None,
+                          index_path: str = TFIDF_INDEX_FILE):
+    """为节点生成向量并逐块写入 gp.store，返回本次构建的统计信息。
+
+    chunk_size / workers / threads 缺省取 EMBED_CHUNK_SIZE / EMBED_WORKERS / EMBED_THREADS_PER_WORKER；
+    workers <= 1 时在当前进程内编码（复用已加载的模型）。
+    progress(info) 在每块写入后调用，info 含 chunksDone、chunks、nodesDone、nodes、skipped。
+    写入失败或编码出错时异常向上抛出，已写入的块保留在检查点中，下次运行从断点继续。
+    未加载 SBERT 模型时改为拟合 TF-IDF 索引并保存到 index_path，不写存储。
+    """
+    from graph_proc import node_text
+
+    started = time.perf_counter()
+    store = gp.store
+    chunk_size = max(1, chunk_size or EMBED_CHUNK_SIZE)
+    ids = [str(n.get('id')) for n in nodes]
+    texts = [node_text(n) for n in nodes]
+    if gp._embed_model is None:
+        return _build_tfidf_index(ids, texts, index_path, started, progress)
+    hashes = [_text_hash(t) for t in texts]
+
+    model_name = gp.embedding_model_name
+    ckpt = _Checkpoint(checkpoint_path or EMBED_CHECKPOINT, f'sbert:{model_name}|{store.name}|{prop_name}')
+    done = ckpt.load() if resume else {}
+    if done:
+        # 只信任存储中确实存在的向量（如内存 SQLite 重启后检查点仍在，但向量已丢失）
+        stored = {str(k) for k in store.load_embeddings(prop_name)}
+        done = {k: v for k, v in done.items() if k in stored}
+    kept = {}
+    todo = []
+    for i, nid in enumerate(ids):
+        if done.get(nid) == hashes[i]:
+            kept[nid] = hashes[i]
+        else:
+            todo.append(i)
+    ckpt.start(kept)
+
+    # 长度相近的文本放在同一块，SBERT 按块内最长文本补齐，可减少无效计算；长块先提交，进程间负载更均衡
+    todo.sort(key=lambda i: len(texts[i]), reverse=True)
+    chunks = [todo[k:k + chunk_size] for k in range(0, len(todo), chunk_size)]
+
+    if workers is None:
+        workers = EMBED_WORKERS
+    if workers <= 0:
+        workers = (os.cpu_count() or 1) if len(chunks) > 1 else 1
+    workers = max(1, min(workers, len(chunks) or 1))
+    threads = threads or EMBED_THREADS_PER_WORKER or max(1, (os.cpu_count() or 1) // workers)
+
+    stats = {'nodes': len(nodes), 'skipped': len(kept), 'encoded': 0, 'chunksDone': 0, 'chunks': len(chunks),
+             'chunkSize': chunk_size, 'workers': workers, 'threadsPerWorker': threads,
+             'encoder': 'sbert', 'dims': None}
+
+    def commit(chunk, vectors):
+        # 先写存储再记检查点：中断时最多重算一块，不会漏写
+        store.save_embeddings({ids[i]: vec.tolist() for i, vec in zip(chunk, vectors)}, prop_name)
+        ckpt.append([ids[i] for i in chunk], [hashes[i] for i in chunk])
+        stats['encoded'] += len(chunk)
+        stats['chunksDone'] += 1
+        stats['dims'] = int(vectors.shape[1])
+        if progress is not None:
+            progress({'chunksDone': stats['chunksDone'], 'chunks': len(chunks),
+                      'nodesDone': len(kept) + stats['encoded'], 'nodes': len(nodes), 'skipped': len(kept)})
+
+    if workers > 1:
+        # spawn：不继承父进程中的数据库连接、线程与已初始化的 OpenMP 状态
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(model_name, threads)) as pool:
+            futures = [pool.submit(_encode_chunk, k, [texts[i] for i in chunk]) for k, chunk in enumerate(chunks)]
+            try:
+                for fut in as_completed(futures):
+                    k, vectors = fut.result()
+                    commit(chunks[k], vectors)
+            except BaseException:
+                for fut in futures:
+                    fut.cancel()
+                raise
+    elif chunks:
+        model = gp._embed_model
+        for chunk in chunks:
+            vectors = model.encode([texts[i] for i in chunk], show_progress_bar=False, convert_to_numpy=True)
+            commit(chunk, np.asarray(vectors, dtype=np.float32))
+
+    ckpt.clear()
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def export_embeddings_file(gp, nodes, path: str = EMBEDDINGS_FILE, prop_name: str = 'embedding'):
+    """从存储读回当前节点的向量并导出为 JSON 文件，返回导出的向量数。"""
+    emb_map = gp.load_embeddings_from_neo4j(prop_name)
+    current = {str(n.get('id')) for n in nodes}
+    emb_map = {k: v for k, v in emb_map.items() if str(k) in current}
+    gp.save_embeddings_to_file(emb_map, path)
+    return len(emb_map)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='分块并行构建节点向量，写入当前存储并导出 embeddings.json')
+    parser.add_argument('--chunk-size', type=int, help=f'每块文本数（缺省 {EMBED_CHUNK_SIZE}）')
+    parser.add_argument('--workers', type=int, help='编码进程数，0 为自动，1 为在当前进程内编码')
+    parser.add_argument('--threads', type=int, help='每个编码进程的计算线程数')
+    parser.add_argument('--no-resume', action='store_true', help='忽略检查点，全部重新编码')
+    parser.add_argument('--no-file', action='store_true', help='不导出 embeddings.json')
+    args = parser.parse_args(argv)
+
+    from graph_proc import GraphProcessor
+    gp = GraphProcessor()
+    nodes = gp.fetch_nodes_and_rels()['nodes']
+
+    def report(info):
+        print(f"[{info['chunksDone']}/{info['chunks']}] {info['nodesDone']}/{info['nodes']} 个节点", file=sys.stderr)
+
+    stats = build_node_embeddings(gp, nodes, chunk_size=args.chunk_size, workers=args.workers,
+                                  threads=args.threads, resume=not args.no_resume, progress=report)
+    if not args.no_file and stats['encoder'] != 'tfidf':
+        stats['exported'] = export_embeddings_file(gp, nodes)
+    print(json.dumps(stats, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import threading
+from collections import Counter
+from typing import List, Tuple
+
+from graph_cache import get_snapshot
+
+
+class Biconnectivity:
+    """一次线性时间遍历得到的桥、割点与点双连通分量。
+
+    使用显式栈实现的 Hopcroft–Tarjan 算法，不受 Python 递归深度限制：
+    - 桥：low[v] > disc[u] 的树边 (u, v)，且两点之间只有一条关系（平行边不构成桥）；
+    - 割点：非根节点 u 存在子节点 v 满足 low[v] >= disc[u]，或根节点有两个以上子节点；
+    - 点双连通分量：每遇到 low[v] >= disc[u] 时从边栈弹出的边所覆盖的节点集合。
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.bridges: List[Tuple[int, int, str, str]] = []
+        self.articulation_points: List[int] = []
+        self.components: List[List[int]] = []
+        self._run()
+
+    def _run(self):
+        adj = self.snapshot.adj
+        n = len(adj)
+        multiplicity = Counter()
+        for s, t, _, _ in self.snapshot.edges:
+            if s != t:
+                multiplicity[(s, t) if s < t else (t, s)] += 1
+
+        disc = [-1] * n
+        low = [0] * n
+        is_cut = [False] * n
+        timer = 0
+        edge_stack = []
+
+        for root in range(n):
+            if disc[root] != -1 or not adj[root]:
+                continue
+            disc[root] = low[root] = timer
+            timer += 1
+            root_children = 0
+            stack = [(root, -1, iter(adj[root]))]
+            while stack:
+                u, parent, it = stack[-1]
+                descended = False
+                for v in it:
+                    if v == parent:
+                        continue
+                    if disc[v] == -1:
+                        disc[v] = low[v] = timer
+                        timer += 1
+                        edge_stack.append((u, v))
+                        stack.append((v, u, iter(adj[v])))
+                        descended = True
+                        break
+                    if disc[v] < disc[u]:
+                        # 回边
+                        if disc[v] < low[u]:
+                            low[u] = disc[v]
+                        edge_stack.append((u, v))
+                if descended:
+                    continue
+
+                stack.pop()
+                if parent == -1:
+                    continue
+                if low[u] < low[parent]:
+                    low[parent] = low[u]
+                if parent == root:
+                    root_children += 1
+                if low[u] > disc[parent]:
+                    key = (parent, u) if parent < u else (u, parent)
+                    if multiplicity[key] == 1:
+                        self.bridges.append(key)
+                if low[u] >= disc[parent]:
+                    if parent != root:
+                        is_cut[parent] = True
+                    members = set()
+                    while edge_stack:
+                        a, b = edge_stack.pop()
+                        members.add(a)
+                        members.add(b)
+                        if (a, b) == (parent, u):
+                            break
+                    self.components.append(sorted(members))
+
+            if root_children >= 2:
+                is_cut[root] = True
+
+        self.articulation_points = [i for i in range(n) if is_cut[i]]
+        self.components.sort(key=len, reverse=True)
+
+        # 桥替换为对应的原始关系 (source, target, type, rel_id)，保留关系方向与类型
+        bridge_keys = set(self.bridges)
+        bridge_edges = {}
+        for s, t, rtype, rel_id in self.snapshot.edges:
+            key = (s, t) if s < t else (t, s)
+            if key in bridge_keys:
+                bridge_edges[key] = (s, t, rtype, rel_id)
+        self.bridges = [bridge_edges[key] for key in self.bridges]
+
+
+_result = None
+_result_lock = threading.Lock()
+
+
+def get_biconnectivity() -> Biconnectivity:
+    """返回当前图版本的桥/割点计算结果（按图版本缓存）。"""
+    global _result
+    snap = get_snapshot()
+    result = _result
+    if result is not None and result.snapshot is snap:
+        return result
+    with _result_lock:
+        if _result is None or _result.snapshot is not snap:
+            _result = Biconnectivity(snap)
+        return _result
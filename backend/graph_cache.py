@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+from neo4j_ops import get_graph_version
+from graph_store import get_store
+
+# 快照最长缓存时间（秒）：兜底处理绕过本进程的外部写入
+GRAPH_CACHE_TTL = float(os.getenv('GRAPH_CACHE_TTL', '60'))
+
+
+class GraphSnapshot:
+    """某一图版本的只读内存快照，供进程内图算法使用。
+
+    节点统一用整数下标表示：
+    - `ids` / `names` / `props`：下标 -> elementId / 姓名 / 属性
+    - `id_index`、`name_index`：elementId、姓名 -> 下标的哈希索引
+    - `adj`：去重并排序后的无向邻接表（忽略自环）
+    - `edges`：原始有向关系列表 (source, target, type, rel_id)
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]], rels: List[Dict[str, Any]], version: int = 0):
+        self.version = version
+        self.ids = []
+        self.names = []
+        self.props = []
+        self.id_index = {}
+        self.name_index = {}
+        for n in nodes:
+            nid = n.get('id')
+            props = n.get('props') or {}
+            idx = len(self.ids)
+            self.ids.append(nid)
+            self.names.append(props.get('name'))
+            self.props.append(props)
+            self.id_index[nid] = idx
+            # 重名时保留第一个节点，与 Cypher 按姓名匹配的行为一致
+            if props.get('name') is not None:
+                self.name_index.setdefault(props.get('name'), idx)
+
+        neighbors = [set() for _ in self.ids]
+        self.edges = []
+        for r in rels:
+            s = self.id_index.get(r.get('source'))
+            t = self.id_index.get(r.get('target'))
+            if s is None or t is None:
+                continue
+            rtype = (r.get('props') or {}).get('type') or r.get('label')
+            self.edges.append((s, t, rtype, r.get('id')))
+            if s != t:
+                neighbors[s].add(t)
+                neighbors[t].add(s)
+        self.adj = [sorted(ns) for ns in neighbors]
+        self._csr = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, name) -> Optional[int]:
+        return self.name_index.get(name)
+
+    def node_brief(self, idx: int) -> Dict[str, Any]:
+        return {'id': self.ids[idx], 'name': self.names[idx]}
+
+    def degrees(self):
+        import numpy as np
+        return np.fromiter((len(ns) for ns in self.adj), dtype=np.int64, count=len(self.adj))
+
+    def csr(self):
+        """返回对称 0/1 邻接矩阵（scipy CSR，float64），首次调用时构建并缓存。"""
+        if self._csr is None:
+            import numpy as np
+            import scipy.sparse as sp
+            n = len(self.adj)
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            indptr[1:] = np.cumsum(self.degrees())
+            indices = np.fromiter((v for ns in self.adj for v in ns), dtype=np.int32, count=int(indptr[-1]))
+            data = np.ones(len(indices), dtype=np.float64)
+            self._csr = sp.csr_matrix((data, indices, indptr), shape=(n, n))
+        return self._csr
+
+
+_snapshot = None
+_loaded_at = 0.0
+_snapshot_lock = threading.Lock()
+
+
+def load_snapshot(version: Optional[int] = None) -> GraphSnapshot:
+    """从当前存储后端读取全部人物与关系并构建快照。"""
+    if version is None:
+        version = get_graph_version()
+    nodes, rels = get_store().read_all()
+    return GraphSnapshot(nodes, rels, version)
+
+
+def get_snapshot(force: bool = False) -> GraphSnapshot:
+    """返回当前图版本的快照；图版本变化或超过 TTL 时重新加载。"""
+    global _snapshot, _loaded_at
+    snap = _snapshot
+    if not force and _is_fresh(snap):
+        return snap
+    with _snapshot_lock:
+        snap = _snapshot
+        if force or not _is_fresh(snap):
+            snap = load_snapshot()
+            _snapshot = snap
+            _loaded_at = time.time()
+    return snap
+
+
+def _is_fresh(snap) -> bool:
+    return (
+        snap is not None
+        and snap.version == get_graph_version()
+        and time.time() - _loaded_at < GRAPH_CACHE_TTL
+    )
@@ -0,0 +1,99 @@
+import time
+from collections import deque
+from typing import Iterator, List, Optional, Sequence
+
+# 每扩展多少个搜索状态检查一次时间预算
+_BUDGET_CHECK_INTERVAL = 1024
+
+
+class CycleSearch:
+    """长度受限的无向简单环枚举（Johnson 风格）。
+
+    节点按 (度, 下标) 排序得到秩；每个环只从其秩最小的节点出发、且只经过秩更大的节点搜索，
+    并要求第二个节点的秩小于最后一个节点，因此每个环恰好输出一次，且已是规范旋转/方向：
+    以秩最小的节点开头，沿其两个环上邻居中秩较小者的方向排列。
+
+    结果以生成器形式流式产出；超出时间预算时提前停止并将 `truncated` 置为 True。
+    """
+
+    def __init__(self, adj: Sequence[Sequence[int]], min_length: int = 3, max_length: int = 5,
+                 time_budget: Optional[float] = None):
+        self.adj = adj
+        self.min_length = max(3, min_length)
+        self.max_length = max_length
+        self.time_budget = time_budget
+        self.truncated = False
+        n = len(adj)
+        order = sorted(range(n), key=lambda i: (len(adj[i]), i))
+        self.rank = [0] * n
+        for r, node in enumerate(order):
+            self.rank[node] = r
+        self.order = order
+
+    def __iter__(self) -> Iterator[List[int]]:
+        deadline = time.monotonic() + self.time_budget if self.time_budget is not None else None
+        adj, rank = self.adj, self.rank
+        max_len = self.max_length
+        steps = 0
+
+        for s in self.order:
+            rs = rank[s]
+            if len(adj[s]) < 2:
+                continue
+            # 只在秩大于 s 的子图中做有界 BFS，用于剪掉无法在剩余步数内回到 s 的分支
+            dist = {s: 0}
+            queue = deque([s])
+            while queue:
+                u = queue.popleft()
+                if dist[u] >= max_len - 1:
+                    continue
+                for v in adj[u]:
+                    if rank[v] > rs and v not in dist:
+                        dist[v] = dist[u] + 1
+                        queue.append(v)
+
+            path = [s]
+            on_path = {s}
+            stack = [iter(adj[s])]
+            while stack:
+                steps += 1
+                if deadline is not None and steps % _BUDGET_CHECK_INTERVAL == 0 and time.monotonic() > deadline:
+                    self.truncated = True
+                    return
+                advanced = False
+                for v in stack[-1]:
+                    if rank[v] <= rs or v in on_path:
+                        continue
+                    edges_so_far = len(path)
+                    if edges_so_far + dist.get(v, max_len + 1) > max_len:
+                        continue
+                    path.append(v)
+                    on_path.add(v)
+                    # 闭合：v 与 s 相邻且满足长度下限；rank[path[1]] < rank[v] 保证每个环只按一个方向输出
+                    if (len(path) >= self.min_length and rank[path[1]] < rank[v]
+                            and _adjacent(adj, v, s)):
+                        yield list(path)
+                    if len(path) < max_len:
+                        stack.append(iter(adj[v]))
+                        advanced = True
+                        break
+                    path.pop()
+                    on_path.discard(v)
+                if advanced:
+                    continue
+                stack.pop()
+                if len(path) > 1:
+                    on_path.discard(path.pop())
+
+
+def _adjacent(adj, u: int, v: int) -> bool:
+    # 邻接表已排序，优先在较短的一侧二分查找
+    a, b = (adj[u], v) if len(adj[u]) <= len(adj[v]) else (adj[v], u)
+    lo, hi = 0, len(a)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if a[mid] < b:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo < len(a) and a[lo] == b
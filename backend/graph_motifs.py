@@ -0,0 +1,238 @@
+import os
+import random
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from graph_cache import get_snapshot
+
+try:
+    import scipy.sparse as sp
+    _has_scipy = True
+except Exception:
+    _has_scipy = False
+
+# 分关系类型统计时最多统计的类型数（按边数降序）
+MOTIF_TOP_TYPES = int(os.getenv('MOTIF_TOP_TYPES', '10'))
+# A² 按行分块计算，避免枢纽节点导致中间结果过大
+_BLOCK_ROWS = 4096
+
+
+def _comb2(x: np.ndarray) -> np.ndarray:
+    return x * (x - 1) // 2
+
+
+def _comb3(x: np.ndarray) -> np.ndarray:
+    return x * (x - 1) * (x - 2) // 6
+
+
+def _undirected_counts(A) -> Dict[str, int]:
+    """无向模体计数（非诱导子图计数），仅依赖度数、三角形数与共同邻居数。"""
+    deg = np.asarray(A.sum(axis=1)).ravel().astype(np.int64)
+    n = A.shape[0]
+    tri_per_node = np.zeros(n, dtype=np.int64)
+    square_pairs = 0
+    for start in range(0, n, _BLOCK_ROWS):
+        rows = slice(start, min(start + _BLOCK_ROWS, n))
+        A2 = (A[rows] @ A).tocsr()
+        # 三角形：t_v = (A² ∘ A)[v, :].sum() / 2
+        tri_per_node[rows] = np.asarray(A2.multiply(A[rows]).sum(axis=1)).ravel().astype(np.int64) // 2
+        # 四边形：每个 4-环对其两条对角线的有序端点对各计一次，共 4 次
+        coo = A2.tocoo()
+        off = coo.row + start != coo.col
+        c = coo.data[off].astype(np.int64)
+        square_pairs += int(_comb2(c).sum())
+    triangles = int(tri_per_node.sum() // 3)
+    edge_rows, edge_cols = sp.triu(A, k=1).nonzero()
+    du = deg[edge_rows] - 1
+    dv = deg[edge_cols] - 1
+    return {
+        'edge': int(len(edge_rows)),
+        'wedge': int(_comb2(deg).sum()) - 3 * triangles,
+        'triangle': triangles,
+        'path3': int((du * dv).sum()) - 3 * triangles,
+        'star3': int(_comb3(deg).sum()),
+        'tailedTriangle': int((tri_per_node * np.maximum(deg - 2, 0)).sum()),
+        'square': square_pairs // 4,
+    }
+
+
+_DIRECTED_MOTIFS = ('directedEdge', 'reciprocal', 'chain2', 'chain3', 'outStar2', 'inStar2', 'outStar3',
+                    'inStar3', 'cyclicTriangle', 'transitiveTriangle')
+
+
+def _directed_counts(D) -> Dict[str, int]:
+    """有向模体计数：链、入/出星、循环三角与传递三角。"""
+    if D.nnz == 0:
+        # 无边时下方按空下标数组取元素会出错，直接返回全 0
+        return dict.fromkeys(_DIRECTED_MOTIFS, 0)
+    out_deg = np.asarray(D.sum(axis=1)).ravel().astype(np.int64)
+    in_deg = np.asarray(D.sum(axis=0)).ravel().astype(np.int64)
+    R = D.multiply(D.T).tocsr()
+    recip_per_node = np.asarray(R.sum(axis=1)).ravel().astype(np.int64)
+    D2 = (D @ D).tocsr()
+    # 链 a→b→c→d（四点互异）：对每条边 b→c，(in_b - [c→b])·(out_c - [c→b]) 减去 a=d 的情形 (D²)[c, b]
+    rows, cols = D.nonzero()
+    back = np.asarray(D[cols, rows]).ravel().astype(np.int64)
+    closing = np.asarray(D2[cols, rows]).ravel().astype(np.int64)
+    chain3 = int(((in_deg[rows] - back) * (out_deg[cols] - back) - closing).sum())
+    return {
+        'directedEdge': int(D.nnz),
+        'reciprocal': int(R.nnz // 2),
+        'chain2': int((in_deg * out_deg - recip_per_node).sum()),
+        'chain3': chain3,
+        'outStar2': int(_comb2(out_deg).sum()),
+        'inStar2': int(_comb2(in_deg).sum()),
+        'outStar3': int(_comb3(out_deg).sum()),
+        'inStar3': int(_comb3(in_deg).sum()),
+        'cyclicTriangle': int(D2.multiply(D.T).sum() // 3),
+        'transitiveTriangle': int(D2.multiply(D).sum()),
+    }
+
+
+class MotifCensus:
+    """3/4 节点模体普查。
+
+    计数全部由度数、三角形与共同邻居的组合公式得到，不做枚举；结果为非诱导子图出现次数，
+    只有 wedge 扣除了闭合成三角形的部分，仅计开放三元组。
+    除全图外，还按关系类型分别统计；展示用的示例实例通过随机采样得到。
+    """
+
+    def __init__(self, snapshot, top_types: int = MOTIF_TOP_TYPES, seed: int = 7):
+        if not _has_scipy:
+            raise RuntimeError("没有可用的稀疏矩阵库：请安装 'scipy'。")
+        self.snapshot = snapshot
+        self.seed = seed
+        n = len(snapshot)
+        # 有向节点对 -> 关系类型列表（按出现顺序去重）：同一对节点之间可以有多种类型的关系
+        self.edge_types = {}
+        for s, t, rtype, _ in snapshot.edges:
+            if s != t:
+                types = self.edge_types.setdefault((s, t), [])
+                if rtype not in types:
+                    types.append(rtype)
+        self.out_adj = [[] for _ in range(n)]
+        for s, t in self.edge_types:
+            self.out_adj[s].append(t)
+
+        self.overall = self._census(list(self.edge_types))
+        pairs_by_type = {}
+        for pair, types in self.edge_types.items():
+            for rtype in types:
+                pairs_by_type.setdefault(rtype, []).append(pair)
+        type_counts = Counter({rtype: len(pairs) for rtype, pairs in pairs_by_type.items()})
+        self.by_type = {}
+        for rtype, _ in type_counts.most_common(top_types):
+            self.by_type[rtype] = self._census(pairs_by_type[rtype])
+
+    def _census(self, pairs) -> Dict[str, Dict[str, int]]:
+        n = len(self.snapshot)
+        if pairs:
+            rows, cols = np.array(pairs, dtype=np.int64).T
+        else:
+            rows = cols = np.zeros(0, dtype=np.int64)
+        D = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+        D.data[:] = 1.0
+        A = ((D + D.T) > 0).astype(np.float64).tocsr()
+        return {'undirected': _undirected_counts(A), 'directed': _directed_counts(D)}
+
+    # ---------- 示例采样 ----------
+
+    def sample(self, motif: str, k: int = 5, attempts: int = 2000, rng: Optional[random.Random] = None) -> List[List[int]]:
+        """随机采样至多 k 个模体实例（节点下标列表）；star 类按中心度数从高到低给出。"""
+        rng = rng or random.Random(self.seed)
+        adj = self.snapshot.adj
+        n = len(adj)
+        found = []
+        seen = set()
+        if motif in ('star3', 'star'):
+            centers = sorted((i for i in range(n) if len(adj[i]) >= 3), key=lambda i: len(adj[i]), reverse=True)
+            return [[c] + list(adj[c]) for c in centers[:k]]
+        if n == 0:
+            return found
+        nodes_with_edges = [i for i in range(n) if adj[i]]
+        if not nodes_with_edges:
+            return found
+        for _ in range(attempts):
+            if len(found) >= k:
+                break
+            inst = self._try_sample(motif, rng, nodes_with_edges)
+            if inst is None:
+                continue
+            key = frozenset(inst) if motif in ('triangle', 'square') else tuple(inst)
+            if key in seen:
+                continue
+            seen.add(key)
+            found.append(inst)
+        return found
+
+    def _try_sample(self, motif, rng, nodes_with_edges):
+        adj = self.snapshot.adj
+        if motif == 'chain3':
+            a = rng.choice(nodes_with_edges)
+            path = [a]
+            for _ in range(3):
+                nxt = self.out_adj[path[-1]]
+                if not nxt:
+                    return None
+                v = rng.choice(nxt)
+                if v in path:
+                    return None
+                path.append(v)
+            return path
+        if motif in ('wedge', 'path3'):
+            length = 3 if motif == 'wedge' else 4
+            path = [rng.choice(nodes_with_edges)]
+            while len(path) < length:
+                v = rng.choice(adj[path[-1]])
+                if v in path:
+                    return None
+                path.append(v)
+            if motif == 'wedge' and path[2] in adj[path[0]]:
+                return None
+            return path
+        if motif == 'triangle':
+            u = rng.choice(nodes_with_edges)
+            v = rng.choice(adj[u])
+            common = set(adj[u]).intersection(adj[v])
+            if not common:
+                return None
+            return [u, v, rng.choice(sorted(common))]
+        if motif == 'square':
+            u = rng.choice(nodes_with_edges)
+            a = rng.choice(adj[u])
+            w = rng.choice(adj[a])
+            if w == u:
+                return None
+            others = (set(adj[u]) & set(adj[w])) - {a}
+            if not others:
+                return None
+            return [u, a, w, rng.choice(sorted(others))]
+        raise ValueError(f'不支持的模体类型: {motif}')
+
+    def relation_types(self, path: List[int]) -> List[Any]:
+        """路径上每条边的关系类型（两个方向的类型合并，多种类型时取首个，与展示字段保持单值）。"""
+        out = []
+        for i in range(len(path) - 1):
+            types = self.edge_types.get((path[i], path[i + 1]), []) + self.edge_types.get((path[i + 1], path[i]), [])
+            out.append(types[0] if types else None)
+        return out
+
+
+_motif_census = None
+_motif_census_lock = threading.Lock()
+
+
+def get_motif_census() -> MotifCensus:
+    """返回当前图版本的模体普查结果（按图版本缓存）。"""
+    global _motif_census
+    snap = get_snapshot()
+    census = _motif_census
+    if census is not None and census.snapshot is snap:
+        return census
+    with _motif_census_lock:
+        if _motif_census is None or _motif_census.snapshot is not snap:
+            _motif_census = MotifCensus(snap)
+        return _motif_census
@@ -0,0 +1,232 @@
+import copy
+import os
+import threading
+from collections import deque
+from typing import Optional, Tuple
+
+import numpy as np
+
+from graph_cache import get_snapshot
+from graph_paths import bidirectional_bfs
+
+ORACLE_LANDMARKS = int(os.getenv('ORACLE_LANDMARKS', '16'))
+ORACLE_STRATEGY = os.getenv('ORACLE_STRATEGY', 'farthest')
+
+_UNREACHABLE = {np.uint8: np.iinfo(np.uint8).max, np.uint16: np.iinfo(np.uint16).max}
+
+
+def _bfs_distances(adj, source: int, n: int) -> np.ndarray:
+    """单源 BFS，返回 int32 距离数组，不可达为 -1。"""
+    dist = np.full(n, -1, dtype=np.int32)
+    dist[source] = 0
+    queue = deque([source])
+    while queue:
+        u = queue.popleft()
+        du = dist[u] + 1
+        for v in adj[u]:
+            if dist[v] < 0:
+                dist[v] = du
+                queue.append(v)
+    return dist
+
+
+class DistanceOracle:
+    """基于地标（landmark）的距离预言机。
+
+    预先从若干地标节点做 BFS，按三角不等式在 O(#landmarks) 内给出任意两点距离的上下界：
+    - 上界：min_l d(l,u) + d(l,v)
+    - 下界：max_l |d(l,u) - d(l,v)|
+    上下界相等时即为精确距离，只有二者不一致且需要精确值时才回退到双向 BFS。
+
+    距离表按最大距离选用 uint8 或 uint16 存储，该类型最大值表示不可达。
+    """
+
+    def __init__(self, snapshot, num_landmarks: int = ORACLE_LANDMARKS, strategy: str = ORACLE_STRATEGY):
+        self.snapshot = snapshot
+        self.num_landmarks = num_landmarks
+        self.strategy = strategy
+        self.landmarks = []
+        self.table = np.zeros((0, len(snapshot)), dtype=np.uint8)
+        self._build()
+
+    # ---------- 构建 ----------
+
+    def _build(self):
+        n = len(self.snapshot)
+        k = min(self.num_landmarks, n)
+        adj = self.snapshot.adj
+        rows = []
+        if self.strategy == 'degree':
+            order = sorted(range(n), key=lambda i: len(adj[i]), reverse=True)
+            self.landmarks = order[:k]
+            rows = [_bfs_distances(adj, l, n) for l in self.landmarks]
+        else:
+            # 最远点启发式：首个地标取度最大者，之后每次取距已选地标最远的节点（不可达视为无穷远，优先覆盖其他连通分量）
+            self.landmarks = []
+            if k > 0:
+                current = max(range(n), key=lambda i: len(adj[i]))
+                nearest = np.full(n, np.iinfo(np.int64).max, dtype=np.int64)
+                for _ in range(k):
+                    self.landmarks.append(current)
+                    dist = _bfs_distances(adj, current, n)
+                    rows.append(dist)
+                    reach = np.where(dist >= 0, dist, np.iinfo(np.int64).max)
+                    nearest = np.minimum(nearest, reach)
+                    nearest[self.landmarks] = -1
+                    current = int(np.argmax(nearest))
+                    if nearest[current] <= 0:
+                        break
+        self.table = self._pack(rows, n)
+
+    @staticmethod
+    def _pack(rows, n) -> np.ndarray:
+        if not rows:
+            return np.zeros((0, n), dtype=np.uint8)
+        dist = np.vstack(rows)
+        max_dist = int(dist.max()) if dist.size else 0
+        dtype = np.uint8 if max_dist < _UNREACHABLE[np.uint8] else np.uint16
+        packed = np.where(dist >= 0, dist, _UNREACHABLE[dtype]).astype(dtype)
+        return packed
+
+    # ---------- 查询 ----------
+
+    def bounds(self, u: int, v: int) -> Tuple[Optional[int], Optional[int]]:
+        """返回 (下界, 上界)。确定不连通时返回 (None, None)；无地标覆盖时上界为 None。"""
+        if u == v:
+            return 0, 0
+        if self.table.shape[0] == 0:
+            return 1, None
+        sentinel = _UNREACHABLE[self.table.dtype.type]
+        du = self.table[:, u].astype(np.int32)
+        dv = self.table[:, v].astype(np.int32)
+        reach_u = du != sentinel
+        reach_v = dv != sentinel
+        # 某个地标只能到达其中一端，说明二者位于不同连通分量
+        if np.any(reach_u != reach_v):
+            return None, None
+        both = reach_u & reach_v
+        if not np.any(both):
+            return 1, None
+        upper = int((du[both] + dv[both]).min())
+        lower = max(1, int(np.abs(du[both] - dv[both]).max()))
+        return lower, upper
+
+    def distance(self, u: int, v: int, exact: bool = True) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+        """返回 (下界, 上界, 精确距离)。上下界一致时直接给出精确值；否则仅在 exact=True 时做图搜索。"""
+        lower, upper = self.bounds(u, v)
+        if lower is None:
+            return None, None, None
+        if upper is not None and lower == upper:
+            return lower, upper, lower
+        if not exact:
+            return lower, upper, None
+        path = bidirectional_bfs(self.snapshot.adj, u, v)
+        d = len(path) - 1 if path else None
+        return lower, upper, d
+
+    # ---------- 增量更新 ----------
+
+    def update(self, snapshot) -> None:
+        """切换到新快照并增量维护距离表。
+
+        - 新增边：距离只会变小，从新边两端做松弛传播；
+        - 删除边：仅当该边在某地标的最短路径树中“紧”（两端距离差为 1）时重算该地标；
+        - 删除了地标节点：整体重建。
+        """
+        old = self.snapshot
+        remap = np.array([old.id_index.get(nid, -1) for nid in snapshot.ids], dtype=np.int64)
+        new_landmarks = [snapshot.id_index.get(old.ids[l]) for l in self.landmarks]
+        if any(l is None for l in new_landmarks):
+            self.snapshot = snapshot
+            self._build()
+            return
+
+        old_edges = _edge_keys(old)
+        new_edges = _edge_keys(snapshot)
+        added = new_edges - old_edges
+        removed = old_edges - new_edges
+
+        n = len(snapshot)
+        dist = np.full((len(new_landmarks), n), -1, dtype=np.int32)
+        if self.table.shape[0]:
+            sentinel = _UNREACHABLE[self.table.dtype.type]
+            old_dist = np.where(self.table == sentinel, -1, self.table.astype(np.int32))
+            mask = remap >= 0
+            dist[:, mask] = old_dist[:, remap[mask]]
+
+        self.snapshot = snapshot
+        self.landmarks = new_landmarks
+        adj = snapshot.adj
+
+        stale = set()
+        for a_id, b_id in removed:
+            a, b = old.id_index[a_id], old.id_index[b_id]
+            for li in range(len(self.landmarks)):
+                if li in stale:
+                    continue
+                if abs(int(self.table[li, a]) - int(self.table[li, b])) == 1:
+                    stale.add(li)
+        for li in stale:
+            dist[li] = _bfs_distances(adj, self.landmarks[li], n)
+
+        for a_id, b_id in added:
+            a, b = snapshot.id_index[a_id], snapshot.id_index[b_id]
+            for li in range(len(self.landmarks)):
+                if li not in stale:
+                    _relax_edge(adj, dist[li], a, b)
+
+        self.table = self._pack(list(dist), n)
+
+
+def _edge_keys(snapshot):
+    """以 elementId 表示的无向边集合；端点按字符串排序，保证跨快照可比。"""
+    keys = set()
+    for u, ns in enumerate(snapshot.adj):
+        uid = snapshot.ids[u]
+        for v in ns:
+            if u < v:
+                vid = snapshot.ids[v]
+                keys.add((uid, vid) if str(uid) <= str(vid) else (vid, uid))
+    return keys
+
+
+def _relax_edge(adj, dist: np.ndarray, a: int, b: int) -> None:
+    """新增边 (a, b) 后从较近一端向外松弛，只会减小距离。"""
+    if dist[a] < 0 and dist[b] < 0:
+        return
+    if dist[b] < 0 or (dist[a] >= 0 and dist[a] < dist[b]):
+        start, other = a, b
+    else:
+        start, other = b, a
+    if dist[other] >= 0 and dist[other] <= dist[start] + 1:
+        return
+    dist[other] = dist[start] + 1
+    queue = deque([other])
+    while queue:
+        u = queue.popleft()
+        du = dist[u] + 1
+        for v in adj[u]:
+            if dist[v] < 0 or dist[v] > du:
+                dist[v] = du
+                queue.append(v)
+
+
+_oracle = None
+_oracle_lock = threading.Lock()
+
+
+def get_oracle() -> DistanceOracle:
+    """返回与当前图版本一致的距离预言机，图变化后在副本上增量更新再整体替换，避免读到半更新状态。"""
+    global _oracle
+    snap = get_snapshot()
+    oracle = _oracle
+    if oracle is not None and oracle.snapshot is snap:
+        return oracle
+    with _oracle_lock:
+        if _oracle is None:
+            _oracle = DistanceOracle(snap)
+        elif _oracle.snapshot is not snap:
+            updated = copy.copy(_oracle)
+            updated.update(snap)
+            _oracle = updated
+        return _oracle
@@ -0,0 +1,120 @@
+from collections import Counter, defaultdict
+from typing import List, Optional, Sequence, Tuple
+
+# 单次批量请求允许的最大路径对数量
+MAX_BATCH_PAIRS = 500
+
+
+def _walk_back(parent, node) -> List[int]:
+    path = []
+    while node != -1:
+        path.append(node)
+        node = parent[node]
+    return path
+
+
+def bidirectional_bfs(adj: Sequence[Sequence[int]], source: int, target: int) -> Optional[List[int]]:
+    """在无权无向图上用双向 BFS 求最短路径，返回节点下标列表；不连通时返回 None。
+
+    每轮扩展较小的一侧边界，并在一整层扩展完成后取相遇点中总长度最短者，保证结果为最短路径。
+    """
+    if source == target:
+        return [source]
+
+    parent_f = {source: -1}
+    parent_b = {target: -1}
+    depth_f = {source: 0}
+    depth_b = {target: 0}
+    frontier_f = [source]
+    frontier_b = [target]
+
+    while frontier_f and frontier_b:
+        forward = len(frontier_f) <= len(frontier_b)
+        if forward:
+            frontier, parent, depth, other_depth = frontier_f, parent_f, depth_f, depth_b
+        else:
+            frontier, parent, depth, other_depth = frontier_b, parent_b, depth_b, depth_f
+
+        best = None
+        next_frontier = []
+        for u in frontier:
+            du = depth[u] + 1
+            for v in adj[u]:
+                if v in other_depth:
+                    total = du + other_depth[v]
+                    if best is None or total < best[0]:
+                        best = (total, u, v)
+                if v not in parent:
+                    parent[v] = u
+                    depth[v] = du
+                    next_frontier.append(v)
+
+        if best is not None:
+            _, u, v = best
+            if forward:
+                return _walk_back(parent_f, u)[::-1] + _walk_back(parent_b, v)
+            return _walk_back(parent_f, v)[::-1] + _walk_back(parent_b, u)
+
+        if forward:
+            frontier_f = next_frontier
+        else:
+            frontier_b = next_frontier
+
+    return None
+
+
+class SourceBFS:
+    """从固定起点出发、按需逐层推进的 BFS。
+
+    多个终点共享同一起点时复用已访问的前驱树与边界：已经到达的终点直接回溯，未到达的才继续扩展。
+    """
+
+    def __init__(self, adj: Sequence[Sequence[int]], source: int):
+        self.adj = adj
+        self.source = source
+        self.parent = {source: -1}
+        self.frontier = [source]
+
+    def path_to(self, target: int) -> Optional[List[int]]:
+        while target not in self.parent and self.frontier:
+            next_frontier = []
+            for u in self.frontier:
+                for v in self.adj[u]:
+                    if v not in self.parent:
+                        self.parent[v] = u
+                        next_frontier.append(v)
+            self.frontier = next_frontier
+        if target not in self.parent:
+            return None
+        return _walk_back(self.parent, target)[::-1]
+
+
+def batch_shortest_paths(adj: Sequence[Sequence[int]], pairs: Sequence[Tuple[int, int]]) -> List[Optional[List[int]]]:
+    """批量求最短路径，返回与 `pairs` 一一对应的路径列表（不可达为 None）。
+
+    图是无向的，每对先朝出现次数更多的端点定向；同一起点有多个终点时共享一棵 `SourceBFS`，
+    只出现一次的起点则使用双向 BFS。
+    """
+    freq = Counter()
+    for s, t in pairs:
+        freq[s] += 1
+        freq[t] += 1
+
+    oriented = []
+    groups = defaultdict(list)
+    for i, (s, t) in enumerate(pairs):
+        flipped = freq[t] > freq[s]
+        src, dst = (t, s) if flipped else (s, t)
+        oriented.append((src, dst, flipped))
+        groups[src].append(i)
+
+    results = [None] * len(pairs)
+    for src, idxs in groups.items():
+        bfs = SourceBFS(adj, src) if len(idxs) > 1 else None
+        for i in idxs:
+            _, dst, flipped = oriented[i]
+            path = bfs.path_to(dst) if bfs is not None else bidirectional_bfs(adj, src, dst)
+            if path is not None and flipped:
+                path = path[::-1]
+            results[i] = path
+    return results
@@ -0,0 +1,68 @@
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+try:
+    import scipy.sparse as sp
+    _has_scipy = True
+except Exception:
+    _has_scipy = False
+
+# 阻尼系数：越小越集中在种子附近（检索重排更看重近邻，默认低于网页排序常用的 0.85）
+PPR_ALPHA = float(os.getenv('RAG_PPR_ALPHA', '0.5'))
+# 收敛阈值（相邻两次迭代的 L1 距离）与最大迭代次数；1e-5 时前几十名的排序已与精确解一致
+PPR_TOL = float(os.getenv('RAG_PPR_TOL', '1e-5'))
+PPR_MAX_ITER = int(os.getenv('RAG_PPR_MAX_ITER', '100'))
+
+
+def transition_matrix(n: int, sources, targets):
+    """由无向边构建 PageRank 的转移矩阵 P = A·D⁻¹（CSR，float32），以及出度为 0 的节点掩码。
+
+    A 为去重、去自环后的对称 0/1 邻接矩阵；P 的第 j 列是从 j 出发走一步到各邻居的概率。
+    """
+    if not _has_scipy:
+        raise RuntimeError('个性化 PageRank 需要 scipy')
+    s = np.asarray(sources, dtype=np.int64)
+    t = np.asarray(targets, dtype=np.int64)
+    keep = s != t
+    s, t = s[keep], t[keep]
+    rows = np.concatenate([s, t])
+    cols = np.concatenate([t, s])
+    a = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(n, n))
+    a.sum_duplicates()
+    a.data[:] = 1.0
+    deg = np.asarray(a.sum(axis=0)).ravel()
+    inv = np.zeros(n, dtype=np.float32)
+    inv[deg > 0] = 1.0 / deg[deg > 0]
+    # 列缩放：CSR 中每个非零元按其列号乘以 1/deg
+    a.data *= inv[a.indices]
+    return a, deg == 0
+
+
+def personalized_pagerank(p, dangling, seeds: Dict[int, float], alpha: float = PPR_ALPHA, tol: float = PPR_TOL,
+                          max_iter: int = PPR_MAX_ITER, x0: Optional[np.ndarray] = None):
+    """稀疏幂迭代：x ← α·P·x + (α·悬挂质量 + 1 − α)·s，s 为归一化的种子分布。
+
+    p / dangling 来自 transition_matrix；x0 为热启动向量（如同一组种子上次的结果），缺省从 s 开始。
+    返回 (x, 迭代次数)，x 的元素和为 1；max_iter <= 0 时不迭代，直接返回归一化后的起始向量。
+    """
+    n = p.shape[0]
+    s = np.zeros(n, dtype=np.float32)
+    for i, w in seeds.items():
+        s[i] += w
+    total = s.sum()
+    if total <= 0:
+        raise ValueError('种子权重之和必须为正')
+    s /= total
+    x = s.copy() if x0 is None else np.asarray(x0, dtype=np.float32) / max(float(x0.sum()), 1e-12)
+    has_dangling = bool(dangling.any())
+    it = 0
+    for it in range(1, max_iter + 1):
+        leak = alpha * float(x[dangling].sum()) if has_dangling else 0.0
+        nxt = alpha * (p @ x) + (leak + 1.0 - alpha) * s
+        err = float(np.abs(nxt - x).sum())
+        x = nxt
+        if err < tol:
+            break
+    return x, it
@@ -1,51 +1,42 @@
 import json
 import os
-import sys
 from typing import List, Dict, Any, Optional
 
 import networkx as nx
 
-try:
-    from backend.neo4j_ops import neo4j_driver
-except Exception:
-    try:
-        from neo4j_ops import neo4j_driver
-    except Exception:
-        # 作为最后手段，将项目根加入 sys.path 后重试
-        _this_dir = os.path.dirname(__file__)
-        _backend_dir = os.path.dirname(_this_dir)
-        _project_root = os.path.dirname(_backend_dir)
-        if _project_root not in sys.path:
-            sys.path.insert(0, _project_root)
-        try:
-            from neo4j_ops import neo4j_driver
-        except Exception as e:
-            raise ImportError(f"无法导入 neo4j_ops：{e}")
+from graph_store import get_store
 
-# 尝试加载 sentence-transformers；不可用时回退到 sklearn 的 TF-IDF
+# 尝试加载 sentence-transformers；不可用时回退到 tfidf_index 中持久化的 TF-IDF 索引
 try:
     from sentence_transformers import SentenceTransformer
     _has_sbert = True
 except Exception:
     _has_sbert = False
 
-try:
-    from sklearn.feature_extraction.text import TfidfVectorizer
-    _has_sklearn = True
-except Exception:
-    _has_sklearn = False
+DEFAULT_TEXT_FIELDS = ['description', 'bio', 'summary', 'name']
+
+
+def node_text(node: Dict[str, Any], field_priority: Optional[List[str]] = None) -> str:
+    """节点用于向量化的文本：按 field_priority 取第一个非空属性，缺省为 DEFAULT_TEXT_FIELDS。"""
+    props = node.get('props', {}) or {}
+    for f in field_priority or DEFAULT_TEXT_FIELDS:
+        v = props.get(f)
+        if v:
+            return str(v)
+    return props.get('name') or ''
 
 
 class GraphProcessor:
     """从 Neo4j 提取图并对节点文本进行向量化的工具类。
 
     行为：
+    - 节点、关系与向量的读写通过 graph_store 的存储后端完成（默认 Neo4j）。
     - 优先使用 `sentence-transformers` 生成语义向量；若不可用，则使用 TF-IDF 回退。
     - 使用 `networkx` 构建图并计算常见中心性指标。
     """
 
-    def __init__(self, driver=None, embedding_model_name: str = "all-MiniLM-L6-v2"):
-        self.driver = driver or neo4j_driver
+    def __init__(self, embedding_model_name: str = "all-MiniLM-L6-v2", store=None):
+        self.store = store or get_store()
         self.embedding_model_name = embedding_model_name
         self._embed_model = None
         if _has_sbert:
@@ -55,30 +46,8 @@ class GraphProcessor:
                 self._embed_model = None
 
     def fetch_nodes_and_rels(self) -> Dict[str, Any]:
-        """从 Neo4j 获取人物节点与关系（返回原始属性）。"""
-        with self.driver.session() as session:
-            nodes_result = session.run(
-                "MATCH (p:Person) RETURN elementId(p) as id, properties(p) as props"
-            )
-            nodes = []
-            for r in nodes_result:
-                rec = dict(r)
-                nodes.append({'id': rec.get('id'), 'props': rec.get('props') or {}})
-
-            rels_result = session.run(
-                "MATCH (a:Person)-[r]->(b:Person) RETURN elementId(r) as id, elementId(a) as source, elementId(b) as target, type(r) as rel_label, properties(r) as props"
-            )
-            rels = []
-            for r in rels_result:
-                rec = dict(r)
-                rels.append({
-                    'id': rec.get('id'),
-                    'source': rec.get('source'),
-                    'target': rec.get('target'),
-                    'label': rec.get('rel_label'),
-                    'props': rec.get('props') or {}
-                })
-
+        """从存储后端获取人物节点与关系（返回原始属性）。"""
+        nodes, rels = self.store.read_all()
         return {'nodes': nodes, 'relationships': rels}
 
     def to_networkx(self, nodes: List[Dict[str, Any]], rels: List[Dict[str, Any]], directed: bool = False) -> nx.Graph:
@@ -129,27 +98,28 @@ class GraphProcessor:
         return result
 
     def embed_texts(self, texts: List[str]):
-        """对文本列表进行向量化：优先使用 SBERT，否则回退到 TF-IDF。
+        """用 SBERT 对文本列表进行向量化，返回 numpy 数组（每行一个向量）。
 
-        返回 numpy 数组或等效的二维列表（每行一个向量）。
+        没有 SBERT 时抛出 RuntimeError：TF-IDF 的词表取决于整份语料，节点向量须由 embed_pipeline.build_node_embeddings
+        拟合并持久化为 tfidf_index.TfidfIndex，查询用 embed_query 在该索引上 transform。
         """
+        if self._embed_model is None:
+            raise RuntimeError('未加载 SBERT 模型：TF-IDF 向量请通过 embed_pipeline.build_node_embeddings 构建索引')
         cleaned = [t if t is not None else "" for t in texts]
-        if self._embed_model is not None:
-            try:
-                emb = self._embed_model.encode(cleaned, show_progress_bar=False, convert_to_numpy=True)
-                return emb
-            except Exception:
-                pass
-
-        if _has_sklearn:
-            vect = TfidfVectorizer(max_features=512)
-            X = vect.fit_transform(cleaned).toarray()
-            return X
-
-        raise RuntimeError("没有可用的向量化工具：请安装 'sentence-transformers' 或 'scikit-learn'。")
+        return self._embed_model.encode(cleaned, show_progress_bar=False, convert_to_numpy=True)
 
     def embed_query(self, text: str):
-        """为单条查询生成向量（返回一维向量）。"""
+        """为单条查询生成向量：SBERT 模式返回一维 numpy 数组。
+
+        没有 SBERT 时用 RAG 重建保存的 TF-IDF 索引做 transform，返回 1 × 词表大小的 CSR 行向量，与节点向量处于同一空间；
+        索引尚未构建时抛出 RuntimeError。
+        """
+        if self._embed_model is None:
+            from tfidf_index import load_tfidf_index
+            index = load_tfidf_index()
+            if index is None:
+                raise RuntimeError('TF-IDF 索引尚未构建，请先执行 RAG 重建')
+            return index.transform([text])
         res = self.embed_texts([text])
         try:
             return res[0]
@@ -157,26 +127,11 @@ class GraphProcessor:
             return list(res[0])
 
     def load_embeddings_from_neo4j(self, prop_name: str = 'embedding') -> Dict[Any, List[float]]:
-        """从 Neo4j 读取指定节点属性名的 embeddings，返回 id->vector 映射。
+        """从存储后端读取指定节点属性名的 embeddings，返回 id->vector 映射。
 
-        会在无法连接 Neo4j 时抛出 RuntimeError。
+        读取失败时抛出 RuntimeError。
         """
-        if not self.driver:
-            raise RuntimeError('Neo4j driver 未初始化，无法读取数据库')
-
-        with self.driver.session() as session:
-            try:
-                res = session.run(
-                    "MATCH (p:Person) WHERE exists(p[$prop]) RETURN elementId(p) as id, p[$prop] as vec",
-                    prop=prop_name
-                )
-                out = {}
-                for r in res:
-                    rec = dict(r)
-                    out[rec.get('id')] = rec.get('vec')
-                return out
-            except Exception as e:
-                raise RuntimeError(f"从 Neo4j 读取 embeddings 失败: {e}")
+        return self.store.load_embeddings(prop_name)
 
     def load_embeddings_from_file(self, path: str) -> Dict[Any, List[float]]:
         """从 JSON 文件读取 embeddings（键为字符串 node id）。"""
@@ -195,28 +150,12 @@ class GraphProcessor:
         return out
 
     def node_embeddings(self, nodes: List[Dict[str, Any]], field_priority: Optional[List[str]] = None):
-        """为每个节点生成文本表示并返回 embeddings 映射 node_id->vector。
+        """为每个节点生成文本表示并返回 embeddings 映射 node_id->vector（需要 SBERT，见 embed_texts）。
 
         field_priority: 节点属性中按优先级使用的文本字段列表，缺省为 ['description','bio','summary','name']。
         """
-        if field_priority is None:
-            field_priority = ['description', 'bio', 'summary', 'name']
-
-        texts = []
-        ids = []
-        for n in nodes:
-            nid = n.get('id')
-            props = n.get('props', {}) or {}
-            text = ''
-            for f in field_priority:
-                v = props.get(f)
-                if v:
-                    text = str(v)
-                    break
-            if not text:
-                text = props.get('name') or ''
-            ids.append(nid)
-            texts.append(text)
+        ids = [n.get('id') for n in nodes]
+        texts = [node_text(n, field_priority) for n in nodes]
 
         embs = self.embed_texts(texts)
 
@@ -239,35 +178,12 @@ class GraphProcessor:
             json.dump(data, f, ensure_ascii=False, indent=2)
 
     def persist_embeddings_to_neo4j(self, emb_map: Dict[Any, List[float]], prop_name: str = 'embedding') -> None:
-        """将节点向量写入 Neo4j 节点属性 `prop_name`。
+        """将节点向量写入存储后端的节点属性 `prop_name`。
 
         emb_map: dict of node_id -> vector (list of floats)
-        如果没有可用的 Neo4j 连接会抛出 RuntimeError。
+        写入失败时抛出 RuntimeError。
         """
-        if not self.driver:
-            raise RuntimeError('Neo4j driver 未初始化，无法写入数据库')
-
-        # 构造参数列表
-        rows = []
-        for nid, vec in emb_map.items():
-            try:
-                rid = int(nid)
-            except Exception:
-                rid = nid
-            rows.append({'id': rid, 'vec': vec})
-
-        # 使用 UNWIND 批量写入
-        with self.driver.session() as session:
-            try:
-                session.run(
-                    "UNWIND $rows AS r\n"
-                    "MATCH (p) WHERE elementId(p) = r.id\n"
-                    "SET p[$prop] = r.vec",
-                    rows=rows,
-                    prop=prop_name
-                )
-            except Exception as e:
-                raise RuntimeError(f"写入 Neo4j 失败: {e}")
+        self.store.save_embeddings(emb_map, prop_name)
 
     def save_embeddings_to_file(self, emb_map: Dict[Any, List[float]], path: str) -> None:
         """将 embeddings 导出为 JSON 文件，格式为 {node_id: [vec]}。"""
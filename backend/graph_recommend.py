@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from graph_cache import get_snapshot
+
+try:
+    import scipy.sparse as sp
+    _has_scipy = True
+except Exception:
+    _has_scipy = False
+
+# 支持的打分方式：共同邻居数、Adamic–Adar、资源分配指数
+METRICS = ('common', 'adamic_adar', 'resource_allocation')
+
+# 批量预计算时每次处理的行数，控制 A[rows]·A 的中间结果大小
+PRECOMPUTE_BLOCK_ROWS = int(os.getenv('RECOMMEND_BLOCK_ROWS', '2048'))
+
+
+class Recommender:
+    """基于稀疏邻接矩阵乘积的“可能认识的人”推荐。
+
+    对候选对 (u, v)，令 Γ(x) 为邻居集合：
+    - common：|Γ(u) ∩ Γ(v)|，即 (A·A)[u, v]
+    - adamic_adar：Σ_{w∈Γ(u)∩Γ(v)} 1 / log(deg(w))，即 (A·diag(1/log d)·A)[u, v]
+    - resource_allocation：Σ_{w∈Γ(u)∩Γ(v)} 1 / deg(w)，即 (A·diag(1/d)·A)[u, v]
+    已有连边与自身会被屏蔽。单个节点只需计算一行，成本与其两跳邻域大小成正比。
+    """
+
+    def __init__(self, snapshot):
+        if not _has_scipy:
+            raise RuntimeError("没有可用的稀疏矩阵库：请安装 'scipy'。")
+        self.snapshot = snapshot
+        self.A = snapshot.csr()
+        deg = snapshot.degrees().astype(np.float64)
+        # 度为 1 的节点不可能是两个不同节点的共同邻居，权重置 0 以避免 log(1) = 0
+        with np.errstate(divide='ignore'):
+            aa = np.where(deg > 1, 1.0 / np.log(np.maximum(deg, 2)), 0.0)
+            ra = np.where(deg > 0, 1.0 / np.maximum(deg, 1), 0.0)
+        self._weighted = {
+            'adamic_adar': sp.diags(aa) @ self.A,
+            'resource_allocation': sp.diags(ra) @ self.A,
+        }
+        self.precomputed = None
+        self.precomputed_k = 0
+
+    def _scores(self, rows) -> Dict[str, Any]:
+        """计算若干行的三种得分矩阵（已屏蔽已有连边和对角线）。"""
+        A_rows = self.A[rows]
+        scores = {'common': (A_rows @ self.A).tocsr()}
+        for metric, WA in self._weighted.items():
+            scores[metric] = (A_rows @ WA).tocsr()
+        mask = A_rows.copy()
+        mask.data[:] = 1.0
+        diag = sp.csr_matrix(
+            (np.ones(len(rows)), (np.arange(len(rows)), np.asarray(rows))),
+            shape=A_rows.shape
+        )
+        mask = ((mask + diag) > 0).astype(np.float64)
+        for metric in scores:
+            S = scores[metric]
+            S = S - S.multiply(mask)
+            S.eliminate_zeros()
+            scores[metric] = S.tocsr()
+        return scores
+
+    @staticmethod
+    def _rank(scores, i: int, metric: str, k: int) -> List[Dict[str, float]]:
+        primary = scores[metric]
+        start, end = primary.indptr[i], primary.indptr[i + 1]
+        cols = primary.indices[start:end]
+        vals = primary.data[start:end]
+        if len(cols) == 0:
+            return []
+        lookup = {}
+        for m, S in scores.items():
+            s, e = S.indptr[i], S.indptr[i + 1]
+            lookup[m] = dict(zip(S.indices[s:e].tolist(), S.data[s:e].tolist()))
+        if len(cols) > k:
+            # 按完整排序键 (-metric, -common, index) 选取，并列时与 precompute 查表的结果一致
+            common = np.array([round(lookup['common'].get(c, 0.0)) for c in cols.tolist()], dtype=np.float64)
+            top = np.lexsort((cols, -common, -vals))[:k]
+            cols, vals = cols[top], vals[top]
+        out = []
+        for c in cols.tolist():
+            out.append({
+                'index': c,
+                'common': int(round(lookup['common'].get(c, 0.0))),
+                'adamic_adar': float(lookup['adamic_adar'].get(c, 0.0)),
+                'resource_allocation': float(lookup['resource_allocation'].get(c, 0.0)),
+            })
+        out.sort(key=lambda r: (-r[metric], -r['common'], r['index']))
+        return out
+
+    def recommend(self, idx: int, metric: str = 'common', k: int = 10) -> List[Dict[str, float]]:
+        """返回节点 idx 的前 k 个推荐；已批量预计算且 k 不超过预计算规模时直接查表。"""
+        if metric not in METRICS:
+            raise ValueError(f'不支持的推荐指标: {metric}')
+        if self.precomputed is not None and k <= self.precomputed_k:
+            cands = sorted(self.precomputed[idx], key=lambda r: (-r[metric], -r['common'], r['index']))
+            return cands[:k]
+        scores = self._scores([idx])
+        return self._rank(scores, 0, metric, k)
+
+    def precompute(self, k: int = 10) -> None:
+        """离线批量模式：按行块一次遍历全图，为每个节点物化各指标 top-k 候选的并集。"""
+        n = len(self.snapshot)
+        table = [None] * n
+        for start in range(0, n, PRECOMPUTE_BLOCK_ROWS):
+            rows = list(range(start, min(start + PRECOMPUTE_BLOCK_ROWS, n)))
+            scores = self._scores(rows)
+            for i, row in enumerate(rows):
+                merged = {}
+                for metric in METRICS:
+                    for r in self._rank(scores, i, metric, k):
+                        merged[r['index']] = r
+                table[row] = list(merged.values())
+        self.precomputed = table
+        self.precomputed_k = k
+
+    def export(self, path: str, metric: str = 'common') -> None:
+        """将预计算结果按姓名导出为 JSON，便于离线检查或分发。"""
+        if self.precomputed is None:
+            raise RuntimeError('尚未执行批量预计算')
+        snap = self.snapshot
+        out = {}
+        for idx, cands in enumerate(self.precomputed):
+            ranked = sorted(cands, key=lambda r: (-r[metric], -r['common'], r['index']))
+            out[snap.ids[idx]] = [dict(r, id=snap.ids[r['index']], name=snap.names[r['index']]) for r in ranked]
+        d = os.path.dirname(path)
+        if d and not os.path.exists(d):
+            os.makedirs(d, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(out, f, ensure_ascii=False, indent=2)
+
+
+_recommender = None
+_recommender_lock = threading.Lock()
+
+
+def get_recommender(precompute_k: Optional[int] = None) -> Recommender:
+    """返回当前图版本的推荐器；传入 precompute_k 时（重新）执行批量预计算。"""
+    global _recommender
+    snap = get_snapshot()
+    rec = _recommender
+    if rec is not None and rec.snapshot is snap and precompute_k is None:
+        return rec
+    with _recommender_lock:
+        rec = _recommender
+        if rec is None or rec.snapshot is not snap:
+            previous_k = rec.precomputed_k if rec is not None else 0
+            rec = Recommender(snap)
+            # 图变化后沿用上一次的批量规模，保持接口为查表
+            if precompute_k is None and previous_k:
+                precompute_k = previous_k
+        if precompute_k:
+            rec.precompute(precompute_k)
+        _recommender = rec
+    return rec
+
+
+if __name__ == '__main__':
+    from data_loader import EXPORT_DIR
+    try:
+        rec = get_recommender(precompute_k=10)
+        path = os.path.join(EXPORT_DIR, 'recommendations.json')
+        rec.export(path)
+        print(f"已为 {len(rec.snapshot)} 个节点预计算推荐，结果写入 {path}")
+    except Exception as e:
+        print(f"推荐预计算失败（可能是环境/依赖或数据库）：{e}")
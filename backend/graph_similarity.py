@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from graph_cache import get_snapshot
+
+# MinHash 签名长度与 LSH 分段：bands * rows 必须等于 num_perm；默认阈值约 (1/16)^(1/4) ≈ 0.5
+MINHASH_NUM_PERM = int(os.getenv('MINHASH_NUM_PERM', '64'))
+LSH_BANDS = int(os.getenv('LSH_BANDS', '16'))
+# 单个桶超过该大小时在全量任务中跳过（通常是被同一枢纽节点“粘”在一起的大量低度节点）
+LSH_MAX_BUCKET = int(os.getenv('LSH_MAX_BUCKET', '1000'))
+
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# 每次向量化计算的哈希函数个数，限制中间矩阵大小
+_PERM_CHUNK = 8
+
+
+class SimilarityIndex:
+    """基于邻居集合 MinHash + LSH 分段的结构相似度索引。
+
+    - 每个节点的邻居集合压缩为 num_perm 维 MinHash 签名；
+    - 签名切成 bands 段，任一段完全相同的节点进入同一个桶，作为候选；
+    - 候选再用精确的 Jaccard 相似度验证排序。
+    """
+
+    def __init__(self, snapshot, num_perm: int = MINHASH_NUM_PERM, bands: int = LSH_BANDS, seed: int = 42):
+        if num_perm % bands != 0:
+            raise ValueError('num_perm 必须能被 bands 整除')
+        self.snapshot = snapshot
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.neighbor_sets = [set(ns) for ns in snapshot.adj]
+        rng = np.random.default_rng(seed)
+        # multiply-shift 哈希族：h(x) = (a·x + b) >> 32（模 2^64），a 取奇数
+        self._a = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+        self._b = rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64, endpoint=True)
+        self.signatures = self._minhash()
+        self.buckets, self.node_keys = self._band()
+
+    def _minhash(self) -> np.ndarray:
+        adj = self.snapshot.adj
+        n = len(adj)
+        deg = np.fromiter((len(ns) for ns in adj), dtype=np.int64, count=n)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(deg)
+        members = np.fromiter((v for ns in adj for v in ns), dtype=np.uint64, count=int(indptr[-1]))
+        sig = np.full((n, self.num_perm), _MAX_HASH, dtype=np.uint64)
+        nonempty = np.nonzero(deg > 0)[0]
+        if len(members) == 0:
+            return sig
+        for start in range(0, self.num_perm, _PERM_CHUNK):
+            a = self._a[start:start + _PERM_CHUNK, None]
+            b = self._b[start:start + _PERM_CHUNK, None]
+            hv = (a * members[None, :] + b) >> np.uint64(32)
+            mins = np.minimum.reduceat(hv, indptr[nonempty], axis=1)
+            sig[nonempty, start:start + hv.shape[0]] = mins.T
+        return sig
+
+    def _band(self):
+        buckets = [defaultdict(list) for _ in range(self.bands)]
+        node_keys = []
+        for idx in range(len(self.signatures)):
+            if not self.neighbor_sets[idx]:
+                node_keys.append(None)
+                continue
+            keys = []
+            for band in range(self.bands):
+                key = self.signatures[idx, band * self.rows:(band + 1) * self.rows].tobytes()
+                buckets[band][key].append(idx)
+                keys.append(key)
+            node_keys.append(keys)
+        return buckets, node_keys
+
+    def jaccard(self, u: int, v: int) -> Tuple[int, int, float]:
+        a, b = self.neighbor_sets[u], self.neighbor_sets[v]
+        common = len(a & b)
+        union = len(a) + len(b) - common
+        return common, union, (common / union if union else 0.0)
+
+    def candidates(self, idx: int) -> set:
+        keys = self.node_keys[idx]
+        out = set()
+        if keys is None:
+            return out
+        for band, key in enumerate(keys):
+            out.update(self.buckets[band][key])
+        out.discard(idx)
+        return out
+
+    def top_k(self, idx: int, k: int = 10) -> List[Dict[str, float]]:
+        """返回与 idx 结构最相似的前 k 个节点（精确 Jaccard 排序，只保留有共同邻居者）。
+
+        LSH 候选不足 k 个时，补充枚举两跳邻居（Jaccard > 0 的节点必然共享邻居），保证低相似度节点也有结果。
+        """
+        cands = self.candidates(idx)
+        if len(cands) < k:
+            for w in self.snapshot.adj[idx]:
+                cands.update(self.snapshot.adj[w])
+            cands.discard(idx)
+        scored = []
+        for c in cands:
+            common, union, sim = self.jaccard(idx, c)
+            if common > 0:
+                scored.append({'index': c, 'common': common, 'union': union, 'similarity': sim})
+        scored.sort(key=lambda r: (-r['similarity'], -r['common'], r['index']))
+        return scored[:k]
+
+    def similarity_graph(self, threshold: float = 0.5) -> List[Tuple[int, int, float]]:
+        """全量任务：遍历 LSH 桶生成候选对，精确验证后输出 Jaccard >= threshold 的边 (u, v, sim)。"""
+        seen = set()
+        edges = []
+        for band_buckets in self.buckets:
+            for members in band_buckets.values():
+                if len(members) < 2 or len(members) > LSH_MAX_BUCKET:
+                    continue
+                for i in range(len(members)):
+                    u = members[i]
+                    for v in members[i + 1:]:
+                        pair = (u, v) if u < v else (v, u)
+                        if pair in seen:
+                            continue
+                        seen.add(pair)
+                        _, _, sim = self.jaccard(u, v)
+                        if sim >= threshold:
+                            edges.append((pair[0], pair[1], sim))
+        edges.sort(key=lambda e: (-e[2], e[0], e[1]))
+        return edges
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_similarity_index() -> SimilarityIndex:
+    """返回当前图版本的相似度索引，图变化后重建。"""
+    global _index
+    snap = get_snapshot()
+    index = _index
+    if index is not None and index.snapshot is snap:
+        return index
+    with _index_lock:
+        if _index is None or _index.snapshot is not snap:
+            _index = SimilarityIndex(snap)
+        return _index
+
+
+if __name__ == '__main__':
+    from data_loader import EXPORT_DIR
+    try:
+        index = get_similarity_index()
+        snap = index.snapshot
+        edges = index.similarity_graph()
+        path = os.path.join(EXPORT_DIR, 'similarity_graph.json')
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([
+                {'source': snap.ids[u], 'sourceName': snap.names[u],
+                 'target': snap.ids[v], 'targetName': snap.names[v], 'similarity': sim}
+                for u, v, sim in edges
+            ], f, ensure_ascii=False, indent=2)
+        print(f"相似度图：{len(snap)} 个节点，{len(edges)} 条边，结果写入 {path}")
+    except Exception as e:
+        print(f"相似度图生成失败（可能是环境/依赖或数据库）：{e}")
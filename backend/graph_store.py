@@ -0,0 +1,473 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from neo4j_ops import (
+    GRAPH_STORE, bump_graph_version, execute_read, execute_write, async_execute_read,
+    neo4j_add_person, neo4j_update_person, neo4j_delete_person,
+    neo4j_add_relationship, neo4j_delete_relationship, neo4j_get_graph,
+    neo4j_replace_graph, load_sample_rows
+)
+
+# 嵌入式后端的数据库文件；默认 ':memory:'，进程退出即丢弃
+GRAPH_STORE_PATH = os.getenv('GRAPH_STORE_PATH', ':memory:')
+
+_PERSON_FIELDS = ('name', 'age', 'occupation', 'description')
+
+
+class GraphStore(ABC):
+    """图存储后端接口，覆盖 neo4j_ops 中的全部持久化操作。
+
+    - 人物/关系的增删改与 neo4j_ops 同名函数语义一致：按姓名合并人物、按 (起点, 终点, 类型) 合并关系，
+      返回值形如 (record, error) 或 bool；写入成功后负责调用 bump_graph_version 通知各内存索引；
+    - `read_all` 返回原始的 nodes [{id, props}] 与 relationships [{id, source, target, label, props}]，
+      供图快照与 GraphProcessor 使用；
+    - `replace_graph` 批量替换整张图，`init_data` 在其基础上载入示例数据集；
+    - `load_embeddings` / `save_embeddings` 读写节点向量；
+    - `read_all_async` / `load_embeddings_async` 供 ASGI 模式使用，默认在线程池中调用同步实现。
+    除 init_data 与异步方法外均为抽象方法，缺少实现的后端在实例化时即抛出 TypeError。
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def add_person(self, data: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def update_person(self, person_id, data: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def delete_person(self, person_id) -> bool:
+        ...
+
+    @abstractmethod
+    def add_relationship(self, data: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def delete_relationship(self, rel_id) -> bool:
+        ...
+
+    @abstractmethod
+    def get_graph(self) -> Dict[str, List[Dict[str, Any]]]:
+        ...
+
+    @abstractmethod
+    def read_all(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        ...
+
+    @abstractmethod
+    def replace_graph(self, persons: List[Dict[str, Any]], relations: List[Dict[str, Any]], merge: bool = False) -> None:
+        ...
+
+    @abstractmethod
+    def load_embeddings(self, prop_name: str = 'embedding') -> Dict[Any, List[float]]:
+        ...
+
+    @abstractmethod
+    def save_embeddings(self, emb_map: Dict[Any, List[float]], prop_name: str = 'embedding') -> None:
+        ...
+
+    def init_data(self, dataset: str = 'qing_history') -> None:
+        persons, relations = load_sample_rows(dataset)
+        self.replace_graph(persons, relations)
+
+    async def read_all_async(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        return await asyncio.to_thread(self.read_all)
+
+    async def load_embeddings_async(self, prop_name: str = 'embedding') -> Dict[Any, List[float]]:
+        return await asyncio.to_thread(self.load_embeddings, prop_name)
+
+
+def _read_all_tx(tx):
+    nodes_result = tx.run(
+        "MATCH (p:Person) RETURN elementId(p) as id, properties(p) as props"
+    )
+    nodes = [{'id': r['id'], 'props': r['props'] or {}} for r in nodes_result]
+
+    rels_result = tx.run(
+        "MATCH (a:Person)-[r]->(b:Person) RETURN elementId(r) as id, elementId(a) as source, elementId(b) as target, type(r) as rel_label, properties(r) as props"
+    )
+    rels = [{
+        'id': r['id'],
+        'source': r['source'],
+        'target': r['target'],
+        'label': r['rel_label'],
+        'props': r['props'] or {}
+    } for r in rels_result]
+    return nodes, rels
+
+
+async def _read_all_tx_async(tx):
+    nodes_result = await tx.run(
+        "MATCH (p:Person) RETURN elementId(p) as id, properties(p) as props"
+    )
+    nodes = [{'id': r['id'], 'props': r['props'] or {}} async for r in nodes_result]
+
+    rels_result = await tx.run(
+        "MATCH (a:Person)-[r]->(b:Person) RETURN elementId(r) as id, elementId(a) as source, elementId(b) as target, type(r) as rel_label, properties(r) as props"
+    )
+    rels = [{
+        'id': r['id'],
+        'source': r['source'],
+        'target': r['target'],
+        'label': r['rel_label'],
+        'props': r['props'] or {}
+    } async for r in rels_result]
+    return nodes, rels
+
+
+class Neo4jStore(GraphStore):
+    """基于 Neo4j 的后端：直接委托给 neo4j_ops 中的托管事务实现。"""
+
+    name = 'neo4j'
+
+    def add_person(self, data):
+        return neo4j_add_person(data)
+
+    def update_person(self, person_id, data):
+        return neo4j_update_person(person_id, data)
+
+    def delete_person(self, person_id):
+        return neo4j_delete_person(person_id)
+
+    def add_relationship(self, data):
+        return neo4j_add_relationship(data)
+
+    def delete_relationship(self, rel_id):
+        return neo4j_delete_relationship(rel_id)
+
+    def get_graph(self):
+        return neo4j_get_graph()
+
+    def read_all(self):
+        # 节点与关系在同一个读事务中读取，保证两者一致
+        return execute_read(_read_all_tx)
+
+    def replace_graph(self, persons, relations, merge=False):
+        neo4j_replace_graph(persons, relations, merge=merge)
+
+    def load_embeddings(self, prop_name='embedding'):
+        def work(tx):
+            res = tx.run(
+                "MATCH (p:Person) WHERE p[$prop] IS NOT NULL RETURN elementId(p) as id, p[$prop] as vec",
+                prop=prop_name
+            )
+            return {r['id']: r['vec'] for r in res}
+        try:
+            return execute_read(work)
+        except Exception as e:
+            raise RuntimeError(f"从 Neo4j 读取 embeddings 失败: {e}")
+
+    async def read_all_async(self):
+        return await async_execute_read(_read_all_tx_async)
+
+    async def load_embeddings_async(self, prop_name='embedding'):
+        async def load_embeddings_async(tx):
+            res = await tx.run(
+                "MATCH (p:Person) WHERE p[$prop] IS NOT NULL RETURN elementId(p) as id, p[$prop] as vec",
+                prop=prop_name
+            )
+            return {r['id']: r['vec'] async for r in res}
+        try:
+            return await async_execute_read(load_embeddings_async)
+        except Exception as e:
+            raise RuntimeError(f"从 Neo4j 读取 embeddings 失败: {e}")
+
+    def save_embeddings(self, emb_map, prop_name='embedding'):
+        rows = [{'id': str(nid), 'vec': list(vec)} for nid, vec in emb_map.items()]
+
+        def work(tx):
+            tx.run(
+                "UNWIND $rows AS r\n"
+                "MATCH (p) WHERE elementId(p) = r.id\n"
+                "SET p[$prop] = r.vec",
+                rows=rows,
+                prop=prop_name
+            ).consume()
+        try:
+            execute_write(work)
+        except Exception as e:
+            raise RuntimeError(f"写入 Neo4j 失败: {e}")
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS persons (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    props TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS persons_name ON persons(name);
+CREATE TABLE IF NOT EXISTS relationships (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source INTEGER NOT NULL REFERENCES persons(id) ON DELETE CASCADE,
+    target INTEGER NOT NULL REFERENCES persons(id) ON DELETE CASCADE,
+    label TEXT NOT NULL DEFAULT 'RELATES',
+    type TEXT,
+    props TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS relationships_source ON relationships(source, target, type);
+CREATE INDEX IF NOT EXISTS relationships_target ON relationships(target);
+CREATE TABLE IF NOT EXISTS embeddings (
+    person_id INTEGER NOT NULL REFERENCES persons(id) ON DELETE CASCADE,
+    prop TEXT NOT NULL,
+    vec TEXT NOT NULL,
+    PRIMARY KEY (person_id, prop)
+);
+"""
+
+
+def _person_record(pid, props) -> Dict[str, Any]:
+    return {'id': str(pid), **{f: props.get(f) for f in _PERSON_FIELDS}}
+
+
+def _rowid(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class SQLiteStore(GraphStore):
+    """嵌入式后端：标准库 sqlite3，默认纯内存，无需外部服务即可运行 API、压测与 CI。
+
+    人物与关系的属性以 JSON 保存，节点 id 为自增主键的字符串形式（与 Neo4j 的 elementId 一样是不透明字符串）。
+    单连接 + 可重入锁串行化所有访问；文件数据库开启 WAL。
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = GRAPH_STORE_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        if path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _tx(self):
+        return _Transaction(self._conn, self._lock)
+
+    # ---------- 人物 ----------
+
+    def add_person(self, data):
+        try:
+            with self._tx() as cur:
+                row = cur.execute("SELECT id, props FROM persons WHERE name = ? LIMIT 1", (data['name'],)).fetchone()
+                if row:
+                    return _person_record(row[0], json.loads(row[1])), None
+                props = {
+                    'name': data['name'],
+                    'age': data.get('age'),
+                    'occupation': data.get('occupation'),
+                    'description': data.get('description', '')
+                }
+                cur.execute("INSERT INTO persons (name, props) VALUES (?, ?)",
+                            (props['name'], json.dumps(props, ensure_ascii=False)))
+                record = _person_record(cur.lastrowid, props)
+        except Exception as e:
+            return None, str(e)
+        bump_graph_version('person_upsert', record)
+        return record, None
+
+    def update_person(self, person_id, data):
+        pid = _rowid(person_id)
+        try:
+            with self._tx() as cur:
+                row = cur.execute("SELECT props FROM persons WHERE id = ?", (pid,)).fetchone()
+                if not row:
+                    return None, '人物不存在'
+                props = json.loads(row[0])
+                for f in _PERSON_FIELDS:
+                    if data.get(f) is not None:
+                        props[f] = data[f]
+                cur.execute("UPDATE persons SET name = ?, props = ? WHERE id = ?",
+                            (props.get('name'), json.dumps(props, ensure_ascii=False), pid))
+                record = _person_record(pid, props)
+        except Exception as e:
+            return None, str(e)
+        bump_graph_version('person_upsert', record)
+        return record, None
+
+    def delete_person(self, person_id):
+        try:
+            with self._tx() as cur:
+                cur.execute("DELETE FROM persons WHERE id = ?", (_rowid(person_id),))
+        except Exception as e:
+            print(f"删除失败: {e}")
+            return False
+        bump_graph_version('person_delete', {'id': person_id})
+        return True
+
+    # ---------- 关系 ----------
+
+    def add_relationship(self, data):
+        source, target = _rowid(data['source']), _rowid(data['target'])
+        try:
+            with self._tx() as cur:
+                found = cur.execute("SELECT COUNT(*) FROM persons WHERE id IN (?, ?)", (source, target)).fetchone()[0]
+                if found < (1 if source == target else 2):
+                    return None, '人物不存在'
+                row = cur.execute(
+                    "SELECT id FROM relationships WHERE source = ? AND target = ? AND label = 'RELATES' AND type IS ?",
+                    (source, target, data['type'])
+                ).fetchone()
+                if row:
+                    rel_id = row[0]
+                else:
+                    cur.execute("INSERT INTO relationships (source, target, type, props) VALUES (?, ?, ?, ?)",
+                                (source, target, data['type'], json.dumps({'type': data['type']}, ensure_ascii=False)))
+                    rel_id = cur.lastrowid
+                record = {'id': str(rel_id), 'source': str(source), 'target': str(target), 'type': data['type']}
+        except Exception as e:
+            return None, str(e)
+        bump_graph_version('relationship_add', record)
+        return record, None
+
+    def delete_relationship(self, rel_id):
+        try:
+            with self._tx() as cur:
+                cur.execute("DELETE FROM relationships WHERE id = ?", (_rowid(rel_id),))
+        except Exception as e:
+            print(f"删除失败: {e}")
+            return False
+        bump_graph_version('relationship_delete', {'id': rel_id})
+        return True
+
+    # ---------- 整图读写 ----------
+
+    def read_all(self):
+        with self._lock:
+            node_rows = self._conn.execute("SELECT id, props FROM persons").fetchall()
+            rel_rows = self._conn.execute("SELECT id, source, target, label, props FROM relationships").fetchall()
+        nodes = [{'id': str(pid), 'props': json.loads(props)} for pid, props in node_rows]
+        rels = [{
+            'id': str(rid),
+            'source': str(s),
+            'target': str(t),
+            'label': label,
+            'props': json.loads(props)
+        } for rid, s, t, label, props in rel_rows]
+        return nodes, rels
+
+    def get_graph(self):
+        nodes, rels = self.read_all()
+        return {
+            'nodes': [_person_record(n['id'], n['props']) for n in nodes],
+            'relationships': [{
+                'id': r['id'],
+                'source': r['source'],
+                'target': r['target'],
+                'type': r['props'].get('type')
+            } for r in rels if r['label'] == 'RELATES']
+        }
+
+    def replace_graph(self, persons, relations, merge=False):
+        with self._tx() as cur:
+            cur.execute("DELETE FROM embeddings")
+            cur.execute("DELETE FROM relationships")
+            cur.execute("DELETE FROM persons")
+            rows = []
+            seen = set()
+            for p in persons:
+                if merge:
+                    if p['name'] in seen:
+                        continue
+                    seen.add(p['name'])
+                props = {f: p.get(f) for f in _PERSON_FIELDS}
+                rows.append((p['name'], json.dumps(props, ensure_ascii=False)))
+            cur.executemany("INSERT INTO persons (name, props) VALUES (?, ?)", rows)
+
+            # 与 Cypher 的 MATCH 语义一致：同名人物全部参与连边
+            ids_by_name = {}
+            for pid, name in cur.execute("SELECT id, name FROM persons"):
+                ids_by_name.setdefault(name, []).append(pid)
+            rel_rows = []
+            seen_rels = set()
+            for r in relations:
+                props = json.dumps({'type': r['type']}, ensure_ascii=False)
+                for s in ids_by_name.get(r['source_name'], ()):
+                    for t in ids_by_name.get(r['target_name'], ()):
+                        if merge:
+                            key = (s, t, r['type'])
+                            if key in seen_rels:
+                                continue
+                            seen_rels.add(key)
+                        rel_rows.append((s, t, r['type'], props))
+            cur.executemany("INSERT INTO relationships (source, target, type, props) VALUES (?, ?, ?, ?)", rel_rows)
+        bump_graph_version()
+
+    # ---------- 向量 ----------
+
+    def load_embeddings(self, prop_name='embedding'):
+        with self._lock:
+            rows = self._conn.execute("SELECT person_id, vec FROM embeddings WHERE prop = ?", (prop_name,)).fetchall()
+        return {str(pid): json.loads(vec) for pid, vec in rows}
+
+    def save_embeddings(self, emb_map, prop_name='embedding'):
+        rows = [(_rowid(nid), prop_name, json.dumps([float(x) for x in vec])) for nid, vec in emb_map.items()]
+        with self._tx() as cur:
+            cur.executemany(
+                "INSERT OR REPLACE INTO embeddings (person_id, prop, vec) "
+                "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM persons WHERE id = ?1)",
+                rows
+            )
+
+
+class _Transaction:
+    """在持有存储锁的情况下开启显式事务，正常退出提交、异常回滚。"""
+
+    def __init__(self, conn, lock):
+        self._conn = conn
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._conn.execute("BEGIN")
+        except Exception:
+            self._lock.release()
+            raise
+        return self._conn.cursor()
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self._lock.release()
+        return False
+
+
+_STORES = {'neo4j': Neo4jStore, 'sqlite': SQLiteStore}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> GraphStore:
+    """返回由环境变量 GRAPH_STORE（neo4j / sqlite）选择的存储后端单例。"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if GRAPH_STORE not in _STORES:
+                    raise RuntimeError(f'不支持的存储后端: {GRAPH_STORE}')
+                _store = _STORES[GRAPH_STORE]()
+    return _store
+
+
+def set_store(store: GraphStore) -> GraphStore:
+    """替换当前存储后端（基准测试或嵌入式运行时使用），并让各内存索引整体重建。"""
+    global _store
+    with _store_lock:
+        _store = store
+    bump_graph_version()
+    return store
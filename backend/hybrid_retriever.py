@@ -0,0 +1,535 @@
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+import graph_ppr
+from data_loader import EMBEDDINGS_FILE
+from metrics import RAG_PPR_DURATION, RAG_PPR_ITERATIONS
+from neo4j_ops import build_graph_corpus, get_graph_version, index_terms
+from tfidf_index import load_tfidf_index
+
+# 融合方式：rrf（倒数排名融合）或 weighted（各路分数除以该路最高分后加权求和）
+RAG_FUSION = os.getenv('RAG_FUSION', 'rrf')
+RAG_RRF_K = float(os.getenv('RAG_RRF_K', '60'))
+# 向量检索的权重，关键词（BM25）检索的权重为 1 - RAG_VECTOR_WEIGHT
+RAG_VECTOR_WEIGHT = float(os.getenv('RAG_VECTOR_WEIGHT', '0.5'))
+# 每一路参与融合的候选数为 k * RAG_CANDIDATE_FACTOR
+RAG_CANDIDATE_FACTOR = int(os.getenv('RAG_CANDIDATE_FACTOR', '4'))
+# 索引最长缓存时间（秒）：兜底处理绕过本进程的外部写入
+RAG_INDEX_TTL = float(os.getenv('RAG_INDEX_TTL', '300'))
+# 批量检索时每次矩阵乘法处理的问题数，控制相似度矩阵的大小
+RAG_BATCH_BLOCK = int(os.getenv('RAG_BATCH_BLOCK', '256'))
+# 图扩展：从命中节点出发的跳数、输出的关系句数、每多一跳的分数衰减、单次查询最多检查的边数
+RAG_EXPAND_HOPS = int(os.getenv('RAG_EXPAND_HOPS', '2'))
+RAG_EXPAND_FACTS = int(os.getenv('RAG_EXPAND_FACTS', '12'))
+RAG_EXPAND_DECAY = float(os.getenv('RAG_EXPAND_DECAY', '0.5'))
+RAG_EXPAND_MAX_EDGES = int(os.getenv('RAG_EXPAND_MAX_EDGES', '2000'))
+# 个性化 PageRank 重排：是否启用、PPR 分数在最终排序中的权重、按种子集合缓存的结果数（用于热启动）
+# 阻尼系数、收敛阈值与最大迭代次数见 graph_ppr
+RAG_PPR = os.getenv('RAG_PPR', '1').lower() not in ('0', 'false', 'no', 'off')
+RAG_PPR_WEIGHT = float(os.getenv('RAG_PPR_WEIGHT', '0.5'))
+RAG_PPR_CACHE = int(os.getenv('RAG_PPR_CACHE', '16'))
+# 问题中实体名匹配：参与匹配的名称最短 / 最长字符数
+ENTITY_MIN_LEN = 2
+ENTITY_MAX_LEN = 32
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def _top(scores, n: int):
+    """分数最高的 n 个下标（降序），只含分数大于 0 的项。"""
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > n:
+        candidates = candidates[np.argpartition(-scores[candidates], n - 1)[:n]]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+class HybridIndex:
+    """问答检索的内存索引：某一图版本下的 BM25 倒排表与节点向量，查询时不访问数据库。
+
+    - 文档与节点一一对应，文本为 build_graph_corpus 的人物描述；
+    - BM25：词项见 neo4j_ops.index_terms（无 jieba 时为中文字的 1~2 元组），每个词项预先算好 (文档下标数组, 权重数组)，
+      查询时只累加命中词项的权重；
+    - 向量：SBERT 模式为 L2 归一化的稠密矩阵（没有向量的节点为零行），一次矩阵向量乘得到余弦相似度；
+      TF-IDF 模式复用持久化的稀疏索引（见 tfidf_index），按节点 id 对齐到文档下标，相似度全程保持稀疏；
+    - 两路各取前 k * RAG_CANDIDATE_FACTOR 个候选，按 RAG_FUSION 融合；同一节点、相同文本只保留一条；
+    - 邻接表：节点下标 -> [(邻居下标, 关系下标)]，expand 据此从命中节点向外取 1~2 跳的关系句；
+    - 个性化 PageRank（需要 scipy）：以问题中出现的实体名与融合命中为种子，在 CSR 转移矩阵上幂迭代，
+      与融合分数加权后重排候选，并把与种子联系紧密、但两路都没有召回的节点补进候选。
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]], rels: List[Dict[str, Any]], vectors=None, tfidf=None,
+                 version: int = 0, generation: int = 0):
+        self.version = version
+        self.generation = generation
+        self.dense = vectors is not None
+        self.tfidf = tfidf
+        self.nodes = nodes
+        self.rels = rels
+        self.ids = [str(n.get('id')) for n in nodes]
+        corpus = build_graph_corpus(nodes, rels)
+        self.texts = corpus['corpus']
+        # 与 rels 一一对应的关系句，如“孙悟空 与 唐僧 的关系：师徒”
+        self.rel_texts = corpus['relationships']
+        # 整图 JSON 用作提示词中的完整图语料，每个版本只序列化一次
+        self.graph_json = json.dumps({'nodes': nodes, 'relationships': rels}, ensure_ascii=False)
+        self._pos = {nid: i for i, nid in enumerate(self.ids)}
+        self._build_bm25()
+        self._build_adjacency()
+        self._build_names()
+        # 转移矩阵首次重排时构建；热启动缓存：种子 -> 收敛的 PPR 向量
+        self._ppr = None
+        self._ppr_lock = threading.Lock()
+        self._ppr_cache = OrderedDict()
+        self._matrix = None
+        self._tfidf_rows = None
+        if vectors:
+            self._build_dense(vectors)
+        elif tfidf is not None:
+            self._tfidf_rows = np.array([self._pos.get(str(nid), -1) for nid in tfidf.ids], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def needs_query_vector(self) -> bool:
+        """SBERT 模式且有节点向量时，search 需要调用方提供查询向量。"""
+        return self._matrix is not None
+
+    # ---------- 构建 ----------
+
+    def _build_bm25(self):
+        tokens = [index_terms(text) for text in self.texts]
+        n = len(tokens)
+        lengths = np.array([len(t) for t in tokens], dtype=np.float64)
+        avgdl = float(lengths.mean()) if n and lengths.sum() else 1.0
+        postings = {}
+        for d, toks in enumerate(tokens):
+            for term, tf in Counter(toks).items():
+                docs, tfs = postings.setdefault(term, ([], []))
+                docs.append(d)
+                tfs.append(tf)
+        self._bm25 = {}
+        for term, (docs, tfs) in postings.items():
+            docs = np.array(docs, dtype=np.int64)
+            tfs = np.array(tfs, dtype=np.float64)
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[docs] / avgdl)
+            self._bm25[term] = (docs, (idf * tfs * (BM25_K1 + 1) / (tfs + norm)).astype(np.float32))
+
+    def _build_adjacency(self):
+        self._adj = [[] for _ in self.ids]
+        # 两端都在图中的边，供构建 PPR 转移矩阵
+        self._edges = ([], [])
+        for r, rel in enumerate(self.rels):
+            s = self._pos.get(str(rel.get('source')))
+            t = self._pos.get(str(rel.get('target')))
+            if s is None or t is None:
+                continue
+            self._edges[0].append(s)
+            self._edges[1].append(t)
+            self._adj[s].append((t, r))
+            if t != s:
+                self._adj[t].append((s, r))
+        # 关系句分词结果，查询时按需计算并缓存
+        self._rel_tokens = {}
+
+    def _build_names(self):
+        # 小写实体名 -> 文档下标；同名节点都作为种子
+        self._names = {}
+        longest = 0
+        for d, node in enumerate(self.nodes):
+            name = ((node.get('props') or {}).get('name') or '')
+            name = str(name).strip().lower()
+            if ENTITY_MIN_LEN <= len(name) <= ENTITY_MAX_LEN:
+                self._names.setdefault(name, []).append(d)
+                longest = max(longest, len(name))
+        self._name_max = longest
+
+    def _transition(self):
+        """返回 (转移矩阵, 悬挂节点掩码)；没有 scipy 或图中没有边时返回 None。"""
+        if self._ppr is None:
+            with self._ppr_lock:
+                if self._ppr is None:
+                    built = False
+                    if graph_ppr._has_scipy:
+                        p, dangling = graph_ppr.transition_matrix(len(self.ids), *self._edges)
+                        if p.nnz:
+                            built = (p, dangling)
+                    self._ppr = built
+        return self._ppr or None
+
+    def _build_dense(self, vectors):
+        rows = [(i, vectors.get(nid)) for i, nid in enumerate(self.ids)]
+        rows = [(i, v) for i, v in rows if v]
+        if not rows:
+            return
+        dims = len(rows[0][1])
+        matrix = np.zeros((len(self.ids), dims), dtype=np.float32)
+        for i, v in rows:
+            if len(v) == dims:
+                matrix[i] = v
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        self._matrix = matrix
+
+    # ---------- 打分 ----------
+
+    def bm25_scores(self, question: str):
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(index_terms(question)):
+            hit = self._bm25.get(term)
+            if hit is not None:
+                scores[hit[0]] += hit[1]
+        return scores
+
+    def vector_scores(self, questions: List[str], query_vectors=None):
+        """返回 (问题数 × 文档数) 的相似度矩阵；没有可用的向量时返回 None。
+
+        SBERT 模式为稠密 numpy 数组，需传入 query_vectors（每行一个查询向量），维度与节点向量不一致时返回 None；
+        TF-IDF 模式为 CSR 矩阵，列已换算为文档下标，只含与问题有共同词项的文档。
+        用 _row 取出第 i 个问题的分数交给 _fuse。
+        """
+        if self._matrix is not None:
+            if query_vectors is None:
+                return None
+            q = np.asarray(query_vectors, dtype=np.float32)
+            if q.ndim != 2 or q.shape[1] != self._matrix.shape[1]:
+                return None
+            q = q / (np.linalg.norm(q, axis=1, keepdims=True) + 1e-12)
+            return q @ self._matrix.T
+        if self._tfidf_rows is not None:
+            # 有 TF-IDF 索引说明已安装 scikit-learn，scipy 是其依赖
+            import scipy.sparse as sp
+            sparse = self.tfidf.scores(self.tfidf.transform(questions))
+            cols = self._tfidf_rows[sparse.indices]
+            keep = cols >= 0
+            indptr = np.concatenate([[0], np.cumsum(keep)])[sparse.indptr]
+            return sp.csr_matrix((sparse.data[keep], cols[keep], indptr), shape=(len(questions), len(self.ids)))
+        return None
+
+    @staticmethod
+    def _row(scores, i: int):
+        """第 i 个问题的分数：稠密时为一维数组，稀疏时为 (文档下标数组, 分数数组)。"""
+        if scores is None:
+            return None
+        if isinstance(scores, np.ndarray):
+            return scores[i]
+        start, end = scores.indptr[i], scores.indptr[i + 1]
+        return scores.indices[start:end], scores.data[start:end]
+
+    # ---------- 检索 ----------
+
+    def search(self, question: str, k: int, query_vector=None) -> List[Dict[str, Any]]:
+        """检索单个问题，返回融合后的前 k 条 {id, text, score, sources}。
+
+        sources 给出各路的 {rank, score}（bm25 / vector / ppr），只出现命中该节点的那几路；
+        启用 PPR 重排时 score 为融合分数与 PPR 分数的加权和。
+        """
+        qv = None if query_vector is None else [query_vector]
+        vec = self.vector_scores([question], qv)
+        return self._fuse(question, {'bm25': self.bm25_scores(question), 'vector': self._row(vec, 0)}, k)
+
+    def search_many(self, questions: List[str], k: int, query_vectors=None) -> List[List[Dict[str, Any]]]:
+        """批量检索：向量相似度按 RAG_BATCH_BLOCK 个问题一块做矩阵乘法。"""
+        out = []
+        for start in range(0, len(questions), RAG_BATCH_BLOCK):
+            block = questions[start:start + RAG_BATCH_BLOCK]
+            qv = None if query_vectors is None else query_vectors[start:start + RAG_BATCH_BLOCK]
+            vec = self.vector_scores(block, qv)
+            for i, question in enumerate(block):
+                out.append(self._fuse(question, {'bm25': self.bm25_scores(question), 'vector': self._row(vec, i)}, k))
+        return out
+
+    def _fuse(self, question: str, sources, k: int):
+        weights = {'vector': RAG_VECTOR_WEIGHT, 'bm25': 1.0 - RAG_VECTOR_WEIGHT}
+        n_candidates = max(k, k * RAG_CANDIDATE_FACTOR)
+        fused = {}
+        detail = {}
+        for name, scores in sources.items():
+            if scores is None:
+                continue
+            if isinstance(scores, tuple):
+                docs, values = scores
+                order = _top(values, n_candidates)
+                top, values = docs[order], values[order]
+            else:
+                top = _top(scores, n_candidates)
+                values = scores[top]
+            if not len(top):
+                continue
+            best = float(values[0])
+            for rank, (d, score) in enumerate(zip(top.tolist(), values.tolist()), 1):
+                detail.setdefault(d, {})[name] = {'rank': rank, 'score': round(score, 6)}
+                if RAG_FUSION == 'weighted':
+                    contrib = weights[name] * score / best
+                else:
+                    contrib = weights[name] / (RAG_RRF_K + rank)
+                fused[d] = fused.get(d, 0.0) + contrib
+        if RAG_PPR:
+            fused = self._rerank_ppr(question, fused, detail, n_candidates)
+
+        hits = []
+        seen = set()
+        for d in sorted(fused, key=lambda d: (-fused[d], d)):
+            text = self.texts[d]
+            if text in seen:
+                continue
+            seen.add(text)
+            hits.append({'id': self.ids[d], 'text': text, 'score': round(fused[d], 6),
+                         'sources': detail.get(d, {})})
+            if len(hits) >= k:
+                break
+        if not hits:
+            # 都没有命中：与关键词检索一致，返回前 k 条语料
+            hits = [{'id': self.ids[d], 'text': self.texts[d], 'score': 0.0, 'sources': {}}
+                    for d in range(min(k, len(self.ids)))]
+        return hits
+
+    # ---------- 个性化 PageRank ----------
+
+    def match_entities(self, question: str) -> List[int]:
+        """问题中出现的实体名对应的文档下标；逐个枚举问题的子串查名称表，开销与图规模无关。"""
+        q = (question or '').lower()
+        found = []
+        seen = set()
+        for i in range(len(q)):
+            for j in range(i + ENTITY_MIN_LEN, min(len(q), i + self._name_max) + 1):
+                for d in self._names.get(q[i:j], ()):
+                    if d not in seen:
+                        seen.add(d)
+                        found.append(d)
+        return found
+
+    def personalized_pagerank(self, seeds: Dict[int, float]):
+        """以 seeds（文档下标 -> 权重）为重启分布计算 PPR，返回长度为文档数的向量；不可用时返回 None。
+
+        热启动：从缓存中与本次种子重叠权重最大的结果出发，同一实体的追问通常几次迭代即收敛。
+        """
+        trans = self._transition()
+        if trans is None or not seeds:
+            return None
+        total = sum(seeds.values())
+        seeds = {d: w / total for d, w in seeds.items()}
+        key = tuple(sorted((d, round(w, 4)) for d, w in seeds.items()))
+        x0, best = None, 0.0
+        with self._ppr_lock:
+            for cached_key, vec in self._ppr_cache.items():
+                overlap = sum(min(w, seeds.get(d, 0.0)) for d, w in cached_key)
+                if overlap > best:
+                    x0, best = vec, overlap
+        started = time.perf_counter()
+        x, iterations = graph_ppr.personalized_pagerank(trans[0], trans[1], seeds, x0=x0)
+        RAG_PPR_DURATION.observe(time.perf_counter() - started)
+        RAG_PPR_ITERATIONS.observe(iterations, 'cold' if x0 is None else 'warm')
+        if RAG_PPR_CACHE > 0:
+            with self._ppr_lock:
+                self._ppr_cache[key] = x
+                self._ppr_cache.move_to_end(key)
+                while len(self._ppr_cache) > RAG_PPR_CACHE:
+                    self._ppr_cache.popitem(last=False)
+        return x
+
+    def _rerank_ppr(self, question, fused, detail, n_candidates):
+        """种子 = 问题中的实体（权重 1）+ 融合候选（权重为融合分数 / 最高分）；
+        候选 = 融合候选 ∪ 问题中的实体 ∪ PPR 最高的 n_candidates 个节点；
+        最终分数 = (1 - RAG_PPR_WEIGHT) × 基础分 + RAG_PPR_WEIGHT × PPR / 候选中最高 PPR，
+        基础分为融合分数 / 最高分，问题中点名的实体按最高分（1）计：两路都没召回它时融合分数为 0，
+        仅凭 PPR 一项会排到召回节点之后。
+        """
+        base = {d: 1.0 for d in self.match_entities(question)}
+        best = max(fused.values(), default=0.0)
+        for d, score in fused.items():
+            base[d] = max(base.get(d, 0.0), score / best)
+        x = self.personalized_pagerank(base)
+        if x is None:
+            return fused
+        top = _top(x, n_candidates)
+        for rank, d in enumerate(top.tolist(), 1):
+            detail.setdefault(d, {})['ppr'] = {'rank': rank, 'score': round(float(x[d]), 6)}
+        candidates = set(base) | set(top.tolist())
+        peak = max(float(x[d]) for d in candidates) or 1.0
+        return {d: (1.0 - RAG_PPR_WEIGHT) * base.get(d, 0.0) + RAG_PPR_WEIGHT * float(x[d]) / peak
+                for d in candidates}
+
+    def expand(self, question: str, hits: List[Dict[str, Any]], hops: int = RAG_EXPAND_HOPS,
+               limit: int = RAG_EXPAND_FACTS) -> List[Dict[str, Any]]:
+        """从命中节点（种子）出发，在邻接表上取 1~hops 跳内的关系，按相关度返回前 limit 条关系句。
+
+        一条边的相关度 = 种子权重（融合分数 / 最高分）× RAG_EXPAND_DECAY^(跳数-1)
+                       × (1 + 关系句与问题的共同词项数（见 index_terms） + 另一端同为种子时其权重)。
+        第 2 跳只从第 1 跳得分最高的 len(hits) 个邻居继续展开；每次查询最多检查 RAG_EXPAND_MAX_EDGES 条边，
+        因此开销只取决于种子的邻域大小，与全图规模无关。
+        返回 [{text, score, hop, source, target}]。
+        """
+        seeds = {}
+        best = max((h['score'] for h in hits), default=0.0) or 1.0
+        for h in hits:
+            d = self._pos.get(h['id'])
+            if d is not None:
+                seeds[d] = max(seeds.get(d, 0.0), (h['score'] or best) / best)
+        if not seeds or hops <= 0 or limit <= 0:
+            return []
+        q_tokens = set(index_terms(question))
+        budget = [RAG_EXPAND_MAX_EDGES]
+        facts = {}
+
+        def visit(frontier, hop):
+            reached = {}
+            for u, weight in frontier:
+                for v, r in self._adj[u]:
+                    if budget[0] <= 0:
+                        return reached
+                    budget[0] -= 1
+                    tokens = self._rel_tokens.get(r)
+                    if tokens is None:
+                        tokens = self._rel_tokens[r] = set(index_terms(self.rel_texts[r]))
+                    score = weight * (1 + len(q_tokens & tokens) + seeds.get(v, 0.0))
+                    if score > facts.get(r, (0.0,))[0]:
+                        facts[r] = (score, hop)
+                    if v not in seeds and score > reached.get(v, (0.0,))[0]:
+                        reached[v] = (score, weight)
+            return reached
+
+        reached = visit(sorted(seeds.items(), key=lambda x: -x[1]), 1)
+        for hop in range(2, hops + 1):
+            frontier = sorted(reached.items(), key=lambda x: -x[1][0])[:len(seeds)]
+            reached = visit([(v, weight * RAG_EXPAND_DECAY) for v, (_, weight) in frontier], hop)
+            if not reached:
+                break
+
+        out = []
+        for r, (score, hop) in sorted(facts.items(), key=lambda x: (-x[1][0], x[0]))[:limit]:
+            rel = self.rels[r]
+            out.append({'text': self.rel_texts[r], 'score': round(score, 6), 'hop': hop,
+                        'source': str(rel.get('source')), 'target': str(rel.get('target'))})
+        return out
+
+
+def load_node_vectors(gp) -> Optional[Dict[str, List[float]]]:
+    """读取节点向量：优先存储后端，其次 RAG 重建导出的文件；都没有时返回 None。"""
+    try:
+        emb_map = gp.load_embeddings_from_neo4j('embedding')
+    except Exception:
+        emb_map = None
+    if not emb_map:
+        try:
+            emb_map = gp.load_embeddings_from_file(EMBEDDINGS_FILE)
+        except Exception:
+            emb_map = None
+    return {str(k): v for k, v in emb_map.items()} if emb_map else None
+
+
+async def load_node_vectors_async(gp) -> Optional[Dict[str, List[float]]]:
+    """load_node_vectors 的异步版本：存储后端经 load_embeddings_async 读取（Neo4j 时走异步驱动）。"""
+    try:
+        emb_map = await gp.store.load_embeddings_async('embedding')
+    except Exception:
+        emb_map = None
+    if not emb_map:
+        try:
+            emb_map = await asyncio.to_thread(gp.load_embeddings_from_file, EMBEDDINGS_FILE)
+        except Exception:
+            emb_map = None
+    return {str(k): v for k, v in emb_map.items()} if emb_map else None
+
+
+def _current_tfidf(gp):
+    if gp._embed_model is not None:
+        return None
+    try:
+        return load_tfidf_index()
+    except Exception:
+        return None
+
+
+_index = None
+_loaded_at = 0.0
+_generation = 0
+_index_lock = threading.Lock()
+# 异步路径上正在进行的重建（asyncio.Task），同一事件循环内的并发请求共享
+_async_rebuild = None
+
+
+def invalidate_hybrid_index() -> None:
+    """节点向量变化（如 RAG 重建结束）后调用；向量写入不改变图版本，需单独失效。"""
+    global _generation
+    with _index_lock:
+        _generation += 1
+
+
+def _is_fresh(index, gp) -> bool:
+    return (
+        index is not None
+        and index.version == get_graph_version()
+        and index.generation == _generation
+        and time.time() - _loaded_at < RAG_INDEX_TTL
+        and index.dense == (gp._embed_model is not None)
+        and (index.dense or index.tfidf is _current_tfidf(gp))
+    )
+
+
+def get_hybrid_index(gp, force: bool = False) -> HybridIndex:
+    """返回与当前图版本、向量版本一致的索引；过期时从 gp.store 全量重建（并发请求只重建一次）。"""
+    global _index, _loaded_at
+    index = _index
+    if not force and _is_fresh(index, gp):
+        return index
+    with _index_lock:
+        index = _index
+        if force or not _is_fresh(index, gp):
+            version, generation = get_graph_version(), _generation
+            nodes, rels = gp.store.read_all()
+            if gp._embed_model is not None:
+                index = HybridIndex(nodes, rels, vectors=load_node_vectors(gp) or {},
+                                    version=version, generation=generation)
+            else:
+                index = HybridIndex(nodes, rels, tfidf=_current_tfidf(gp), version=version, generation=generation)
+            _index = index
+            _loaded_at = time.time()
+    return index
+
+
+async def _rebuild_async(gp) -> HybridIndex:
+    global _index, _loaded_at
+    version, generation = get_graph_version(), _generation
+    nodes, rels = await gp.store.read_all_async()
+    if gp._embed_model is not None:
+        vectors = await load_node_vectors_async(gp) or {}
+        index = await asyncio.to_thread(HybridIndex, nodes, rels, vectors=vectors, version=version,
+                                        generation=generation)
+    else:
+        tfidf = await asyncio.to_thread(_current_tfidf, gp)
+        index = await asyncio.to_thread(HybridIndex, nodes, rels, tfidf=tfidf, version=version, generation=generation)
+    with _index_lock:
+        _index = index
+        _loaded_at = time.time()
+    return index
+
+
+async def get_hybrid_index_async(gp) -> HybridIndex:
+    """get_hybrid_index 的异步版本：图数据与节点向量经 gp.store 的异步方法读取，等待数据库时不占用线程，
+    只有构建倒排表等计算放到线程中；同一事件循环内的并发请求共享一次重建。"""
+    global _async_rebuild
+    index = peek_hybrid_index(gp)
+    if index is not None:
+        return index
+    task = _async_rebuild
+    # 已结束的重建要么失败、要么其结果已经过期，需要重新开始
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        task = _async_rebuild = asyncio.ensure_future(_rebuild_async(gp))
+    # shield：某个请求被取消时不影响共享同一重建的其他请求
+    return await asyncio.shield(task)
+
+
+def peek_hybrid_index(gp) -> Optional[HybridIndex]:
+    """不触发重建：索引仍然有效时返回它，否则返回 None（供事件循环判断是否需要转到线程中构建）。"""
+    index = _index
+    return index if _is_fresh(index, gp) else None
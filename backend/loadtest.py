@@ -0,0 +1,318 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+# 可用路由：名称 -> (方法, 路径模板, 请求体模板)；{name}/{name2} 在运行时替换为数据集中的随机人物姓名
+ROUTES = {
+    'graph': ('GET', '/api/graph', None),
+    'stats': ('GET', '/api/graph/stats', None),
+    'ai': ('POST', '/api/ai_ask', {'question': '{name}和{name2}是什么关系？'}),
+    'search': ('GET', '/api/search?keyword={name}&field=all', None),
+    'autocomplete': ('GET', '/api/autocomplete?prefix={name}', None),
+    'path': ('GET', '/api/network/path?start={name}&end={name2}', None),
+    'recommend': ('GET', '/api/network/recommend?id={id}', None),
+}
+DEFAULT_MIX = 'graph=3,stats=2,ai=1'
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in ROUTES:
+            raise ValueError(f'未知路由: {name}（可选：{", ".join(ROUTES)}）')
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """最近秩法百分位数；sorted_values 须已升序排列。"""
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-q * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _summarize(samples: List[Tuple[int, float]], elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(lat for _, lat in samples)
+    statuses = Counter(str(status) for status, _ in samples)
+    errors = sum(1 for status, _ in samples if status == 0 or status >= 400)
+    count = len(samples)
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'requests': count,
+        'errors': errors,
+        'errorRate': round(errors / count, 4) if count else 0.0,
+        'throughput': round(count / elapsed, 2) if elapsed > 0 else None,
+        'latencyMs': {
+            'mean': ms(sum(latencies) / count) if count else None,
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1]) if latencies else None,
+        },
+        'statusCodes': dict(statuses),
+    }
+
+
+class LoadTest:
+    """并发压测：users 个虚拟用户各自循环按权重随机选择路由发起请求，直到时长或总请求数用完。
+
+    每个用户持有独立的 HTTP 连接；状态码 0 表示连接失败或超时。
+    """
+
+    def __init__(self, base_url: str, mix: List[Tuple[str, float]], users: int, duration: Optional[float],
+                 total_requests: Optional[int], ramp_up: float, timeout: float, people: List[Dict[str, Any]],
+                 seed: int = 0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.mix = mix
+        self.users = users
+        self.duration = duration
+        self.total_requests = total_requests
+        self.ramp_up = ramp_up
+        self.timeout = timeout
+        self.people = people or [{'id': '', 'name': ''}]
+        self.seed = seed
+        self._samples = defaultdict(list)
+        self._lock = threading.Lock()
+        self._issued = 0
+        self._deadline = None
+
+    def _next_ticket(self) -> bool:
+        with self._lock:
+            if self.total_requests is not None and self._issued >= self.total_requests:
+                return False
+            if self._deadline is not None and time.monotonic() >= self._deadline:
+                return False
+            self._issued += 1
+            return True
+
+    def _request(self, rng: random.Random):
+        route = rng.choices([m[0] for m in self.mix], weights=[m[1] for m in self.mix])[0]
+        return (route,) + self._render(route, rng)
+
+    def _render(self, route: str, rng: random.Random):
+        method, path, body = ROUTES[route]
+        a, b = rng.choice(self.people), rng.choice(self.people)
+        values = {'name': a['name'], 'name2': b['name'], 'id': a['id']}
+        path = path.format(**{k: quote(str(v)) for k, v in values.items()})
+        if body is not None:
+            body = json.dumps({k: v.format(**values) for k, v in body.items()}, ensure_ascii=False).encode('utf-8')
+        return method, path, body
+
+    def preflight(self, attempts: int = 3) -> List[str]:
+        """正式压测前把 mix 中每个路由各请求一次，返回始终失败（5xx 或连接失败）的路由说明。
+
+        例如在 SQLite 后端上压测仍依赖 Cypher 的路由：每个请求都会失败，压测结果没有意义，应尽早报错。
+        失败时最多重试 attempts 次，避免模拟大模型的随机错误造成误判。
+        """
+        rng = random.Random(self.seed)
+        problems = []
+        for name, _ in self.mix:
+            for _ in range(attempts):
+                method, path, body = self._render(name, rng)
+                try:
+                    status, detail = _http_json(f'http://{self.host}:{self.port}', method, path, body=body,
+                                                timeout=self.timeout)
+                except Exception as e:
+                    status, detail = 0, str(e)
+                if 0 < status < 500:
+                    break
+            else:
+                if isinstance(detail, dict):
+                    detail = detail.get('error', detail)
+                problems.append(f'{name}（{method} {path}）: {status} {detail}')
+        return problems
+
+    def _user(self, index: int):
+        rng = random.Random(self.seed * 100003 + index)
+        if self.ramp_up:
+            time.sleep(self.ramp_up * index / max(1, self.users))
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        while self._next_ticket():
+            route, method, path, body = self._request(rng)
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                status = resp.status
+            except Exception:
+                status = 0
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            latency = time.perf_counter() - start
+            with self._lock:
+                self._samples[route].append((status, latency))
+        conn.close()
+
+    def run(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        if self.duration is not None:
+            self._deadline = started + self.ramp_up + self.duration
+        threads = [threading.Thread(target=self._user, args=(i,), daemon=True) for i in range(self.users)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - started
+
+        all_samples = [s for samples in self._samples.values() for s in samples]
+        return {
+            'elapsedSeconds': round(elapsed, 3),
+            'users': self.users,
+            'overall': _summarize(all_samples, elapsed),
+            'routes': {route: _summarize(samples, elapsed) for route, samples in sorted(self._samples.items())},
+        }
+
+
+def _start_local_app(store: str):
+    """在本进程内以多线程 WSGI 服务启动应用（须在设置好环境变量之后调用）。"""
+    os.environ['GRAPH_STORE'] = store
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import app
+
+    class QuietHandler(WSGIRequestHandler):
+        # 逐请求访问日志在高并发下本身就是瓶颈
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    return server, base_url
+
+
+def _http_json(base_url: str, method: str, path: str, timeout: float = 600, body: Optional[bytes] = None):
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        resp = conn.getresponse()
+        data = resp.read()
+        try:
+            return resp.status, json.loads(data or b'null')
+        except ValueError:
+            return resp.status, data.decode('utf-8', 'replace')[:200]
+    finally:
+        conn.close()
+
+
+def _print_table(report: Dict[str, Any]) -> None:
+    header = f"{'route':<14}{'reqs':>8}{'err%':>8}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+    print(header, file=sys.stderr)
+    rows = list(report['routes'].items()) + [('overall', report['overall'])]
+    for name, s in rows:
+        lat = s['latencyMs']
+        print(f"{name:<14}{s['requests']:>8}{s['errorRate'] * 100:>7.1f}%{s['throughput'] or 0:>9.1f}"
+              f"{lat['p50'] or 0:>10.1f}{lat['p95'] or 0:>10.1f}{lat['p99'] or 0:>10.1f}{lat['max'] or 0:>10.1f}",
+              file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='API 并发压测：输出各路由吞吐量、p50/p95/p99 延迟与错误率（JSON）')
+    parser.add_argument('--url', help='目标服务地址；缺省时在本进程内启动应用')
+    parser.add_argument('--store', choices=('sqlite', 'neo4j'), default='sqlite', help='本地启动应用时使用的存储后端')
+    parser.add_argument('--dataset', default='journey-to-west',
+                        help='压测前通过 /api/init 载入的数据集（如 synthetic-ba-10000）；传空字符串跳过')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'路由权重，如 {DEFAULT_MIX}')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=30.0, help='压测时长（秒）')
+    parser.add_argument('--requests', type=int, help='总请求数上限（与时长先到者为准）')
+    parser.add_argument('--ramp-up', type=float, default=0.0, help='用户逐步启动的总时长（秒）')
+    parser.add_argument('--timeout', type=float, default=60.0, help='单个请求超时（秒）')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='模拟大模型的响应延迟（秒）')
+    parser.add_argument('--llm-jitter', type=float, default=0.2)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--real-llm', action='store_true', help='不启动模拟大模型，使用 LLM_BASE_URL 配置的真实服务')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-preflight', action='store_true', help='跳过压测前对各路由的可用性检查')
+    parser.add_argument('--out', help='JSON 报告输出文件，缺省输出到标准输出')
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    mock = None
+    server = None
+    if not args.url and not args.real_llm:
+        from mock_llm import MockLLMServer
+        mock = MockLLMServer(latency=args.llm_latency, jitter=args.llm_jitter, error_rate=args.llm_error_rate).start()
+        os.environ['LLM_BASE_URL'] = mock.base_url
+        os.environ['LLM_API_KEY'] = 'mock'
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        server, base_url = _start_local_app(args.store)
+
+    try:
+        if args.dataset:
+            status, body = _http_json(base_url, 'POST', f'/api/init?dataset={quote(args.dataset)}')
+            if status >= 400:
+                raise SystemExit(f'数据初始化失败: {status} {body}')
+            # 等待初始化触发的后台 RAG 重建结束，避免其与压测争用 CPU
+            job_id = (body or {}).get('ragJobId')
+            while job_id is not None:
+                status, job = _http_json(base_url, 'GET', f'/api/rag/jobs/{job_id}')
+                if status >= 400 or job.get('status') in ('succeeded', 'failed'):
+                    break
+                time.sleep(0.5)
+        status, graph = _http_json(base_url, 'GET', '/api/graph')
+        people = [{'id': n.get('id'), 'name': n.get('name')} for n in (graph or {}).get('nodes', []) if n.get('name')]
+        print(f'目标 {base_url}，{len(people)} 个人物，{args.users} 个并发用户', file=sys.stderr)
+
+        test = LoadTest(base_url, mix, args.users, args.duration, args.requests, args.ramp_up, args.timeout,
+                        people, seed=args.seed)
+        if not args.no_preflight:
+            problems = test.preflight()
+            if problems:
+                raise SystemExit('以下路由在目标服务上不可用（如仍依赖 Neo4j，可改用 --store neo4j 或从 --mix 中去掉）：\n  '
+                                 + '\n  '.join(problems))
+        report = test.run()
+        report['config'] = {
+            'url': args.url,
+            'store': None if args.url else args.store,
+            'dataset': args.dataset,
+            'mix': dict(mix),
+            'users': args.users,
+            'duration': args.duration,
+            'requests': args.requests,
+            'rampUp': args.ramp_up,
+            'llm': None if mock is None else {
+                'latency': args.llm_latency,
+                'jitter': args.llm_jitter,
+                'errorRate': args.llm_error_rate,
+                'calls': mock.requests
+            },
+        }
+    finally:
+        if server is not None:
+            server.shutdown()
+        if mock is not None:
+            mock.stop()
+
+    _print_table(report)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
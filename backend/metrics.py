@@ -0,0 +1,209 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Prometheus 客户端库的默认延迟分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _fmt(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    """单调递增计数器；标签值按 labelnames 顺序以位置参数传入。"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f'{self.name}{_labels(self.labelnames, k)} {_fmt(v)}' for k, v in items]
+
+
+class Gauge(Counter):
+    """可增可减的瞬时值（如进行中的请求数）。"""
+
+    kind = 'gauge'
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """累积分桶直方图；每次观测只做一次二分查找与一次加锁更新。"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [各桶计数..., +Inf 桶计数, 总和]
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = self._header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = 'le="' + _fmt(bound) + '"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_fmt(series[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+# 采集时调用的回调：返回完整的指标文本行（含 HELP/TYPE），用于连接池等按需读取的状态
+_collectors: List[Callable[[], List[str]]] = []
+
+
+def add_collector(fn: Callable[[], List[str]]) -> None:
+    _collectors.append(fn)
+
+
+def render() -> str:
+    lines = []
+    for metric in list(REGISTRY):
+        lines.extend(metric.render())
+    for fn in list(_collectors):
+        try:
+            lines.extend(fn())
+        except Exception as e:
+            lines.append(f'# collector {getattr(fn, "__name__", fn)} failed: {_escape(e)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ============ HTTP 请求指标 ============
+
+HTTP_REQUESTS = Counter('http_requests_total', 'HTTP 请求数', ('route', 'method', 'status'))
+HTTP_DURATION = Histogram('http_request_duration_seconds', 'HTTP 请求处理耗时', ('route', 'method'))
+HTTP_IN_FLIGHT = Gauge('http_requests_in_flight', '正在处理的 HTTP 请求数', ('route',))
+HTTP_EXCEPTIONS = Counter('http_request_exceptions_total', '未捕获异常导致失败的 HTTP 请求数', ('route',))
+
+# ============ Neo4j 查询指标（由 neo4j_ops 的托管事务记录） ============
+
+QUERY_DURATION = Histogram('neo4j_query_duration_seconds', 'Neo4j 事务耗时（含重试）', ('query', 'mode'))
+QUERY_IN_FLIGHT = Gauge('neo4j_queries_in_flight', '正在执行的 Neo4j 事务数', ('query',))
+QUERY_ROWS = Counter('neo4j_query_rows_total', 'Neo4j 查询返回的行数', ('query',))
+QUERY_ERRORS = Counter('neo4j_query_errors_total', '失败的 Neo4j 事务数', ('query',))
+
+# ============ 并发请求合并指标（见 singleflight） ============
+
+SINGLEFLIGHT_CALLS = Counter('singleflight_calls_total', '经过合并层的调用数：leader 实际执行，follower 共享其结果',
+                             ('group', 'role'))
+SINGLEFLIGHT_IN_FLIGHT = Gauge('singleflight_in_flight', '正在执行的合并调用数', ('group',))
+SINGLEFLIGHT_FAILURES = Counter('singleflight_failures_total', '执行失败的合并调用数（所有等待方收到同一错误）', ('group',))
+SINGLEFLIGHT_CANCELLED = Counter('singleflight_cancelled_total', '因全部等待方取消而中止的合并调用数', ('group',))
+
+# ============ RAG 重建任务指标（见 rag_jobs） ============
+
+RAG_JOBS = Counter('rag_rebuild_jobs_total', 'RAG 重建任务数（按状态：queued 为新建，其余为结束状态）', ('status',))
+RAG_JOB_DURATION = Histogram('rag_rebuild_duration_seconds', 'RAG 重建任务耗时', ('status',),
+                             buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0))
+
+# ============ 查询向量指标（见 query_embed） ============
+
+QUERY_EMBED_CACHE = Counter('query_embed_cache_total', '查询向量缓存查找次数', ('result',))
+QUERY_EMBED_BATCH_SIZE = Histogram('query_embed_batch_size', '每次编码调用合并的查询数', (),
+                                   buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+QUERY_EMBED_DURATION = Histogram('query_embed_batch_duration_seconds', '每次批量编码耗时')
+
+# ============ 个性化 PageRank 重排指标（见 hybrid_retriever） ============
+
+RAG_PPR_ITERATIONS = Histogram('rag_ppr_iterations', '每次个性化 PageRank 的幂迭代次数', ('start',),
+                               buckets=(1, 2, 5, 10, 20, 50, 100))
+RAG_PPR_DURATION = Histogram('rag_ppr_duration_seconds', '每次个性化 PageRank 的耗时（不含转移矩阵构建）', (),
+                             buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+
+
+def init_app(app) -> None:
+    """为 Flask 应用安装请求计时钩子并注册 GET /metrics（Prometheus 文本格式）。
+
+    路由标签使用 URL 规则模板（如 /api/persons/<person_id>），避免路径参数导致标签基数膨胀。
+    """
+    from flask import Response, g, request
+
+    def _route():
+        rule = request.url_rule
+        return rule.rule if rule is not None else '<unmatched>'
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_route = _route()
+        g._metrics_start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc(g._metrics_route)
+
+    @app.after_request
+    def _metrics_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        route = g.pop('_metrics_route')
+        status = g.pop('_metrics_status', 500)
+        HTTP_IN_FLIGHT.dec(route)
+        HTTP_DURATION.observe(time.perf_counter() - start, route, request.method)
+        HTTP_REQUESTS.inc(route, request.method, str(status))
+        if exc is not None:
+            HTTP_EXCEPTIONS.inc(route)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
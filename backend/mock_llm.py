@@ -0,0 +1,113 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 固定回答：不含编号等技术性内容，便于通过 ai_ask 的后处理
+DEFAULT_ANSWER = '根据图中人物关系可以确认：两人是师徒关系，依据是相关人物描述中提到的拜师经历。'
+
+
+class _Server(ThreadingHTTPServer):
+    # 默认监听队列只有 5，数千个并发连接会被拒绝后重试，测出的是服务器而不是被测应用
+    request_queue_size = 4096
+    daemon_threads = True
+
+
+class MockLLMServer:
+    """兼容 OpenAI Chat Completions 接口的本地模拟服务，用于压测时替代真实大模型。
+
+    每个请求固定延迟 latency 秒，并叠加 [0, jitter) 的均匀抖动；error_rate 比例的请求返回 500。
+    在后台线程中运行，`base_url` 可直接作为 OpenAI 客户端的 base_url。
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.5, jitter: float = 0.0,
+                 error_rate: float = 0.0, answer: str = DEFAULT_ANSWER):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.answer = answer
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                with server._lock:
+                    server.requests += 1
+                time.sleep(server.latency + random.random() * server.jitter)
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self._send(404, {'error': {'message': f'unknown path {self.path}'}})
+                    return
+                if server.error_rate and random.random() < server.error_rate:
+                    self._send(500, {'error': {'message': 'mock failure', 'type': 'server_error'}})
+                    return
+                self._send(200, {
+                    'id': f'chatcmpl-mock-{server.requests}',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': payload.get('model', 'mock'),
+                    'choices': [{
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': server.answer},
+                        'finish_reason': 'stop'
+                    }],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+                })
+
+        return Handler
+
+    def start(self) -> 'MockLLMServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OpenAI 兼容的模拟大模型服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8808)
+    parser.add_argument('--latency', type=float, default=0.5, help='每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='叠加的随机延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    server = MockLLMServer(args.host, args.port, args.latency, args.jitter, args.error_rate).start()
+    print(f'模拟大模型服务已启动：LLM_BASE_URL={server.base_url}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
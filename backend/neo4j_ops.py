@@ -1,7 +1,13 @@
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase, GraphDatabase, READ_ACCESS, WRITE_ACCESS
 import os
 import json
+import itertools
+import queue
+import random
 import re
+import threading
+import time
+from collections import deque
 from datetime import datetime, timedelta
 
 import sys
@@ -24,18 +30,527 @@ except Exception:
         except Exception:
             load_sample_data = None
 
+from metrics import QUERY_DURATION, QUERY_IN_FLIGHT, QUERY_ROWS, QUERY_ERRORS, add_collector
+
 # Neo4j 配置（从环境变量读取）
 NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
 NEO4J_USER = os.getenv('NEO4J_USER', 'neo4j')
 NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', '88888888')
 
-try:
-    neo4j_driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-    neo4j_driver.verify_connectivity()
-except Exception as e:
-    print(f"✗ Neo4j 连接失败: {e}")
-    print("请确保 Neo4j 数据库正在运行（模块将继续加载，但后续 Neo4j 调用会失败）")
-    neo4j_driver = None
+NEO4J_DATABASE = os.getenv('NEO4J_DATABASE') or None
+# 连接池与事务配置：池大小需覆盖并发请求数，否则请求会在获取连接处排队直至超时
+NEO4J_MAX_POOL_SIZE = int(os.getenv('NEO4J_MAX_POOL_SIZE', '100'))
+NEO4J_MAX_CONN_LIFETIME = float(os.getenv('NEO4J_MAX_CONN_LIFETIME', '3600'))
+NEO4J_ACQUIRE_TIMEOUT = float(os.getenv('NEO4J_ACQUIRE_TIMEOUT', '30'))
+NEO4J_FETCH_SIZE = int(os.getenv('NEO4J_FETCH_SIZE', '1000'))
+# 托管事务遇到瞬时错误（死锁、主节点切换、连接中断等）时按指数退避重试的总时长上限
+NEO4J_MAX_RETRY_TIME = float(os.getenv('NEO4J_MAX_RETRY_TIME', '15'))
+
+# 慢查询日志：事务耗时超过阈值（毫秒，<= 0 关闭）时记录语句与参数；
+# 抽样的慢读查询会在后台以 PROFILE 在只读会话中重跑一次，保存各算子的 db hits 与行数
+NEO4J_SLOW_QUERY_MS = float(os.getenv('NEO4J_SLOW_QUERY_MS', '500'))
+NEO4J_SLOW_QUERY_LOG_SIZE = int(os.getenv('NEO4J_SLOW_QUERY_LOG_SIZE', '200'))
+NEO4J_SLOW_QUERY_PROFILE_RATE = float(os.getenv('NEO4J_SLOW_QUERY_PROFILE_RATE', '1.0'))
+# 同一语句两次 PROFILE 之间的最短间隔（秒），避免反复重跑同一个慢查询给数据库加压
+NEO4J_SLOW_QUERY_PROFILE_INTERVAL = float(os.getenv('NEO4J_SLOW_QUERY_PROFILE_INTERVAL', '300'))
+
+# 存储后端（见 graph_store）：使用嵌入式后端时不连接 Neo4j
+GRAPH_STORE = os.getenv('GRAPH_STORE', 'neo4j').lower()
+
+neo4j_driver = None
+if GRAPH_STORE == 'neo4j':
+    try:
+        neo4j_driver = GraphDatabase.driver(
+            NEO4J_URI,
+            auth=(NEO4J_USER, NEO4J_PASSWORD),
+            max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+            max_connection_lifetime=NEO4J_MAX_CONN_LIFETIME,
+            connection_acquisition_timeout=NEO4J_ACQUIRE_TIMEOUT,
+            max_transaction_retry_time=NEO4J_MAX_RETRY_TIME,
+            fetch_size=NEO4J_FETCH_SIZE
+        )
+        neo4j_driver.verify_connectivity()
+    except Exception as e:
+        print(f"✗ Neo4j 连接失败: {e}")
+        print("请确保 Neo4j 数据库正在运行（模块将继续加载，但后续 Neo4j 调用会失败），"
+              "或设置 GRAPH_STORE=sqlite 使用嵌入式存储")
+        neo4j_driver = None
+
+
+# ============ 数据访问层：托管事务 ============
+
+_pool_stats_lock = threading.Lock()
+_pool_stats = {
+    'inUse': 0,            # 当前由本模块持有的会话数（每个会话执行事务时占用一个连接）
+    'peakInUse': 0,
+    'transactions': 0,     # 成功提交的事务数
+    'retries': 0,          # 驱动因瞬时错误重放事务函数的次数
+    'failures': 0,         # 重试耗尽或非瞬时错误导致失败的事务数
+}
+
+
+def _stat_add(key, delta=1):
+    with _pool_stats_lock:
+        _pool_stats[key] += delta
+        if key == 'inUse' and _pool_stats['inUse'] > _pool_stats['peakInUse']:
+            _pool_stats['peakInUse'] = _pool_stats['inUse']
+
+
+def get_pool_stats():
+    """连接池使用情况与事务计数，供监控接口展示。"""
+    with _pool_stats_lock:
+        stats = dict(_pool_stats)
+    stats.update({
+        'connected': neo4j_driver is not None,
+        'maxPoolSize': NEO4J_MAX_POOL_SIZE,
+        'utilization': round(stats['inUse'] / NEO4J_MAX_POOL_SIZE, 4) if NEO4J_MAX_POOL_SIZE else None,
+        'maxConnectionLifetime': NEO4J_MAX_CONN_LIFETIME,
+        'acquisitionTimeout': NEO4J_ACQUIRE_TIMEOUT,
+        'fetchSize': NEO4J_FETCH_SIZE,
+        'maxRetryTime': NEO4J_MAX_RETRY_TIME,
+    })
+    return stats
+
+
+def _pool_metrics():
+    stats = get_pool_stats()
+    lines = []
+    for key, metric, kind, doc in (
+            ('inUse', 'neo4j_pool_sessions_in_use', 'gauge', '当前占用的 Neo4j 会话数'),
+            ('maxPoolSize', 'neo4j_pool_max_size', 'gauge', 'Neo4j 连接池上限'),
+            ('transactions', 'neo4j_transactions_total', 'counter', '已提交的 Neo4j 事务数'),
+            ('retries', 'neo4j_transaction_retries_total', 'counter', 'Neo4j 事务因瞬时错误重试的次数'),
+            ('failures', 'neo4j_transaction_failures_total', 'counter', '失败的 Neo4j 事务数')):
+        lines += [f'# HELP {metric} {doc}', f'# TYPE {metric} {kind}', f'{metric} {stats[key]}']
+    return lines
+
+
+add_collector(_pool_metrics)
+
+
+class QueryResult(list):
+    """事务内全部取回的查询结果：可迭代的 Record 列表，兼容 `result.single()` 的用法。"""
+
+    def single(self):
+        return self[0] if self else None
+
+    def data(self):
+        return [dict(record) for record in self]
+
+
+class Neo4jUnavailableError(RuntimeError):
+    """功能需要 Neo4j 但当前不可用：存储后端不是 Neo4j 时 status 为 501，Neo4j 未连接时为 503。"""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+def _neo4j_unavailable():
+    if GRAPH_STORE != 'neo4j':
+        return Neo4jUnavailableError(f'当前存储后端为 {GRAPH_STORE}，该功能需要 Neo4j', 501)
+    return Neo4jUnavailableError('Neo4j 未连接', 503)
+
+
+def _open_session(access_mode):
+    if neo4j_driver is None:
+        raise _neo4j_unavailable()
+    return neo4j_driver.session(database=NEO4J_DATABASE, default_access_mode=access_mode)
+
+
+# ============ 慢查询日志 ============
+
+_slow_lock = threading.Lock()
+_slow_queries = deque(maxlen=max(1, NEO4J_SLOW_QUERY_LOG_SIZE))
+_slow_ids = itertools.count(1)
+_last_profiled = {}
+_profile_queue = queue.Queue(maxsize=32)
+_profile_worker = None
+# PROFILE 会真正执行语句，含写子句的语句一律不重跑
+_WRITE_CLAUSE = re.compile(r'\b(CREATE|MERGE|SET|DELETE|REMOVE|DETACH|LOAD\s+CSV|FOREACH)\b', re.IGNORECASE)
+_MAX_PROFILED_STATEMENTS = 5
+
+
+class _RecordingTx:
+    """转发到驱动的事务对象，同时记下执行过的语句与参数，供慢查询日志使用。"""
+
+    def __init__(self, tx):
+        self._tx = tx
+        self.statements = []
+
+    def run(self, query, parameters=None, **kwargs):
+        self.statements.append((query, dict(parameters or {}, **kwargs)))
+        return self._tx.run(query, parameters, **kwargs)
+
+    def __getattr__(self, item):
+        return getattr(self._tx, item)
+
+
+def _brief(value, depth=0):
+    """截断过长的参数值（如批量导入的行列表），日志只保留可读的摘要。"""
+    if isinstance(value, str):
+        return value if len(value) <= 200 else value[:200] + f'…（共 {len(value)} 字符）'
+    if isinstance(value, (list, tuple)):
+        items = [_brief(v, depth + 1) for v in value[:10]]
+        if len(value) > 10:
+            items.append(f'…（共 {len(value)} 项）')
+        return items
+    if isinstance(value, dict):
+        if depth > 2:
+            return '{…}'
+        return {str(k): _brief(v, depth + 1) for k, v in value.items()}
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return str(value)
+
+
+def _plan_tree(plan):
+    """把驱动返回的 PROFILE 计划（嵌套字典）整理为前端可直接展示的算子树。"""
+    args = plan.get('args') or plan.get('arguments') or {}
+    return {
+        'operator': plan.get('operatorType'),
+        'details': args.get('Details'),
+        'identifiers': list(plan.get('identifiers') or []),
+        'rows': plan.get('rows'),
+        'estimatedRows': args.get('EstimatedRows'),
+        'dbHits': plan.get('dbHits'),
+        'pageCacheHits': plan.get('pageCacheHits'),
+        'pageCacheMisses': plan.get('pageCacheMisses'),
+        'time': plan.get('time'),
+        'children': [_plan_tree(child) for child in plan.get('children') or []],
+    }
+
+
+def _sum_db_hits(node):
+    return (node.get('dbHits') or 0) + sum(_sum_db_hits(child) for child in node['children'])
+
+
+def _profile_statements(tx, statements):
+    plans = []
+    for query, parameters in statements:
+        summary = tx.run('PROFILE ' + query, parameters).consume()
+        plan = _plan_tree(summary.profile) if summary.profile else None
+        runtime = ((summary.profile or {}).get('args') or {}).get('runtime')
+        plans.append({
+            'query': query,
+            'runtime': runtime,
+            'totalDbHits': _sum_db_hits(plan) if plan else None,
+            'plan': plan,
+        })
+    return plans
+
+
+def _run_profiles():
+    while True:
+        entry, statements = _profile_queue.get()
+        # 整体替换 profile 字典而不是原地修改，接口读取时不会看到半更新的状态
+        entry['profile'] = {'status': 'running'}
+        _stat_add('inUse')
+        try:
+            with _open_session(READ_ACCESS) as session:
+                plans = session.execute_read(_profile_statements, statements)
+            entry['profile'] = {'status': 'done', 'statements': plans}
+        except Exception as e:
+            entry['profile'] = {'status': 'failed', 'error': str(e)}
+        finally:
+            _stat_add('inUse', -1)
+            _profile_queue.task_done()
+
+
+def _profile_candidates(mode, statements, error):
+    """判断慢查询是否需要 PROFILE：仅限成功的读事务、抽样命中且同一语句近期未分析过。"""
+    if mode != 'read' or error is not None or not statements:
+        return None, '仅对成功的读事务做 PROFILE'
+    statements = [(q, p) for q, p in statements if not _WRITE_CLAUSE.search(q)]
+    statements = [(q, p) for q, p in statements if not q.lstrip().upper().startswith(('PROFILE', 'EXPLAIN'))]
+    if not statements:
+        return None, '语句包含写子句'
+    if random.random() >= NEO4J_SLOW_QUERY_PROFILE_RATE:
+        return None, '未被抽样'
+    now = time.monotonic()
+    with _slow_lock:
+        fresh = [(q, p) for q, p in statements
+                 if now - _last_profiled.get(q, float('-inf')) >= NEO4J_SLOW_QUERY_PROFILE_INTERVAL]
+        if not fresh:
+            return None, f'同一语句 {NEO4J_SLOW_QUERY_PROFILE_INTERVAL:g} 秒内已分析过'
+        for q, _ in fresh:
+            _last_profiled[q] = now
+    return fresh[:_MAX_PROFILED_STATEMENTS], None
+
+
+def _record_slow_query(name, mode, duration, statements, error):
+    global _profile_worker
+    entry = {
+        'id': next(_slow_ids),
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'name': name,
+        'mode': mode,
+        'durationMs': round(duration * 1000, 2),
+        'error': None if error is None else str(error),
+        'statements': [{'query': q, 'parameters': _brief(p)} for q, p in statements],
+    }
+    candidates, reason = _profile_candidates(mode, statements, error)
+    if candidates is None:
+        entry['profile'] = {'status': 'skipped', 'reason': reason}
+    else:
+        entry['profile'] = {'status': 'pending'}
+        try:
+            _profile_queue.put_nowait((entry, candidates))
+        except queue.Full:
+            entry['profile'] = {'status': 'skipped', 'reason': 'PROFILE 队列已满'}
+        else:
+            with _slow_lock:
+                if _profile_worker is None:
+                    _profile_worker = threading.Thread(target=_run_profiles, name='slow-query-profiler', daemon=True)
+                    _profile_worker.start()
+    with _slow_lock:
+        _slow_queries.append(entry)
+    print(f"慢查询 #{entry['id']} {name} ({mode}) 耗时 {entry['durationMs']:.0f} ms")
+
+
+def get_slow_queries(limit=50):
+    """最近的慢查询（新的在前）；列表中不含完整执行计划，只给出每条语句的 db hits 合计。"""
+    with _slow_lock:
+        entries = list(_slow_queries)[::-1][:limit]
+    items = []
+    for entry in entries:
+        item = {k: v for k, v in entry.items() if k != 'profile'}
+        profile = entry['profile']
+        item['profile'] = {k: v for k, v in profile.items() if k != 'statements'}
+        if 'statements' in profile:
+            item['profile']['totalDbHits'] = [s['totalDbHits'] for s in profile['statements']]
+        items.append(item)
+    return {
+        'thresholdMs': NEO4J_SLOW_QUERY_MS,
+        'profileRate': NEO4J_SLOW_QUERY_PROFILE_RATE,
+        'profileInterval': NEO4J_SLOW_QUERY_PROFILE_INTERVAL,
+        'count': len(items),
+        'entries': items,
+    }
+
+
+def get_slow_query(entry_id):
+    with _slow_lock:
+        for entry in _slow_queries:
+            if entry['id'] == entry_id:
+                return dict(entry)
+    return None
+
+
+def clear_slow_queries():
+    with _slow_lock:
+        _slow_queries.clear()
+        _last_profiled.clear()
+
+
+def _managed(access_mode, name, work, args, kwargs):
+    attempts = [0]
+    recorder = [None]
+
+    def _work(tx):
+        attempts[0] += 1
+        if attempts[0] > 1:
+            _stat_add('retries')
+        if NEO4J_SLOW_QUERY_MS > 0:
+            # 重试时重新记录，只保留最后一次执行的语句
+            tx = recorder[0] = _RecordingTx(tx)
+        return work(tx, *args, **kwargs)
+
+    mode = 'read' if access_mode == READ_ACCESS else 'write'
+    _stat_add('inUse')
+    QUERY_IN_FLIGHT.inc(name)
+    start = time.perf_counter()
+    error = None
+    try:
+        with _open_session(access_mode) as session:
+            if access_mode == READ_ACCESS:
+                result = session.execute_read(_work)
+            else:
+                result = session.execute_write(_work)
+        _stat_add('transactions')
+        if isinstance(result, list):
+            QUERY_ROWS.inc(name, amount=len(result))
+        return result
+    except Exception as e:
+        error = e
+        _stat_add('failures')
+        QUERY_ERRORS.inc(name)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _stat_add('inUse', -1)
+        QUERY_IN_FLIGHT.dec(name)
+        QUERY_DURATION.observe(duration, name, mode)
+        if 0 < NEO4J_SLOW_QUERY_MS <= duration * 1000 and recorder[0] is not None:
+            try:
+                _record_slow_query(name, mode, duration, recorder[0].statements, error)
+            except Exception as log_error:
+                print(f"记录慢查询失败: {log_error}")
+
+
+def execute_read(work, *args, **kwargs):
+    """在托管读事务中执行 work(tx, *args, **kwargs)。
+
+    瞬时错误时驱动会重放 work，因此 work 必须可重复执行，且应在函数内消费完结果。
+    指标中的查询名取 work 的函数名。
+    """
+    return _managed(READ_ACCESS, work.__name__, work, args, kwargs)
+
+
+def execute_write(work, *args, **kwargs):
+    """在托管写事务中执行 work(tx, *args, **kwargs)，整体提交或回滚。"""
+    return _managed(WRITE_ACCESS, work.__name__, work, args, kwargs)
+
+
+def _run_query(tx, query, parameters):
+    return QueryResult(tx.run(query, parameters))
+
+
+def _query_name():
+    """单语句查询以发起调用的函数命名（模块.函数），经 ManagedSession.run 转发时取其调用方。"""
+    frame = sys._getframe(2)
+    if frame.f_code is ManagedSession.run.__code__:
+        frame = frame.f_back
+    return f"{frame.f_globals.get('__name__')}.{frame.f_code.co_name}"
+
+
+def run_read(query, parameters=None, **kwargs):
+    """以单语句托管读事务执行查询，返回 QueryResult。"""
+    return _managed(READ_ACCESS, _query_name(), _run_query, (query, dict(parameters or {}, **kwargs)), {})
+
+
+def run_write(query, parameters=None, **kwargs):
+    """以单语句托管写事务执行查询，返回 QueryResult。"""
+    return _managed(WRITE_ACCESS, _query_name(), _run_query, (query, dict(parameters or {}, **kwargs)), {})
+
+
+class ManagedSession:
+    """与 `driver.session()` 用法相同的上下文管理器，但每次 `run` 都是一个托管事务。
+
+    便于把原先 `with neo4j_driver.session() as session: session.run(...)` 的自动提交写法
+    原样迁移过来：读会话可路由到只读副本，瞬时错误自动重试，结果在事务内取回。
+    """
+
+    def __init__(self, access_mode):
+        self.access_mode = access_mode
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def run(self, query, parameters=None, **kwargs):
+        if self.access_mode == READ_ACCESS:
+            return run_read(query, parameters, **kwargs)
+        return run_write(query, parameters, **kwargs)
+
+
+def read_session():
+    return ManagedSession(READ_ACCESS)
+
+
+def write_session():
+    return ManagedSession(WRITE_ACCESS)
+
+
+# ============ 异步数据访问（ASGI 模式） ============
+
+# 异步驱动绑定创建它的事件循环，因此在首次使用时于事件循环内惰性创建
+_async_driver = None
+
+
+def get_async_driver():
+    global _async_driver
+    if _async_driver is None:
+        if GRAPH_STORE != 'neo4j':
+            raise _neo4j_unavailable()
+        _async_driver = AsyncGraphDatabase.driver(
+            NEO4J_URI,
+            auth=(NEO4J_USER, NEO4J_PASSWORD),
+            max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+            max_connection_lifetime=NEO4J_MAX_CONN_LIFETIME,
+            connection_acquisition_timeout=NEO4J_ACQUIRE_TIMEOUT,
+            max_transaction_retry_time=NEO4J_MAX_RETRY_TIME,
+            fetch_size=NEO4J_FETCH_SIZE
+        )
+    return _async_driver
+
+
+async def close_async_driver():
+    global _async_driver
+    if _async_driver is not None:
+        driver, _async_driver = _async_driver, None
+        await driver.close()
+
+
+async def async_execute_read(work, *args, **kwargs):
+    """在异步托管读事务中执行 `await work(tx, *args, **kwargs)`，指标与慢查询日志同 execute_read。"""
+    name = work.__name__
+    recorder = [None]
+
+    async def _work(tx):
+        if NEO4J_SLOW_QUERY_MS > 0:
+            tx = recorder[0] = _RecordingTx(tx)
+        return await work(tx, *args, **kwargs)
+
+    QUERY_IN_FLIGHT.inc(name)
+    start = time.perf_counter()
+    error = None
+    try:
+        async with get_async_driver().session(database=NEO4J_DATABASE, default_access_mode=READ_ACCESS) as session:
+            result = await session.execute_read(_work)
+        _stat_add('transactions')
+        if isinstance(result, list):
+            QUERY_ROWS.inc(name, amount=len(result))
+        return result
+    except Exception as e:
+        error = e
+        _stat_add('failures')
+        QUERY_ERRORS.inc(name)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        QUERY_IN_FLIGHT.dec(name)
+        QUERY_DURATION.observe(duration, name, 'read')
+        if 0 < NEO4J_SLOW_QUERY_MS <= duration * 1000 and recorder[0] is not None:
+            try:
+                _record_slow_query(name, 'read', duration, recorder[0].statements, error)
+            except Exception as log_error:
+                print(f"记录慢查询失败: {log_error}")
+
+
+# 图版本号：每次写操作后递增，内存快照与各类索引据此判断是否需要重建
+_graph_version = 0
+_graph_version_lock = threading.Lock()
+# 写操作监听器：fn(version, event, payload)，用于各类内存索引做增量维护
+_graph_listeners = []
+
+
+def get_graph_version():
+    return _graph_version
+
+
+def add_graph_listener(fn):
+    _graph_listeners.append(fn)
+
+
+def bump_graph_version(event=None, payload=None):
+    """递增图版本并通知监听器。
+
+    event 为 'person_upsert' / 'person_delete' / 'relationship_add' / 'relationship_delete'，
+    payload 为对应记录；event 为 None 表示批量或未知变更，监听器应整体重建。
+    """
+    global _graph_version
+    with _graph_version_lock:
+        _graph_version += 1
+        version = _graph_version
+    for fn in list(_graph_listeners):
+        try:
+            fn(version, event, payload)
+        except Exception as e:
+            print(f"图变更监听器执行失败: {e}")
+    return version
 
 
 # 可选的中文分词：优先使用 jieba，否则回退到简单正则
@@ -67,8 +582,34 @@ def tokenize(text):
         return re.findall(r"\w+", s.lower())
 
 
+# 连续的中日韩文字
+_CJK_RUN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]+')
+
+
+def index_terms(text):
+    """检索用的词项：jieba 可用时同 tokenize；否则把连续的中文切成字的 1~2 元组，其余部分仍按 tokenize 的正则切分。
+
+    正则回退会把没有空格的整句中文当作一个词项，问题与文档几乎不可能有共同词项。
+    """
+    if _jieba_available:
+        return tokenize(text)
+    terms = []
+    for tok in tokenize(text):
+        pos = 0
+        for m in _CJK_RUN.finditer(tok):
+            if m.start() > pos:
+                terms.append(tok[pos:m.start()])
+            run = m.group()
+            terms.extend(run)
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+            pos = m.end()
+        if pos < len(tok):
+            terms.append(tok[pos:])
+    return terms
+
+
 def neo4j_add_person(data):
-    with neo4j_driver.session() as session:
+    with write_session() as session:
         try:
             result = session.run(
                 """
@@ -83,13 +624,14 @@ def neo4j_add_person(data):
             )
             record = result.single()
             if record:
+                bump_graph_version('person_upsert', dict(record))
                 return dict(record), None
         except Exception as e:
             return None, str(e)
 
 
 def neo4j_update_person(person_id, data):
-    with neo4j_driver.session() as session:
+    with write_session() as session:
         try:
             result = session.run(
                 """
@@ -108,6 +650,7 @@ def neo4j_update_person(person_id, data):
             )
             record = result.single()
             if record:
+                bump_graph_version('person_upsert', dict(record))
                 return dict(record), None
             return None, '人物不存在'
         except Exception as e:
@@ -115,12 +658,13 @@ def neo4j_update_person(person_id, data):
 
 
 def neo4j_delete_person(person_id):
-    with neo4j_driver.session() as session:
+    with write_session() as session:
         try:
             session.run(
                 "MATCH (p:Person) WHERE elementId(p) = $id DETACH DELETE p",
                 id=person_id
             )
+            bump_graph_version('person_delete', {'id': person_id})
             return True
         except Exception as e:
             print(f"删除失败: {e}")
@@ -128,7 +672,7 @@ def neo4j_delete_person(person_id):
 
 
 def neo4j_add_relationship(data):
-    with neo4j_driver.session() as session:
+    with write_session() as session:
         try:
             result = session.run(
                 """
@@ -143,6 +687,7 @@ def neo4j_add_relationship(data):
             )
             record = result.single()
             if record:
+                bump_graph_version('relationship_add', dict(record))
                 return dict(record), None
             return None, '人物不存在'
         except Exception as e:
@@ -150,152 +695,223 @@ def neo4j_add_relationship(data):
 
 
 def neo4j_delete_relationship(rel_id):
-    with neo4j_driver.session() as session:
+    with write_session() as session:
         try:
             session.run(
                 "MATCH ()-[r:RELATES]->() WHERE elementId(r) = $id DELETE r",
                 id=rel_id
             )
+            bump_graph_version('relationship_delete', {'id': rel_id})
             return True
         except Exception as e:
             print(f"删除失败: {e}")
             return False
 
 
+def _read_graph(tx):
+    nodes_result = tx.run(
+        "MATCH (p:Person) RETURN elementId(p) as id, p.name as name, p.age as age, p.occupation as occupation, p.description as description"
+    )
+    nodes = [dict(record) for record in nodes_result]
+
+    rels_result = tx.run(
+        "MATCH (a:Person)-[r:RELATES]->(b:Person) RETURN elementId(r) as id, elementId(a) as source, elementId(b) as target, r.type as type"
+    )
+    relationships = []
+    for record in rels_result:
+        relationships.append({
+            'id': record['id'],
+            'source': record['source'],
+            'target': record['target'],
+            'type': record['type']
+        })
+
+    return {'nodes': nodes, 'relationships': relationships}
+
+
 def neo4j_get_graph():
-    with neo4j_driver.session() as session:
-        nodes_result = session.run(
-            "MATCH (p:Person) RETURN elementId(p) as id, p.name as name, p.age as age, p.occupation as occupation, p.description as description"
-        )
-        nodes = [dict(record) for record in nodes_result]
+    # 节点与关系在同一个读事务中读取，保证两者一致
+    return execute_read(_read_graph)
 
-        id_mapping = {}
-        nodes_result = session.run(
-            "MATCH (p:Person) RETURN elementId(p) as eid, p.name as name"
-        )
-        for record in nodes_result:
-            id_mapping[record['eid']] = record['name']
+def build_graph_corpus(nodes, rels, query: str = None, k: int = 6):
+    """把 read_all 形式的节点与关系整理为自然语言语料（不包含任何 elementId/编号）。
 
-        rels_result = session.run(
-            "MATCH (a:Person)-[r:RELATES]->(b:Person) RETURN elementId(r) as id, elementId(a) as source, elementId(b) as target, r.type as type"
-        )
-        relationships = []
-        for record in rels_result:
-            relationships.append({
-                'id': record['id'],
-                'source': record['source'],
-                'target': record['target'],
-                'type': record['type']
-            })
+    返回 {'corpus': 人物描述列表, 'relationships': 关系描述列表}；
+    提供 query 时另外给出基于关键词重叠的检索结果 'retrieved'（至多 k 条）。
+    """
+    corpus = []
+    persons = {}
+    for node in nodes:
+        props = node.get('props') or {}
+        name = props.get('name')
+        persons[node['id']] = name
+
+        parts = []
+        if name:
+            parts.append(f"姓名：{name}")
+        if 'occupation' in props and props.get('occupation'):
+            parts.append(f"职业：{props.get('occupation')}")
+        if 'age' in props and props.get('age'):
+            parts.append(f"年龄：{props.get('age')}")
+        # 优先使用 description、bio 或 summary 等字段作为自然语言描述
+        desc = props.get('description') or props.get('bio') or props.get('summary') or ''
+        if desc:
+            parts.append(f"描述：{desc}")
+
+        # 构造一句话语料（不包含 elementId）
+        if parts:
+            text = '；'.join(parts)
+        else:
+            text = name or ''
+        corpus.append(text)
+
+    # 人物之间的关系描述（使用姓名，不暴露编号）
+    relationships = []
+    for rel in rels:
+        sname = persons.get(rel['source']) or '未知人物'
+        tname = persons.get(rel['target']) or '未知人物'
+        props = rel.get('props') or {}
+        # 优先使用关系属性中的 type 字段（如有），否则使用关系的标签名
+        rtype = props.get('type') or rel.get('label') or ''
+        rel_text = f"{sname} 与 {tname} 的关系：{rtype}"
+        note = props.get('note') or props.get('description') or props.get('summary')
+        if note:
+            rel_text += f"；说明：{note}"
+        relationships.append(rel_text)
+
+    result = {'corpus': corpus, 'relationships': relationships}
+    if query:
+        result['retrieved'] = keyword_retrieve(corpus, query, k)
+    return result
+
+
+def keyword_retrieve(corpus, query: str, k: int = 6, corpus_tokens=None):
+    """简单检索：按与 query 的关键词重叠数取前 k 条语料；都不重叠时返回前 k 条。
+
+    批量检索时可传入预先分好词的 corpus_tokens（与 corpus 一一对应的词集合）避免重复分词。
+    """
+    q_tokens = set(tokenize(query))
+    if corpus_tokens is None:
+        corpus_tokens = [set(tokenize(text)) for text in corpus]
+    scores = []
+    for idx, text in enumerate(corpus):
+        score = len(q_tokens & corpus_tokens[idx])
+        scores.append((score, idx, text))
+    scores.sort(key=lambda x: x[0], reverse=True)
+    retrieved = [t for s, i, t in scores if s > 0][:k]
+    if not retrieved:
+        retrieved = corpus[:k]
+    return retrieved
 
-        return {'nodes': nodes, 'relationships': relationships}
 
 def neo4j_get_graph_specific(query: str = None, k: int = 6):
     # 为 AI 输出只提供自然语言语料（人物描述汇总）及人物间的关系描述（不包含任何 elementId/编号）
     # 如果提供 query，则执行一个简单的 RAG 检索（基于关键词重叠），返回检索到的证据
-    with neo4j_driver.session() as session:
-        # 查询所有人物节点并构建自然语言语料（去掉 elementId）
+    with read_session() as session:
         persons_result = session.run(
-            "MATCH (p:Person) RETURN elementId(p) as id, p.name as name, properties(p) as props"
+            "MATCH (p:Person) RETURN elementId(p) as id, properties(p) as props"
         )
-        corpus = []
-        persons = {}
-        for record in persons_result:
-            pid = record['id']
-            name = record.get('name') or (record['props'].get('name') if record.get('props') else None)
-            props = record.get('props') or {}
-            persons[pid] = name
-
-            parts = []
-            if name:
-                parts.append(f"姓名：{name}")
-            if 'occupation' in props and props.get('occupation'):
-                parts.append(f"职业：{props.get('occupation')}")
-            if 'age' in props and props.get('age'):
-                parts.append(f"年龄：{props.get('age')}")
-            # 优先使用 description、bio 或 summary 等字段作为自然语言描述
-            desc = props.get('description') or props.get('bio') or props.get('summary') or ''
-            if desc:
-                parts.append(f"描述：{desc}")
-
-            # 构造一句话语料（不包含 elementId）
-            if parts:
-                text = '；'.join(parts)
-            else:
-                text = name or ''
-            corpus.append(text)
-
-        # 获取人物之间的关系并构建自然语言描述（使用姓名，不暴露编号）
         rels_result = session.run(
             "MATCH (a:Person)-[r]->(b:Person) RETURN elementId(r) as id, elementId(a) as source, elementId(b) as target, type(r) as rel_label, properties(r) as props"
         )
-        relationships = []
-        for record in rels_result:
-            sid = record['source']
-            tid = record['target']
-            sname = persons.get(sid) or '未知人物'
-            tname = persons.get(tid) or '未知人物'
-            props = record.get('props') or {}
-            # 优先使用关系属性中的 type 字段（如有），否则使用关系的标签名（rel_label）
-            rtype = props.get('type') or record.get('rel_label') or ''
-            rel_text = f"{sname} 与 {tname} 的关系：{rtype}"
-            note = props.get('note') or props.get('description') or props.get('summary')
-            if note:
-                rel_text += f"；说明：{note}"
-            relationships.append(rel_text)
-
-        result = {'corpus': corpus, 'relationships': relationships}
-
-        if query:
-            # 简单检索：关键词重叠计数（在已清洗的自然语言语料上进行）
-            q_tokens = set(tokenize(query))
-            scores = []
-            for idx, text in enumerate(corpus):
-                t_tokens = set(tokenize(text))
-                score = len(q_tokens & t_tokens)
-                scores.append((score, idx, text))
-            scores.sort(key=lambda x: x[0], reverse=True)
-            retrieved = [t for s, i, t in scores if s > 0][:k]
-            if not retrieved:
-                retrieved = corpus[:k]
-            result['retrieved'] = retrieved
+    nodes = [{'id': r['id'], 'props': r['props'] or {}} for r in persons_result]
+    rels = [{
+        'id': r['id'],
+        'source': r['source'],
+        'target': r['target'],
+        'label': r['rel_label'],
+        'props': r['props'] or {}
+    } for r in rels_result]
+    return build_graph_corpus(nodes, rels, query=query, k=k)
 
-        return result
+# 批量导入时每个 UNWIND 语句携带的行数
+IMPORT_BATCH_SIZE = int(os.getenv('NEO4J_IMPORT_BATCH_SIZE', '1000'))
 
-def neo4j_init_data(dataset="qing_history"):
+
+def _batches(rows, size=IMPORT_BATCH_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _replace_graph(tx, persons, relations, merge=False):
+    """清空图并批量写入人物与关系（在调用方的同一写事务中执行）。
+
+    persons: [{name, age, occupation, description}]；relations: [{source_name, target_name, type}]。
+    merge=True 时按姓名合并人物、关系去重，否则直接创建。
+    """
+    tx.run("MATCH (n) DETACH DELETE n").consume()
+    if merge:
+        person_query = """
+            UNWIND $rows AS row
+            MERGE (p:Person {name: row.name})
+            ON CREATE SET p.age = row.age, p.occupation = row.occupation, p.description = row.description
+            """
+        rel_query = """
+            UNWIND $rows AS row
+            MATCH (a:Person {name: row.source_name}), (b:Person {name: row.target_name})
+            MERGE (a)-[r:RELATES {type: row.type}]->(b)
+            """
+    else:
+        person_query = """
+            UNWIND $rows AS row
+            CREATE (p:Person {name: row.name, age: row.age, occupation: row.occupation, description: row.description})
+            """
+        rel_query = """
+            UNWIND $rows AS row
+            MATCH (a:Person {name: row.source_name}), (b:Person {name: row.target_name})
+            CREATE (a)-[r:RELATES {type: row.type}]->(b)
+            """
+    for rows in _batches(persons):
+        tx.run(person_query, rows=rows).consume()
+    for rows in _batches(relations):
+        tx.run(rel_query, rows=rows).consume()
+
+
+def ensure_person_name_index():
+    """关系导入与 MERGE 都按姓名匹配人物，确保存在对应索引。"""
+    run_write("CREATE INDEX person_name IF NOT EXISTS FOR (p:Person) ON (p.name)")
+
+
+def neo4j_replace_graph(persons, relations, merge=False):
+    """在一个托管写事务中整体替换图数据：失败时整体回滚，不会留下导入了一半的图。"""
+    ensure_person_name_index()
+    execute_write(_replace_graph, persons, relations, merge)
+    bump_graph_version()
+
+
+def load_sample_rows(dataset="qing_history"):
+    """读取示例数据集并转换为 (persons, relations) 行，供各存储后端批量写入。"""
     sample_data = load_sample_data(dataset)
 
-    with neo4j_driver.session() as session:
-        session.run("MATCH (n) DETACH DELETE n")
+    id_to_name = {}
+    persons = []
+    for node in sample_data['nodes']:
+        node_id = int(node['id']) if isinstance(node['id'], str) else node['id']
+        id_to_name[node_id] = node['name']
+        persons.append({
+            'name': node['name'],
+            'age': node.get('age'),
+            'occupation': node.get('occupation'),
+            'description': node.get('description', '')
+        })
+
+    relations = []
+    for rel in sample_data['relationships']:
+        source_id = int(rel['source']) if isinstance(rel['source'], str) else rel['source']
+        target_id = int(rel['target']) if isinstance(rel['target'], str) else rel['target']
+
+        source_name = id_to_name.get(source_id)
+        target_name = id_to_name.get(target_id)
+
+        if source_name and target_name:
+            relations.append({
+                'source_name': source_name,
+                'target_name': target_name,
+                'type': rel.get('type', '关系')
+            })
+    return persons, relations
 
-        id_to_name = {}
-        for node in sample_data['nodes']:
-            node_id = int(node['id']) if isinstance(node['id'], str) else node['id']
-            id_to_name[node_id] = node['name']
-            session.run(
-                """
-                CREATE (p:Person {name: $name, age: $age, occupation: $occupation, description: $description})
-                """,
-                name=node['name'],
-                age=node.get('age'),
-                occupation=node.get('occupation'),
-                description=node.get('description', '')
-            )
 
-        for rel in sample_data['relationships']:
-            source_id = int(rel['source']) if isinstance(rel['source'], str) else rel['source']
-            target_id = int(rel['target']) if isinstance(rel['target'], str) else rel['target']
-
-            source_name = id_to_name.get(source_id)
-            target_name = id_to_name.get(target_id)
-
-            if source_name and target_name:
-                session.run(
-                    """
-                    MATCH (a:Person {name: $source_name}), (b:Person {name: $target_name})
-                    CREATE (a)-[r:RELATES {type: $type}]->(b)
-                    """,
-                    source_name=source_name,
-                    target_name=target_name,
-                    type=rel.get('type', '关系')
-                )
+def neo4j_init_data(dataset="qing_history"):
+    persons, relations = load_sample_rows(dataset)
+    neo4j_replace_graph(persons, relations)
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from metrics import QUERY_EMBED_BATCH_SIZE, QUERY_EMBED_CACHE, QUERY_EMBED_DURATION
+
+# 收集并发查询的最长等待（毫秒）与单批上限；缓存最近使用的查询向量条数（0 表示不缓存）
+QUERY_EMBED_MAX_WAIT_MS = float(os.getenv('QUERY_EMBED_MAX_WAIT_MS', '5'))
+QUERY_EMBED_MAX_BATCH = int(os.getenv('QUERY_EMBED_MAX_BATCH', '32'))
+QUERY_EMBED_CACHE_SIZE = int(os.getenv('QUERY_EMBED_CACHE_SIZE', '1024'))
+
+
+class QueryEmbedder:
+    """查询向量服务：合并并发请求成批编码，并按文本缓存最近的结果。
+
+    - 使用 SBERT 时，后台线程收集 max_wait 内（或凑满 max_batch）到达的查询，一次 encode 后分发给各调用方；
+      同一文本在编码期间再次请求会共享同一结果；
+    - TF-IDF 回退模式下直接调用 embed_query（对持久化索引做 transform，开销很小）；
+      其向量空间随索引重建而变化，因此不缓存。
+
+    SBERT 模式返回只读的 numpy 数组；TF-IDF 模式返回 1 × 词表大小的 CSR 行向量。调用方均不得原地修改。
+    """
+
+    def __init__(self, gp, max_wait_ms: float = QUERY_EMBED_MAX_WAIT_MS, max_batch: int = QUERY_EMBED_MAX_BATCH,
+                 cache_size: int = QUERY_EMBED_CACHE_SIZE):
+        self.gp = gp
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.cache_size = max(0, cache_size)
+        self.batched = gp._embed_model is not None
+        self._cache = OrderedDict()
+        self._cond = threading.Condition()
+        self._queue = []
+        self._pending = {}
+        self._worker = None
+
+    def _cached(self, text):
+        with self._cond:
+            vec = self._cache.get(text)
+            if vec is not None:
+                self._cache.move_to_end(text)
+        QUERY_EMBED_CACHE.inc('miss' if vec is None else 'hit')
+        return vec
+
+    def _remember(self, text, vec):
+        # 调用方须持有 self._cond
+        if self.cache_size:
+            self._cache[text] = vec
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def submit(self, text: str) -> Future:
+        """提交一条查询，返回 concurrent.futures.Future；命中缓存时返回已完成的 Future。"""
+        text = '' if text is None else str(text)
+        fut = Future()
+        if not self.batched:
+            try:
+                fut.set_result(self.gp.embed_query(text))
+            except Exception as e:
+                fut.set_exception(e)
+            return fut
+        vec = self._cached(text)
+        if vec is not None:
+            fut.set_result(vec)
+            return fut
+
+        with self._cond:
+            shared = self._pending.get(text)
+            if shared is not None:
+                return shared
+            # 置为运行中：共享该结果的某个协程被取消时，asyncio.wrap_future 无法连带取消它
+            fut.set_running_or_notify_cancel()
+            self._pending[text] = fut
+            self._queue.append(text)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._loop, name='query-embed', daemon=True)
+                self._worker.start()
+            self._cond.notify_all()
+        return fut
+
+    def embed(self, text: str):
+        return self.submit(text).result()
+
+    async def embed_async(self, text: str):
+        if not self.batched:
+            # 首次调用可能需要从文件读取索引，放到线程中避免阻塞事件循环
+            return await asyncio.to_thread(self.embed, text)
+        return await asyncio.wrap_future(self.submit(text))
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                # 第一条查询到达后再等一小段时间，让并发到达的查询进入同一批
+                deadline = time.monotonic() + self.max_wait
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+            self._encode(batch)
+
+    def _encode(self, batch):
+        started = time.perf_counter()
+        try:
+            vecs = self.gp._embed_model.encode(batch, show_progress_bar=False, convert_to_numpy=True)
+            vecs = [self._freeze(v) for v in vecs]
+            error = None
+        except Exception as e:
+            vecs, error = None, e
+        QUERY_EMBED_BATCH_SIZE.observe(len(batch))
+        QUERY_EMBED_DURATION.observe(time.perf_counter() - started)
+        with self._cond:
+            futures = [self._pending.pop(text) for text in batch]
+            if error is None:
+                for text, vec in zip(batch, vecs):
+                    self._remember(text, vec)
+        for i, fut in enumerate(futures):
+            if error is None:
+                fut.set_result(vecs[i])
+            else:
+                fut.set_exception(error)
+
+    @staticmethod
+    def _freeze(vec):
+        vec = np.array(vec, dtype=np.float32)
+        vec.setflags(write=False)
+        return vec
+
+    def clear_cache(self):
+        with self._cond:
+            self._cache.clear()
@@ -0,0 +1,191 @@
+import itertools
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from datetime import datetime
+
+from data_loader import EMBEDDINGS_FILE
+from embed_pipeline import build_node_embeddings, export_embeddings_file
+from graph_proc import GraphProcessor
+from hybrid_retriever import invalidate_hybrid_index
+from metrics import RAG_JOB_DURATION, RAG_JOBS
+from neo4j_ops import get_graph_version
+
+# 触发后等待的时间（秒）：窗口内的多次触发合并为一次重建；持续触发时最多推迟 RAG_REBUILD_MAX_DELAY 秒
+RAG_REBUILD_DEBOUNCE = float(os.getenv('RAG_REBUILD_DEBOUNCE', '2'))
+RAG_REBUILD_MAX_DELAY = float(os.getenv('RAG_REBUILD_MAX_DELAY', '30'))
+# 保留的历史任务数
+RAG_JOB_HISTORY = int(os.getenv('RAG_JOB_HISTORY', '50'))
+
+STAGES = ('fetch', 'embed', 'file')
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class RagRebuildRunner:
+    """RAG 重建（节点分块向量化并写回存储 → 导出 embeddings.json）的后台任务队列。
+
+    - 同一时刻至多一个任务在排队、一个任务在执行；排队期间的触发都合并进同一个任务；
+    - 执行期间再次触发会新建一个排队任务，保证最终状态覆盖执行开始之后的写入；
+    - 每个任务记录状态、阶段进度、耗时与各阶段错误，供状态接口查询。
+    """
+
+    def __init__(self, debounce: float = RAG_REBUILD_DEBOUNCE, max_delay: float = RAG_REBUILD_MAX_DELAY,
+                 history: int = RAG_JOB_HISTORY):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.history = max(1, history)
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._jobs = OrderedDict()
+        self._pending = None
+        self._running = None
+        self._worker = None
+
+    def trigger(self, reason: str):
+        """请求一次重建，立即返回（合并后的）任务快照。"""
+        now = time.monotonic()
+        with self._cond:
+            job = self._pending
+            if job is None:
+                job = self._pending = {
+                    'id': next(self._ids),
+                    'status': 'queued',
+                    'reasons': [],
+                    'triggers': 0,
+                    'createdAt': _now(),
+                    'startedAt': None,
+                    'finishedAt': None,
+                    'durationSeconds': None,
+                    'graphVersion': None,
+                    'store': None,
+                    'nodes': None,
+                    'embed': None,
+                    'progress': {'stage': None, 'step': 0, 'steps': len(STAGES)},
+                    'errors': [],
+                    '_first': now,
+                }
+                self._jobs[job['id']] = job
+                while len(self._jobs) > self.history:
+                    oldest = next(iter(self._jobs.values()))
+                    if oldest['status'] in ('queued', 'running'):
+                        break
+                    self._jobs.popitem(last=False)
+                RAG_JOBS.inc('queued')
+            job['triggers'] += 1
+            if reason not in job['reasons'] and len(job['reasons']) < 20:
+                job['reasons'].append(reason)
+            job['_due'] = min(now + self.debounce, job['_first'] + self.max_delay)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._loop, name='rag-rebuild', daemon=True)
+                self._worker.start()
+            self._cond.notify_all()
+            return self._public(job)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                job = self._pending
+                delay = job['_due'] - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                self._pending = None
+                self._running = job
+                job['status'] = 'running'
+                job['startedAt'] = _now()
+            started = time.perf_counter()
+            try:
+                self._run(job)
+            except Exception as e:
+                job['errors'].append({'stage': job['progress']['stage'], 'error': str(e),
+                                      'traceback': traceback.format_exc(limit=5)})
+            # 向量已（部分）更新：让问答索引重新加载
+            invalidate_hybrid_index()
+            duration = time.perf_counter() - started
+            with self._cond:
+                job['durationSeconds'] = round(duration, 3)
+                job['finishedAt'] = _now()
+                job['status'] = 'failed' if job['errors'] else 'succeeded'
+                self._running = None
+                self._cond.notify_all()
+            RAG_JOBS.inc(job['status'])
+            RAG_JOB_DURATION.observe(duration, job['status'])
+            if job['errors']:
+                summary = '；'.join(f"{e['stage']}: {e['error']}" for e in job['errors'])
+                print(f"RAG 重建任务 #{job['id']} 失败: {summary}")
+
+    def _stage(self, job, stage, **detail):
+        job['progress'] = {'stage': stage, 'step': STAGES.index(stage) + 1, 'steps': len(STAGES), **detail}
+
+    def _run(self, job):
+        # 记录开始读取时的图版本：之后的写入会触发下一个任务
+        job['graphVersion'] = get_graph_version()
+        self._stage(job, 'fetch')
+        gp = GraphProcessor()
+        job['store'] = gp.store.name
+        data = gp.fetch_nodes_and_rels()
+        nodes = data['nodes']
+        job['nodes'] = len(nodes)
+
+        # 分块编码、逐块写回存储；失败时已完成的块记在检查点中，下一个任务从断点继续
+        self._stage(job, 'embed')
+        job['embed'] = build_node_embeddings(gp, nodes, progress=lambda info: self._stage(job, 'embed', **info))
+
+        # 空图也写出空的向量文件，避免问答读到上一张图的旧向量；TF-IDF 索引已在 embed 阶段保存
+        self._stage(job, 'file')
+        if job['embed']['encoder'] != 'tfidf':
+            export_embeddings_file(gp, nodes, EMBEDDINGS_FILE)
+
+    @staticmethod
+    def _public(job):
+        out = {k: v for k, v in job.items() if not k.startswith('_')}
+        out['reasons'] = list(job['reasons'])
+        out['errors'] = list(job['errors'])
+        return out
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return self._public(job) if job is not None else None
+
+    def recent(self, limit: int = 20):
+        with self._cond:
+            jobs = list(self._jobs.values())[::-1][:limit]
+            return [self._public(job) for job in jobs]
+
+    def wait(self, job_id, timeout: float = None) -> bool:
+        """阻塞直到任务结束（供脚本与测试使用），超时返回 False。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job['status'] in ('succeeded', 'failed'):
+                    return True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_rag_runner() -> RagRebuildRunner:
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = RagRebuildRunner()
+    return _runner
+
+
+def schedule_rag_rebuild(reason: str):
+    return get_rag_runner().trigger(reason)
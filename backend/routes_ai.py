@@ -1,128 +1,384 @@
-from flask import Blueprint, request, jsonify
-from openai import OpenAI
-from neo4j_ops import neo4j_get_graph_specific
+from flask import Blueprint, Response, request, jsonify
+from openai import AsyncOpenAI, OpenAI
 from graph_proc import GraphProcessor
+from graph_store import get_store
+from query_embed import QueryEmbedder
+from hybrid_retriever import get_hybrid_index, get_hybrid_index_async, peek_hybrid_index
+from neo4j_ops import get_graph_version
+from singleflight import SingleFlight
+from ratelimit import RateLimiter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
+import asyncio
 import json
 import os  # 修复：缺少 os 导入
+import re
+import time
+import unicodedata
 
 bp = Blueprint('ai', __name__, url_prefix='/api')
 
+# 大模型服务配置：可通过环境变量指向其他 OpenAI 兼容服务（如压测时的 mock_llm）
+LLM_BASE_URL = os.getenv('LLM_BASE_URL', "https://dashscope.aliyuncs.com/compatible-mode/v1")
+LLM_API_KEY = os.getenv('LLM_API_KEY', "sk-728123a1afe64b4bbf86859c2b39deec")
+LLM_MODEL = os.getenv('LLM_MODEL', "qwen-plus")
+
 client = OpenAI(
-    api_key="sk-728123a1afe64b4bbf86859c2b39deec",
-    base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+    api_key=LLM_API_KEY,
+    base_url=LLM_BASE_URL,
 )
+# 异步客户端（ASGI 模式）：其连接池绑定事件循环，首次使用时在循环内创建
+_async_client = None
+# 问答复用的 GraphProcessor（避免每个请求重新加载向量模型）
+_shared_gp = None
+_query_embedder = None
 
-@bp.route('/ai_ask', methods=['POST'])
-def ai_ask():
-    data = request.get_json() or {}
-    user_question = data.get('question', '你是谁？')
-    gp = GraphProcessor()
-    retrieved = None
-    evidence_block = ''
-    nodes_and_rels = {}
-    nodes = []
-    emb_map = None
-    graph_info = {}
+RETRIEVE_K = 6
+# 合并并发的相同问题（同一规范化问题 + 同一图版本只检索并调用一次大模型）；设为 0 关闭
+AI_SINGLE_FLIGHT = os.getenv('AI_SINGLE_FLIGHT', '1') != '0'
+_ask_flight = SingleFlight('ai_ask')
+# 批量问答：单次最多问题数、默认与最大并发数
+AI_BATCH_MAX_QUESTIONS = int(os.getenv('AI_BATCH_MAX_QUESTIONS', '5000'))
+AI_BATCH_CONCURRENCY = int(os.getenv('AI_BATCH_CONCURRENCY', '16'))
+AI_BATCH_MAX_CONCURRENCY = int(os.getenv('AI_BATCH_MAX_CONCURRENCY', '128'))
+# 提示词中整图语料的长度上限（字符）：超过时只提供检索到的人物描述与邻域关系句；0 表示不限
+AI_PROMPT_GRAPH_MAX_CHARS = int(os.getenv('AI_PROMPT_GRAPH_MAX_CHARS', '0'))
 
-    try:
-        nodes_and_rels = gp.fetch_nodes_and_rels()
-        nodes = nodes_and_rels.get('nodes', [])
-
-        try:
-            emb_map = gp.load_embeddings_from_neo4j('embedding')
-        except Exception:
-            emb_map = None
-        if not emb_map:
-            try:
-                emb_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', 'export', 'embeddings.json')
-                emb_file = os.path.normpath(emb_file)
-                emb_map = gp.load_embeddings_from_file(emb_file)
-            except Exception:
-                emb_map = None
-
-        if emb_map:
-            qv = gp.embed_query(user_question)
-            qv = np.array(qv, dtype=float)
-            sims = []
-            id_to_node = {n['id']: n for n in nodes}
-            for nid, vec in emb_map.items():
-                try:
-                    v = np.array(vec, dtype=float)
-                    sim = float(np.dot(qv, v) / (np.linalg.norm(qv) * np.linalg.norm(v) + 1e-12))
-                except Exception:
-                    sim = 0.0
-                sims.append((sim, nid))
-            sims.sort(key=lambda x: x[0], reverse=True)
-            top = [nid for s, nid in sims[:6] if nid in id_to_node]
-            retrieved_texts = []
-            for nid in top:
-                n = id_to_node.get(nid, {})
-                props = n.get('properties', {}) or {}  # 修复：应为 properties
-                name = props.get('name') or props.get('label') or ''
-                desc = props.get('description') or props.get('bio') or props.get('summary') or ''
-                txt = f"姓名：{name}；描述：{desc}" if name or desc else str(nid)
-                retrieved_texts.append(txt)
-            if retrieved_texts:
-                retrieved = retrieved_texts
-                evidence_block = '\n'.join(retrieved)
-        else:
-            try:
-                graph_info = neo4j_get_graph_specific(query=user_question, k=6)
-            except Exception:
-                graph_info = neo4j_get_graph_specific()
-            retrieved = graph_info.get('retrieved') if isinstance(graph_info, dict) else None
-            if retrieved:
-                evidence_block = '\n'.join(retrieved)
-            nodes = graph_info.get('corpus') if isinstance(graph_info, dict) else []
+SYSTEM_PROMPT = (
+    "你是一个基于知识图谱的中文问答助手。输入是一份完整的图数据库导出（包含所有节点、标签、属性、关系及其属性）。"
+    " 严格规则：\n"
+    "1) 只能用简洁的中文自然语言回答，禁止以任何结构化格式（如 JSON、YAML、表格）输出答案。\n"
+    "2) 回答必须基于图中事实，不得凭空编造信息。可以做有限的合情合理推理，但不得引入图中不存在的实体。\n"
+    "3) 回答中请至少包含一条证据说明（例如：引用相关人物的描述或关系），以证明答案的正确性。\n"
+    "4) 若图中无法确定答案，应直接用中文说明无法确认并给出原因（例如：缺少相关节点/关系）。\n"
+    "5) 回答尽量简洁，先给结论，再用一两句说明依据。"
+    "6) 使用纯中文回答，禁止使用任何其他语言。"
+    "7) 禁止在回答中出现任何节点编号、id、elementId、编号等技术性内容，只能用自然语言描述。"
+)
 
-    except Exception as e:
-        # 捕获 fetch_nodes_and_rels 失败
-        nodes_and_rels = {}
-        nodes = []
-        emb_map = None
 
-    try:
-        graph_json = json.dumps(nodes_and_rels if nodes_and_rels else graph_info, ensure_ascii=False)
-    except Exception:
-        graph_json = '[]'
+def get_async_client():
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(api_key=LLM_API_KEY, base_url=LLM_BASE_URL)
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        c, _async_client = _async_client, None
+        await c.close()
+
+
+def _shared_processor():
+    global _shared_gp
+    if _shared_gp is None:
+        _shared_gp = GraphProcessor()
+    # 存储后端可能在运行期间被切换
+    _shared_gp.store = get_store()
+    return _shared_gp
+
+
+def get_query_embedder():
+    """问答共用的查询向量服务（合批编码 + LRU 缓存），基于共享的 GraphProcessor 的模型。"""
+    global _query_embedder
+    if _query_embedder is None:
+        _query_embedder = QueryEmbedder(_shared_processor())
+    return _query_embedder
+
+
+def _query_vectors(gp, questions):
+    """SBERT 模式下一次编码全部问题；TF-IDF 模式由索引自行 transform。"""
+    return np.asarray(gp.embed_texts(list(questions)), dtype=np.float32)
+
+
+def retrieve_hits(gp, question, k=RETRIEVE_K):
+    """在内存混合索引上检索单个问题，返回 (索引, 命中节点 [{id, text, score, sources}], 邻域关系句 [{text, score, hop, ...}])。"""
+    index = get_hybrid_index(gp)
+    qv = get_query_embedder().embed(question) if index.needs_query_vector else None
+    hits = index.search(question, k, qv)
+    return index, hits, index.expand(question, hits)
+
+
+def build_prompt(question, evidence_block, graph_json):
     user_prompt_parts = []
     if evidence_block:
         user_prompt_parts.append(f"参考证据（与问题最相关的句子）：\n{evidence_block}")
-    user_prompt_parts.append(f"完整图语料（供参考）：\n{graph_json}")
-    user_prompt_parts.append(f"用户问题：{user_question}")
-    user_prompt = "\n\n".join(user_prompt_parts)
+    if graph_json:
+        user_prompt_parts.append(f"完整图语料（供参考）：\n{graph_json}")
+    user_prompt_parts.append(f"用户问题：{question}")
+    return "\n\n".join(user_prompt_parts)
+
+
+def build_messages(user_prompt):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def clean_answer(completion):
+    answer = completion.choices[0].message.content if completion.choices else "无回答"
+    # 后处理：自动去除节点号、id等技术性内容
+    answer = re.sub(r"[（(]?(节点|id|编号|elementId)[：: ]?\d+[)）]?", "", answer, flags=re.IGNORECASE)
+    answer = re.sub(r"(节点|id|编号|elementId)[：: ]*\w+", "", answer, flags=re.IGNORECASE)
+    # 去除多余空格和标点
+    answer = re.sub(r"[，,。]{2,}", "。", answer)
+    return answer.replace("  ", " ").strip()
+
+
+def _evidence_block(hits, facts):
+    return '\n'.join([hit['text'] for hit in hits] + [fact['text'] for fact in facts])
+
+
+def _prompt_graph(index):
+    if AI_PROMPT_GRAPH_MAX_CHARS and len(index.graph_json) > AI_PROMPT_GRAPH_MAX_CHARS:
+        return None
+    return index.graph_json
+
+
+def retrieve_context(gp, question):
+    """检索与问题相关的证据，返回 (完整图语料 JSON, 证据文本)；读取失败时为 ('{}', '')。
+
+    证据为命中节点的描述及其 1~2 跳邻域中最相关的关系句；图语料超过 AI_PROMPT_GRAPH_MAX_CHARS 时为 None。
+    索引有效期内只做内存检索，不访问数据库。
+    """
+    try:
+        index, hits, facts = retrieve_hits(gp, question)
+    except Exception:
+        return '{}', ''
+    return _prompt_graph(index), _evidence_block(hits, facts)
+
+
+def _search_evidence(index, question, qv):
+    hits = index.search(question, RETRIEVE_K, qv)
+    return _evidence_block(hits, index.expand(question, hits))
+
+
+async def _ready(value):
+    return value
+
+
+async def retrieve_context_async(gp, question):
+    """retrieve_context 的异步版本：索引过期时经存储的异步接口读取数据后重建，查询向量与之并发计算。"""
+    try:
+        index = peek_hybrid_index(gp)
+        need_qv = gp._embed_model is not None and (index is None or index.needs_query_vector)
+        index, qv = await asyncio.gather(
+            _ready(index) if index is not None else get_hybrid_index_async(gp),
+            get_query_embedder().embed_async(question) if need_qv else _ready(None)
+        )
+        if not index.needs_query_vector:
+            qv = None
+        evidence = await asyncio.to_thread(_search_evidence, index, question, qv)
+    except Exception:
+        return '{}', ''
+    return _prompt_graph(index), evidence
+
 
+def question_key(question):
+    """合并用的键：全半角、大小写、空白与句末标点不同的问题视为同一个，图发生变更后不再合并。"""
+    q = unicodedata.normalize('NFKC', str(question)).casefold()
+    q = re.sub(r'\s+', ' ', q).strip().rstrip('?!.。')
+    return q, get_graph_version()
+
+
+def answer_question(question):
+    if AI_SINGLE_FLIGHT:
+        return _ask_flight.do(question_key(question), _answer_question, question)
+    return _answer_question(question)
+
+
+async def answer_question_async(question):
+    """异步问答：检索走异步 Neo4j 驱动，大模型调用走 AsyncOpenAI，等待期间不占用线程。"""
+    if AI_SINGLE_FLIGHT:
+        return await _ask_flight.do_async(question_key(question), _answer_question_async, question)
+    return await _answer_question_async(question)
+
+
+def _answer_question(question):
+    graph_json, evidence_block = retrieve_context(_shared_processor(), question)
+    user_prompt = build_prompt(question, evidence_block, graph_json)
+    completion = client.chat.completions.create(model=LLM_MODEL, messages=build_messages(user_prompt))
+    return {"answer": clean_answer(completion)}
+
+
+async def _answer_question_async(question):
+    graph_json, evidence_block = await retrieve_context_async(_shared_processor(), question)
+    user_prompt = build_prompt(question, evidence_block, graph_json)
+    completion = await get_async_client().chat.completions.create(
+        model=LLM_MODEL, messages=build_messages(user_prompt)
+    )
+    return {"answer": clean_answer(completion)}
+
+
+# ============ 批量问答 ============
+
+def parse_batch_request(data):
+    """校验批量问答请求体 {questions, concurrency?, rate?}，返回 (questions, concurrency, rate, error)。"""
+    if not isinstance(data, dict):
+        return None, None, None, '请求体必须是 JSON 对象'
+    questions = data.get('questions')
+    if not isinstance(questions, list) or not questions or \
+            any(not isinstance(q, str) or not q.strip() for q in questions):
+        return None, None, None, 'questions 必须是非空字符串组成的非空列表'
+    if len(questions) > AI_BATCH_MAX_QUESTIONS:
+        return None, None, None, f'单次最多 {AI_BATCH_MAX_QUESTIONS} 个问题'
+    try:
+        concurrency = data.get('concurrency')
+        concurrency = AI_BATCH_CONCURRENCY if concurrency is None else int(concurrency)
+        rate = float(data.get('rate') or 0)
+    except (TypeError, ValueError):
+        return None, None, None, 'concurrency 与 rate 必须是数字'
+    if not 1 <= concurrency <= AI_BATCH_MAX_CONCURRENCY:
+        return None, None, None, f'concurrency 须在 1~{AI_BATCH_MAX_CONCURRENCY} 之间'
+    if rate < 0:
+        return None, None, None, 'rate 不能为负数'
+    return questions, concurrency, rate, None
+
+
+def retrieve_batch(gp, index, questions):
+    """为一组问题批量检索证据：问题一次编码，向量相似度按块做矩阵乘法，关键词打分查内存倒排表，再逐题做邻域扩展。"""
+    qv = _query_vectors(gp, questions) if index.needs_query_vector else None
+    hits_list = index.search_many(list(questions), RETRIEVE_K, qv)
+    return [_evidence_block(hits, index.expand(q, hits)) for q, hits in zip(questions, hits_list)]
+
+
+def _plan_batch(gp, questions):
+    """规范化后相同的问题只问一次；返回 ([(问题, 证据, [原始下标...])], 序列化后的图语料)。"""
+    groups = {}
+    for i, q in enumerate(questions):
+        groups.setdefault(question_key(q)[0], []).append(i)
+    unique = [questions[idxs[0]] for idxs in groups.values()]
     try:
+        index = get_hybrid_index(gp)
+        evidence, graph_json = retrieve_batch(gp, index, unique), _prompt_graph(index)
+    except Exception:
+        evidence, graph_json = [''] * len(unique), '{}'
+    return list(zip(unique, evidence, groups.values())), graph_json
+
+
+def _batch_items(questions, idxs, answer, error):
+    for i in idxs:
+        item = {'index': i, 'question': questions[i]}
+        if error is None:
+            item['answer'] = answer
+        else:
+            item['error'] = error
+        yield item
+
+
+def _batch_summary(questions, plan, errors, started):
+    return {
+        'done': True,
+        'total': len(questions),
+        'unique': len(plan),
+        'errors': errors,
+        'elapsedSeconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def answer_batch(questions, concurrency=AI_BATCH_CONCURRENCY, rate=0):
+    """批量问答（生成器）：检索一次完成，大模型调用以 concurrency 个线程并发、每秒至多 rate 次（0 不限），
+    按完成顺序逐条产出 {index, question, answer|error}，最后产出一条汇总 {done: true, ...}。
+    """
+    started = time.perf_counter()
+    plan, graph_json = _plan_batch(_shared_processor(), questions)
+    limiter = RateLimiter(rate) if rate else None
+
+    def ask(question, evidence):
+        if limiter is not None:
+            limiter.acquire()
         completion = client.chat.completions.create(
-            model="qwen-plus",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "你是一个基于知识图谱的中文问答助手。输入是一份完整的图数据库导出（包含所有节点、标签、属性、关系及其属性）。"
-                        " 严格规则：\n"
-                        "1) 只能用简洁的中文自然语言回答，禁止以任何结构化格式（如 JSON、YAML、表格）输出答案。\n"
-                        "2) 回答必须基于图中事实，不得凭空编造信息。可以做有限的合情合理推理，但不得引入图中不存在的实体。\n"
-                        "3) 回答中请至少包含一条证据说明（例如：引用相关人物的描述或关系），以证明答案的正确性。\n"
-                        "4) 若图中无法确定答案，应直接用中文说明无法确认并给出原因（例如：缺少相关节点/关系）。\n"
-                        "5) 回答尽量简洁，先给结论，再用一两句说明依据。"
-                        "6) 使用纯中文回答，禁止使用任何其他语言。"
-                        "7) 禁止在回答中出现任何节点编号、id、elementId、编号等技术性内容，只能用自然语言描述。"
-                    )
-                },
-                {"role": "user", "content": user_prompt},
-            ],
+            model=LLM_MODEL, messages=build_messages(build_prompt(question, evidence, graph_json))
         )
-        answer = completion.choices[0].message.content if completion.choices else "无回答"
-        # 后处理：自动去除节点号、id等技术性内容
-        import re
-        # 常见技术性内容正则
-        answer = re.sub(r"[（(]?(节点|id|编号|elementId)[：: ]?\d+[)）]?", "", answer, flags=re.IGNORECASE)
-        answer = re.sub(r"(节点|id|编号|elementId)[：: ]*\w+", "", answer, flags=re.IGNORECASE)
-        # 去除多余空格和标点
-        answer = re.sub(r"[，,。]{2,}", "。", answer)
-        answer = answer.replace("  ", " ").strip()
-        return jsonify({"answer": answer})
+        return clean_answer(completion)
+
+    errors = 0
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='ai-batch')
+    try:
+        futures = {pool.submit(ask, q, evidence): idxs for q, evidence, idxs in plan}
+        for future in as_completed(futures):
+            try:
+                answer, error = future.result(), None
+            except Exception as e:
+                answer, error = None, str(e)
+                errors += len(futures[future])
+            yield from _batch_items(questions, futures[future], answer, error)
+    finally:
+        # 客户端中途断开时生成器被关闭：取消尚未开始的调用
+        pool.shutdown(wait=False, cancel_futures=True)
+    yield _batch_summary(questions, plan, errors, started)
+
+
+async def answer_batch_async(questions, concurrency=AI_BATCH_CONCURRENCY, rate=0):
+    """answer_batch 的异步版本（异步生成器），并发由信号量控制，不占用线程。"""
+    started = time.perf_counter()
+    plan, graph_json = await asyncio.to_thread(_plan_batch, _shared_processor(), questions)
+    limiter = RateLimiter(rate) if rate else None
+    semaphore = asyncio.Semaphore(concurrency)
+    llm = get_async_client()
+
+    async def ask(question, evidence, idxs):
+        async with semaphore:
+            if limiter is not None:
+                await limiter.acquire_async()
+            try:
+                completion = await llm.chat.completions.create(
+                    model=LLM_MODEL, messages=build_messages(build_prompt(question, evidence, graph_json))
+                )
+                return idxs, clean_answer(completion), None
+            except Exception as e:
+                return idxs, None, str(e)
+
+    errors = 0
+    tasks = [asyncio.ensure_future(ask(*p)) for p in plan]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            idxs, answer, error = await next_done
+            if error is not None:
+                errors += len(idxs)
+            for item in _batch_items(questions, idxs, answer, error):
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+    yield _batch_summary(questions, plan, errors, started)
+
+
+@bp.route('/ai_ask', methods=['POST'])
+def ai_ask():
+    data = request.get_json() or {}
+    user_question = data.get('question', '你是谁？')
+    try:
+        return jsonify(answer_question(user_question))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route('/ai_ask/batch', methods=['POST'])
+def ai_ask_batch():
+    questions, concurrency, rate, error = parse_batch_request(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+    # NDJSON 流：每完成一个问题输出一行，最后一行为汇总
+    lines = (json.dumps(item, ensure_ascii=False) + '\n' for item in answer_batch(questions, concurrency, rate))
+    return Response(lines, mimetype='application/x-ndjson')
+
+
+@bp.route('/rag/search', methods=['GET'])
+def rag_search():
+    """调试检索效果：返回问题的融合检索结果、各路（bm25 / vector / ppr）的名次与分数及邻域关系句，不调用大模型。"""
+    question = (request.args.get('q') or '').strip()
+    if not question:
+        return jsonify({'error': '缺少参数 q'}), 400
+    try:
+        k = max(1, min(int(request.args.get('k', RETRIEVE_K)), 100))
+    except ValueError:
+        return jsonify({'error': 'k 必须是整数'}), 400
+    try:
+        index, hits, facts = retrieve_hits(_shared_processor(), question, k)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'question': question, 'graphVersion': index.version, 'hits': hits, 'facts': facts})
@@ -2,14 +2,14 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
 
-from neo4j_ops import neo4j_driver
+from neo4j_ops import read_session
 
 bp = Blueprint('analysis', __name__)
 
 
 @bp.route('/api/graph/stats', methods=['GET'])
 def get_graph_stats():
-    with neo4j_driver.session() as session:
+    with read_session() as session:
         try:
             result = session.run(
                 """
@@ -99,7 +99,7 @@ def get_graph_stats():
 @bp.route('/api/ranking/centrality', methods=['GET'])
 def get_centrality_ranking():
     limit = request.args.get('limit', 20, type=int)
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         try:
             max_result = session.run(
                 """
@@ -132,7 +132,7 @@ def get_centrality_ranking():
 
 @bp.route('/api/debug/relationships', methods=['GET'])
 def debug_relationships():
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         try:
             result = session.run(
                 """
@@ -189,7 +189,7 @@ def debug_relationships():
 def get_centrality():
     metric = request.args.get('metric', 'degree')
     limit = request.args.get('limit', default=10, type=int)
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         if metric == 'degree':
             result = session.run(
                 """
@@ -236,7 +236,7 @@ def get_centrality():
 
 @bp.route('/api/network/communities', methods=['GET'])
 def detect_communities():
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         result = session.run(
             """
             MATCH (p:Person)
@@ -270,7 +270,7 @@ def detect_communities():
 
 @bp.route('/api/network/triangles', methods=['GET'])
 def find_triangles():
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         result = session.run(
             """
             MATCH (a:Person)-[r1:RELATES]-(b:Person)-[r2:RELATES]-(c:Person)-[r3:RELATES]-(a)
@@ -293,7 +293,7 @@ def calculate_influence():
     depth = request.args.get('depth', default=3, type=int)
     if not person_id:
         return jsonify({'error': 'ID不能为空'}), 400
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         result = session.run(
             f"""
             MATCH path = (start:Person)-[*1..{depth}]-(influenced:Person)
@@ -322,7 +322,7 @@ def find_all_paths():
     max_length = request.args.get('maxLength', default=4, type=int)
     if not start_id or not end_id:
         return jsonify({'error': '起点和终点ID不能为空'}), 400
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         result = session.run(
             f"""
             MATCH path = (a:Person)-[*1..{max_length}]-(b:Person)
@@ -346,7 +346,7 @@ def recommend_connections():
     person_id = request.args.get('id')
     if not person_id:
         return jsonify({'error': 'ID不能为空'}), 400
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         result = session.run(
             """
             MATCH (p:Person)-[:RELATES*2]-(recommended:Person)
@@ -375,7 +375,7 @@ def recommend_connections():
 @bp.route('/api/network/pattern', methods=['GET'])
 def find_pattern():
     pattern_type = request.args.get('type', 'chain')
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         if pattern_type == 'chain':
             result = session.run(
                 """
@@ -424,7 +424,7 @@ def calculate_similarity():
     person_id = request.args.get('id')
     if not person_id:
         return jsonify({'error': 'ID不能为空'}), 400
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         result = session.run(
             """
             MATCH (p:Person) WHERE elementId(p) = $person_id
@@ -457,7 +457,7 @@ def calculate_similarity():
 
 @bp.route('/api/network/bridges', methods=['GET'])
 def find_bridges():
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         result = session.run(
             """
             MATCH (a:Person)-[r:RELATES]-(b:Person)
@@ -478,7 +478,7 @@ def find_bridges():
 
 @bp.route('/api/network/density', methods=['GET'])
 def calculate_density():
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         stats = session.run(
             """
             MATCH (p:Person)
@@ -527,101 +527,82 @@ def calculate_density():
             'avgClustering': float(clustering['avgClustering']) if clustering['avgClustering'] else 0,
             'maxClustering': float(clustering['maxClustering']) if clustering['maxClustering'] else 0
         })
-from flask import Blueprint, request, jsonify
+import itertools
+import json
+
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from datetime import datetime
 
-from neo4j_ops import neo4j_get_graph
+from neo4j_ops import neo4j_get_graph, read_session
+from graph_cache import get_snapshot
+from graph_cycles import CycleSearch
+from graph_motifs import get_motif_census
+from graph_recommend import get_recommender, METRICS as RECOMMEND_METRICS
+from graph_similarity import get_similarity_index
+from graph_bridges import get_biconnectivity
 
 bp = Blueprint('analysis', __name__)
 
+# 环枚举允许的最大长度，防止请求把搜索空间放大到不可控
+MAX_CYCLE_LENGTH = 8
+
 
 @bp.route('/api/graph/stats', methods=['GET'])
 def get_graph_stats():
-    from neo4j_ops import neo4j_driver
-    try:
-        with neo4j_driver.session() as session:
-            result = session.run(
-                """
-                MATCH (p:Person)
-                WITH count(p) as nodeCount
-                OPTIONAL MATCH ()-[r]-()
-                WITH nodeCount, count(r) as totalRelCount
-                RETURN nodeCount, totalRelCount as relationshipCount
-                """
-            ).single()
-
-            node_count = result['nodeCount']
-            rel_count = result['relationshipCount']
+    """图统计：基于内存快照计算，适用于所有存储后端。
 
-            degree_result = session.run(
-                """
-                MATCH (p:Person)
-                OPTIONAL MATCH (p)-[]-()
-                WITH p, count(*) as degree
-                RETURN avg(degree) as avgDegree, max(degree) as maxDegree, min(degree) as minDegree
-                """
-            ).single()
-
-            avg_degree = degree_result['avgDegree'] or 0
-            max_degree = degree_result['maxDegree'] or 0
-            min_degree = degree_result['minDegree'] or 0
-
-            if node_count <= 1:
-                density = 0
-            else:
-                density = rel_count / (node_count * (node_count - 1))
-
-            all_nodes_result = session.run(
-                "MATCH (p:Person) RETURN elementId(p) as id, p.name as name, p.occupation as occupation"
-            )
-            all_nodes = {record['id']: {'id': record['id'], 'name': record['name'], 'occupation': record['occupation']} 
-                        for record in all_nodes_result}
-
-            edges_result = session.run(
-                "MATCH (a:Person)-[:RELATES]-(b:Person) RETURN DISTINCT elementId(a) as source, elementId(b) as target"
-            )
-            edges = [(record['source'], record['target']) for record in edges_result]
-
-            parent = {node_id: node_id for node_id in all_nodes.keys()}
-
-            def find(x):
-                if parent[x] != x:
-                    parent[x] = find(parent[x])
-                return parent[x]
-
-            def union(x, y):
-                px, py = find(x), find(y)
-                if px != py:
-                    parent[px] = py
-
-            for source, target in edges:
-                if source in parent and target in parent:
-                    union(source, target)
-
-            component_groups = {}
-            for node_id in all_nodes.keys():
-                root = find(node_id)
-                if root not in component_groups:
-                    component_groups[root] = []
-                component_groups[root].append(node_id)
-
-            components = []
-            for idx, (root, node_ids) in enumerate(sorted(component_groups.items(), key=lambda x: len(x[1]), reverse=True)):
-                nodes = [all_nodes[node_id] for node_id in sorted(node_ids, key=lambda x: all_nodes[x]['name'])]
-                components.append({'id': idx + 1, 'size': len(nodes), 'nodes': nodes})
-
-            response = {
-                'nodeCount': node_count,
-                'relationshipCount': rel_count,
-                'avgDegree': float(avg_degree),
-                'maxDegree': max_degree,
-                'minDegree': min_degree,
-                'density': float(density),
-                'components': components,
-                'componentCount': len(components)
-            }
-
-            return jsonify(response), 200
+    relationshipCount 与原 Cypher 的无向匹配 ()-[r]-() 一致，每条关系计两次；
+    度数为每个人物相连的关系数（自环计两次），连通分量按无向邻接计算。
+    """
+    try:
+        snap = get_snapshot()
+        node_count = len(snap)
+        degree = [0] * node_count
+        for s, t, _, _ in snap.edges:
+            degree[s] += 1
+            degree[t] += 1
+        rel_count = 2 * len(snap.edges)
+
+        if node_count <= 1:
+            density = 0
+        else:
+            density = rel_count / (node_count * (node_count - 1))
+
+        all_nodes = [{'id': snap.ids[i], 'name': snap.names[i], 'occupation': snap.props[i].get('occupation')}
+                     for i in range(node_count)]
+
+        # 在无向邻接表上按 BFS 求连通分量
+        component_of = [-1] * node_count
+        groups = []
+        for root in range(node_count):
+            if component_of[root] >= 0:
+                continue
+            component_of[root] = len(groups)
+            members = [root]
+            for u in members:
+                for v in snap.adj[u]:
+                    if component_of[v] < 0:
+                        component_of[v] = len(groups)
+                        members.append(v)
+            groups.append(members)
+
+        components = []
+        for idx, members in enumerate(sorted(groups, key=len, reverse=True)):
+            nodes = [all_nodes[i] for i in sorted(members, key=lambda i: all_nodes[i]['name'] or '')]
+            components.append({'id': idx + 1, 'size': len(nodes), 'nodes': nodes})
+
+        response = {
+            'nodeCount': node_count,
+            'relationshipCount': rel_count,
+            'avgDegree': float(sum(degree) / node_count) if node_count else 0.0,
+            'maxDegree': max(degree, default=0),
+            'minDegree': min(degree, default=0),
+            'density': float(density),
+            'components': components,
+            'componentCount': len(components)
+        }
+
+        return jsonify(response), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -629,9 +610,8 @@ def get_graph_stats():
 @bp.route('/api/ranking/centrality', methods=['GET'])
 def get_centrality_ranking():
     limit = request.args.get('limit', 20, type=int)
-    from neo4j_ops import neo4j_driver
     try:
-        with neo4j_driver.session() as session:
+        with read_session() as session:
             max_result = session.run(
                 """
                 MATCH (p:Person)
@@ -661,9 +641,8 @@ def get_centrality_ranking():
 
 @bp.route('/api/debug/relationships', methods=['GET'])
 def debug_relationships():
-    from neo4j_ops import neo4j_driver
     try:
-        with neo4j_driver.session() as session:
+        with read_session() as session:
             result = session.run("""
                 MATCH ()-[r]->()
                 RETURN type(r) as type, count(r) as count
@@ -711,8 +690,7 @@ def debug_relationships():
 def get_centrality():
     metric = request.args.get('metric', 'degree')
     limit = request.args.get('limit', default=10, type=int)
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
+    with read_session() as session:
         if metric == 'degree':
             result = session.run(
                 """
@@ -758,8 +736,7 @@ def get_centrality():
 
 @bp.route('/api/network/communities', methods=['GET'])
 def detect_communities():
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
+    with read_session() as session:
         result = session.run(
             """
             MATCH (p:Person)
@@ -791,8 +768,7 @@ def detect_communities():
 
 @bp.route('/api/network/triangles', methods=['GET'])
 def find_triangles():
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
+    with read_session() as session:
         result = session.run(
             """
             MATCH (a:Person)-[r1:RELATES]-(b:Person)-[r2:RELATES]-(c:Person)-[r3:RELATES]-(a)
@@ -815,8 +791,7 @@ def calculate_influence():
     depth = request.args.get('depth', default=3, type=int)
     if not person_id:
         return jsonify({'error': 'ID不能为空'}), 400
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
+    with read_session() as session:
         result = session.run(
             f"""
             MATCH path = (start:Person)-[*1..{depth}]-(influenced:Person)
@@ -845,8 +820,7 @@ def find_all_paths():
     max_length = request.args.get('maxLength', default=4, type=int)
     if not start_id or not end_id:
         return jsonify({'error': '起点和终点ID不能为空'}), 400
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
+    with read_session() as session:
         result = session.run(
             f"""
             MATCH path = (a:Person)-[*1..{max_length}]-(b:Person)
@@ -868,10 +842,57 @@ def find_all_paths():
 @bp.route('/api/network/recommend', methods=['GET'])
 def recommend_connections():
     person_id = request.args.get('id')
+    metric = request.args.get('metric', 'common')
+    limit = request.args.get('limit', default=10, type=int)
     if not person_id:
         return jsonify({'error': 'ID不能为空'}), 400
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
+    if metric not in RECOMMEND_METRICS:
+        return jsonify({'error': '不支持的推荐指标'}), 400
+    if limit <= 0:
+        return jsonify({'error': 'limit 必须为正整数'}), 400
+    try:
+        try:
+            rec = get_recommender()
+        except RuntimeError:
+            # 未安装 scipy 时回退到 Cypher 实现
+            return jsonify({'personId': person_id, 'recommendations': _recommend_via_cypher(person_id)})
+        snap = rec.snapshot
+        idx = snap.id_index.get(person_id)
+        if idx is None:
+            return jsonify({'personId': person_id, 'recommendations': []})
+        mine = set(snap.adj[idx])
+        recommendations = []
+        for r in rec.recommend(idx, metric=metric, k=limit):
+            c = r['index']
+            props = snap.props[c]
+            mutual = [snap.names[w] for w in snap.adj[c] if w in mine]
+            recommendations.append({
+                'id': snap.ids[c],
+                'name': snap.names[c],
+                'age': props.get('age'),
+                'occupation': props.get('occupation'),
+                'mutualFriends': r['common'],
+                'mutualFriendNames': mutual[:5],
+                'adamicAdar': r['adamic_adar'],
+                'resourceAllocation': r['resource_allocation']
+            })
+        return jsonify({'personId': person_id, 'metric': metric, 'recommendations': recommendations})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/network/recommend/precompute', methods=['POST'])
+def precompute_recommendations():
+    k = request.args.get('k', default=10, type=int)
+    try:
+        rec = get_recommender(precompute_k=k)
+        return jsonify({'message': '推荐预计算完成', 'nodeCount': len(rec.snapshot), 'k': rec.precomputed_k})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _recommend_via_cypher(person_id):
+    with read_session() as session:
         result = session.run(
             """
             MATCH (p:Person)-[:RELATES*2]-(recommended:Person)
@@ -893,15 +914,22 @@ def recommend_connections():
             """,
             person_id=person_id
         )
-        recommendations = [dict(record) for record in result]
-        return jsonify({'personId': person_id, 'recommendations': recommendations})
+        return [dict(record) for record in result]
 
 
 @bp.route('/api/network/pattern', methods=['GET'])
 def find_pattern():
     pattern_type = request.args.get('type', 'chain')
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
+    if pattern_type == 'cycle':
+        return _find_cycles()
+    if pattern_type in ('chain', 'star'):
+        try:
+            census = get_motif_census()
+        except RuntimeError:
+            census = None  # 未安装 scipy 时回退到下方的 Cypher 查询
+        if census is not None:
+            return _sampled_pattern(census, pattern_type)
+    with read_session() as session:
         if pattern_type == 'chain':
             result = session.run(
                 """
@@ -927,86 +955,186 @@ def find_pattern():
                 LIMIT 10
                 """
             )
-        elif pattern_type == 'cycle':
-            result = session.run(
-                """
-                MATCH path = (a:Person)-[:RELATES*3..5]-(a)
-                WHERE length(path) >= 3
-                WITH path, 
-                     [node in nodes(path) | {id: elementId(node), name: node.name}] as cycle
-                RETURN DISTINCT cycle, length(path) as cycleLength
-                LIMIT 20
-                """
-            )
         else:
             return jsonify({'error': '不支持的模式类型'}), 400
         patterns = [dict(record) for record in result]
         return jsonify({'patternType': pattern_type, 'count': len(patterns), 'patterns': patterns})
 
 
+def _sampled_pattern(census, pattern_type):
+    snap = census.snapshot
+    if pattern_type == 'chain':
+        patterns = [
+            {'chain': [snap.node_brief(n) for n in path], 'relationTypes': census.relation_types(path)}
+            for path in census.sample('chain3', k=20)
+        ]
+        total = census.overall['directed']['chain3']
+    else:
+        patterns = [
+            {'centerId': snap.ids[star[0]], 'centerName': snap.names[star[0]],
+             'connectedNodes': [snap.node_brief(n) for n in star[1:]], 'degree': len(star) - 1}
+            for star in census.sample('star', k=10)
+        ]
+        total = census.overall['undirected']['star3']
+    return jsonify({'patternType': pattern_type, 'count': len(patterns), 'total': total, 'patterns': patterns})
+
+
+@bp.route('/api/network/motifs', methods=['GET'])
+def motif_census():
+    samples = min(request.args.get('samples', default=3, type=int), 20)
+    try:
+        census = get_motif_census()
+        snap = census.snapshot
+        examples = {}
+        for motif in ('wedge', 'triangle', 'path3', 'star3', 'square', 'chain3'):
+            examples[motif] = [
+                {'nodes': [snap.node_brief(n) for n in inst], 'relationTypes': census.relation_types(inst)}
+                for inst in census.sample(motif, k=samples)
+            ]
+        return jsonify({
+            'overall': census.overall,
+            'byRelationType': [{'type': t, 'counts': c} for t, c in census.by_type.items()],
+            'samples': examples
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _find_cycles():
+    # 每个简单环只输出一次（规范旋转），stream=true 时以 NDJSON 逐条返回
+    min_length = request.args.get('minLength', default=3, type=int)
+    max_length = min(request.args.get('maxLength', default=5, type=int), MAX_CYCLE_LENGTH)
+    limit = request.args.get('limit', default=20, type=int)
+    budget_ms = request.args.get('timeBudgetMs', default=2000, type=int)
+    stream = request.args.get('stream', 'false').lower() == 'true'
+    if limit <= 0:
+        return jsonify({'error': 'limit 必须为正整数'}), 400
+    try:
+        snap = get_snapshot()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    search = CycleSearch(snap.adj, min_length, max_length, time_budget=budget_ms / 1000.0)
+    emitted = [0]
+
+    def cycles():
+        # islice 在取满 limit 个后即停止，不会再多搜索一个环
+        for cycle in itertools.islice(search, limit):
+            emitted[0] += 1
+            yield {'cycle': [snap.node_brief(n) for n in cycle], 'cycleLength': len(cycle)}
+
+    def truncated():
+        # 超出时间预算，或输出达到 limit（不再继续搜索，可能还有更多环）
+        return search.truncated or emitted[0] >= limit
+
+    if stream:
+        def generate():
+            for item in cycles():
+                yield json.dumps(item, ensure_ascii=False) + '\n'
+            yield json.dumps({'done': True, 'truncated': truncated()}) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    patterns = list(cycles())
+    return jsonify({'patternType': 'cycle', 'count': len(patterns), 'truncated': truncated(), 'patterns': patterns})
+
+
 @bp.route('/api/network/similarity', methods=['GET'])
 def calculate_similarity():
     person_id = request.args.get('id')
+    limit = request.args.get('limit', default=10, type=int)
     if not person_id:
         return jsonify({'error': 'ID不能为空'}), 400
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
-        result = session.run(
-            """
-            MATCH (p:Person) WHERE elementId(p) = $person_id
-            MATCH (p)-[:RELATES]-(neighbor1:Person)
-            WITH p, collect(DISTINCT neighbor1) as neighbors1
-            
-            MATCH (other:Person) WHERE other <> p
-            MATCH (other)-[:RELATES]-(neighbor2:Person)
-            WITH p, neighbors1, other, collect(DISTINCT neighbor2) as neighbors2
-            
-            WITH p, other, neighbors1, neighbors2,
-                 [n in neighbors1 WHERE n in neighbors2] as common,
-                 neighbors1 + [n in neighbors2 WHERE NOT n in neighbors1] as union
-            WHERE size(common) > 0
-            
-            RETURN elementId(other) as id,
-                   other.name as name,
-                   other.occupation as occupation,
-                   size(common) as commonNeighbors,
-                   size(union) as totalNeighbors,
-                   toFloat(size(common)) / size(union) as similarity
-            ORDER BY similarity DESC
-            LIMIT 10
-            """,
-            person_id=person_id
-        )
-        similar = [dict(record) for record in result]
+    try:
+        index = get_similarity_index()
+        snap = index.snapshot
+        idx = snap.id_index.get(person_id)
+        similar = []
+        if idx is not None:
+            for r in index.top_k(idx, k=limit):
+                c = r['index']
+                similar.append({
+                    'id': snap.ids[c],
+                    'name': snap.names[c],
+                    'occupation': snap.props[c].get('occupation'),
+                    'commonNeighbors': r['common'],
+                    'totalNeighbors': r['union'],
+                    'similarity': r['similarity']
+                })
         return jsonify({'personId': person_id, 'similarNodes': similar})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/network/similarity/graph', methods=['GET'])
+def similarity_graph():
+    threshold = request.args.get('threshold', default=0.5, type=float)
+    limit = request.args.get('limit', default=200, type=int)
+    try:
+        index = get_similarity_index()
+        snap = index.snapshot
+        edges = index.similarity_graph(threshold)
+        return jsonify({
+            'threshold': threshold,
+            'totalEdges': len(edges),
+            'edges': [
+                {'source': snap.ids[u], 'sourceName': snap.names[u],
+                 'target': snap.ids[v], 'targetName': snap.names[v], 'similarity': sim}
+                for u, v, sim in edges[:limit]
+            ]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
 @bp.route('/api/network/bridges', methods=['GET'])
 def find_bridges():
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
-        result = session.run(
-            """
-            MATCH (a:Person)-[r:RELATES]-(b:Person)
-            WITH a, b, r,
-                 size([(a)-[:RELATES]-(other:Person) WHERE other <> b | 1]) as a_degree,
-                 size([(b)-[:RELATES]-(other:Person) WHERE other <> a | 1]) as b_degree
-            WHERE a_degree = 0 OR b_degree = 0
-            RETURN elementId(a) as id_a, a.name as name_a,
-                   elementId(b) as id_b, b.name as name_b,
-                   r.type as relationType,
-                   elementId(r) as relId
-            LIMIT 20
-            """
-        )
-        bridges = [dict(record) for record in result]
-        return jsonify({'count': len(bridges), 'bridges': bridges})
+    kind = request.args.get('kind', 'bridges')
+    page = max(request.args.get('page', default=1, type=int), 1)
+    page_size = min(max(request.args.get('pageSize', default=20, type=int), 1), 500)
+    if kind not in ('bridges', 'articulation', 'components'):
+        return jsonify({'error': '不支持的查询类型'}), 400
+    try:
+        bc = get_biconnectivity()
+        snap = bc.snapshot
+        offset = (page - 1) * page_size
+        response = {
+            'kind': kind,
+            'page': page,
+            'pageSize': page_size,
+            'bridgeCount': len(bc.bridges),
+            'articulationPointCount': len(bc.articulation_points),
+            'componentCount': len(bc.components)
+        }
+        if kind == 'bridges':
+            bridges = []
+            for a, b, rtype, rel_id in bc.bridges[offset:offset + page_size]:
+                bridges.append({
+                    'id_a': snap.ids[a], 'name_a': snap.names[a],
+                    'id_b': snap.ids[b], 'name_b': snap.names[b],
+                    'relationType': rtype,
+                    'relId': rel_id
+                })
+            response.update({'count': len(bridges), 'total': len(bc.bridges), 'bridges': bridges})
+        elif kind == 'articulation':
+            points = []
+            for idx in bc.articulation_points[offset:offset + page_size]:
+                item = snap.node_brief(idx)
+                item['degree'] = len(snap.adj[idx])
+                points.append(item)
+            response.update({'count': len(points), 'total': len(bc.articulation_points), 'articulationPoints': points})
+        else:
+            components = [
+                {'size': len(members), 'members': [snap.node_brief(i) for i in members]}
+                for members in bc.components[offset:offset + page_size]
+            ]
+            response.update({'count': len(components), 'total': len(bc.components), 'components': components})
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
 @bp.route('/api/network/density', methods=['GET'])
 def calculate_density():
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
+    with read_session() as session:
         stats = session.run(
             """
             MATCH (p:Person)
@@ -5,11 +5,20 @@ from datetime import datetime, timedelta
 
 from neo4j_ops import (
     neo4j_add_person, neo4j_update_person, neo4j_delete_person,
-    neo4j_add_relationship, neo4j_delete_relationship, neo4j_get_graph, neo4j_init_data
+    neo4j_add_relationship, neo4j_delete_relationship, neo4j_get_graph, neo4j_init_data,
+    bump_graph_version, Neo4jUnavailableError, read_session, write_session, get_pool_stats,
+    get_slow_queries, get_slow_query, clear_slow_queries
 )
 
 from data_loader import EXPORT_DIR
 from graph_proc import GraphProcessor
+from graph_store import get_store
+from graph_cache import get_snapshot
+from graph_paths import bidirectional_bfs, batch_shortest_paths, MAX_BATCH_PAIRS
+from graph_oracle import get_oracle
+from search_index import get_search_index, SEARCH_FIELDS
+from autocomplete import get_autocomplete_index
+from rag_jobs import get_rag_runner, schedule_rag_rebuild
 
 bp = Blueprint('basic', __name__)
 
@@ -61,7 +70,7 @@ def delete_relationship(rel_id):
 
 @bp.route('/api/nodes', methods=['GET'])
 def get_all_nodes():
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         try:
             result = session.run(
                 """
@@ -80,7 +89,7 @@ def get_all_nodes():
 def create_node():
     data = request.json
     try:
-        with __import__('neo4j_ops').neo4j_driver.session() as session:
+        with write_session() as session:
             result = session.run(
                 """
                 CREATE (n:Person {
@@ -106,7 +115,7 @@ def create_node():
 
 @bp.route('/api/relationships', methods=['GET'])
 def get_all_relationships():
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         try:
             result = session.run(
                 """
@@ -117,6 +126,8 @@ def get_all_relationships():
             )
             relationships = [dict(record) for record in result]
             return jsonify(relationships), 200
+        except Neo4jUnavailableError as e:
+            return jsonify({'error': str(e)}), e.status
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
@@ -132,7 +143,7 @@ def import_graph():
     if not data or 'nodes' not in data or 'relationships' not in data:
         return jsonify({'error': '无效的 JSON 格式'}), 400
 
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with write_session() as session:
         try:
             session.run("MATCH (n) DETACH DELETE n")
             for node in data['nodes']:
@@ -227,29 +238,31 @@ def query_person():
     name = request.args.get('name')
     if not name:
         return jsonify({'error': '请提供姓名'}), 400
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
-        result = session.run(
-            """
-            MATCH (p:Person {name: $name})
-            OPTIONAL MATCH (p)-[r:RELATES]-(other)
-            RETURN elementId(p) as id, p.name as name, p.age as age, p.occupation as occupation, p.description as description,
-                   collect(DISTINCT {id: elementId(r), source: elementId(startNode(r)), target: elementId(endNode(r)), type: r.type}) as relationships
-            """,
-            name=name
-        )
-        record = result.single()
-        if not record:
-            return jsonify({'error': '人物未找到'}), 404
-        return jsonify({
-            'person': {
-                'id': record['id'],
-                'name': record['name'],
-                'age': record['age'],
-                'occupation': record['occupation'],
-                'description': record['description']
-            },
-            'relationships': [r for r in record['relationships'] if r['id'] is not None]
-        })
+    try:
+        with read_session() as session:
+            record = session.run(
+                """
+                MATCH (p:Person {name: $name})
+                OPTIONAL MATCH (p)-[r:RELATES]-(other)
+                RETURN elementId(p) as id, p.name as name, p.age as age, p.occupation as occupation, p.description as description,
+                       collect(DISTINCT {id: elementId(r), source: elementId(startNode(r)), target: elementId(endNode(r)), type: r.type}) as relationships
+                """,
+                name=name
+            ).single()
+    except Neo4jUnavailableError as e:
+        return jsonify({'error': str(e)}), e.status
+    if not record:
+        return jsonify({'error': '人物未找到'}), 404
+    return jsonify({
+        'person': {
+            'id': record['id'],
+            'name': record['name'],
+            'age': record['age'],
+            'occupation': record['occupation'],
+            'description': record['description']
+        },
+        'relationships': [r for r in record['relationships'] if r['id'] is not None]
+    })
 
 
 @bp.route('/api/search', methods=['GET'])
@@ -258,7 +271,7 @@ def search_advanced():
     field = request.args.get('field', 'name')
     if not keyword:
         return jsonify({'error': '搜索关键词不能为空'}), 400
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         query = f"""
         MATCH (p:Person)
         WHERE toLower(p.{field}) CONTAINS $keyword
@@ -273,18 +286,21 @@ def search_advanced():
 
 @bp.route('/api/relationships/type/<rel_type>', methods=['GET'])
 def get_relationships_by_type(rel_type):
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
-        result = session.run(
-            """
-            MATCH (a:Person)-[r:RELATES {type: $type}]->(b:Person)
-            RETURN elementId(a) as source_id, a.name as source_name,
-                   elementId(b) as target_id, b.name as target_name,
-                   elementId(r) as rel_id, r.type as type
-            """,
-            type=rel_type
-        )
-        rels = [dict(record) for record in result]
-        return jsonify(rels)
+    try:
+        with read_session() as session:
+            result = session.run(
+                """
+                MATCH (a:Person)-[r:RELATES {type: $type}]->(b:Person)
+                RETURN elementId(a) as source_id, a.name as source_name,
+                       elementId(b) as target_id, b.name as target_name,
+                       elementId(r) as rel_id, r.type as type
+                """,
+                type=rel_type
+            )
+            rels = [dict(record) for record in result]
+    except Neo4jUnavailableError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify(rels)
 
 
 @bp.route('/api/network/path', methods=['GET'])
@@ -293,7 +309,7 @@ def find_path():
     end_name = request.args.get('end')
     if not start_name or not end_name:
         return jsonify({'error': '起点和终点名称不能为空'}), 400
-    with __import__('neo4j_ops').neo4j_driver.session() as session:
+    with read_session() as session:
         try:
             result = session.run(
                 """
@@ -321,7 +337,7 @@ def add_person():
     data = request.json
     if not data.get('name'):
         return jsonify({'error': '姓名不能为空'}), 400
-    person, error = neo4j_add_person(data)
+    person, error = get_store().add_person(data)
     if error:
         return jsonify({'error': error}), 400
     
@@ -331,7 +347,7 @@ def add_person():
 @bp.route('/api/persons/<person_id>', methods=['PUT'])
 def update_person(person_id):
     data = request.json
-    person, error = neo4j_update_person(person_id, data)
+    person, error = get_store().update_person(person_id, data)
     if error:
         return jsonify({'error': error}), 400
     return jsonify(person)
@@ -339,7 +355,7 @@ def update_person(person_id):
 
 @bp.route('/api/persons/<person_id>', methods=['DELETE'])
 def delete_person(person_id):
-    if neo4j_delete_person(person_id):
+    if get_store().delete_person(person_id):
         return jsonify({'message': '删除成功'}), 200
     return jsonify({'error': '删除失败'}), 500
 
@@ -349,7 +365,7 @@ def add_relationship():
     data = request.json
     if not all(k in data for k in ['source', 'target', 'type']):
         return jsonify({'error': '缺少必要参数'}), 400
-    relationship, error = neo4j_add_relationship(data)
+    relationship, error = get_store().add_relationship(data)
     if error:
         return jsonify({'error': error}), 400
     
@@ -358,7 +374,7 @@ def add_relationship():
 
 @bp.route('/api/relationships/<rel_id>', methods=['DELETE'])
 def delete_relationship(rel_id):
-    if neo4j_delete_relationship(rel_id):
+    if get_store().delete_relationship(rel_id):
         
         return jsonify({'message': '删除成功'}), 200
     return jsonify({'error': '删除失败'}), 500
@@ -366,8 +382,7 @@ def delete_relationship(rel_id):
 
 @bp.route('/api/nodes', methods=['GET'])
 def get_all_nodes():
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
+    with read_session() as session:
         try:
             result = session.run(
                 """
@@ -385,9 +400,8 @@ def get_all_nodes():
 @bp.route('/api/nodes', methods=['POST'])
 def create_node():
     data = request.json
-    from neo4j_ops import neo4j_driver
     try:
-        with neo4j_driver.session() as session:
+        with write_session() as session:
             result = session.run(
                 """
                 CREATE (n:Person {
@@ -406,6 +420,7 @@ def create_node():
                 }
             )
             record = result.single()
+            bump_graph_version()
             return jsonify(dict(record)), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -413,8 +428,7 @@ def create_node():
 
 @bp.route('/api/relationships', methods=['GET'])
 def get_all_relationships():
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
+    with read_session() as session:
         try:
             result = session.run(
                 """
@@ -425,13 +439,15 @@ def get_all_relationships():
             )
             relationships = [dict(record) for record in result]
             return jsonify(relationships), 200
+        except Neo4jUnavailableError as e:
+            return jsonify({'error': str(e)}), e.status
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
 
 @bp.route('/api/graph', methods=['GET'])
 def get_graph():
-    return jsonify(neo4j_get_graph())
+    return jsonify(get_store().get_graph())
 
 
 @bp.route('/api/graph/import', methods=['POST'])
@@ -440,45 +456,36 @@ def import_graph():
     if not data or 'nodes' not in data or 'relationships' not in data:
         return jsonify({'error': '无效的 JSON 格式'}), 400
 
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
-        try:
-            session.run("MATCH (n) DETACH DELETE n")
-            for node in data['nodes']:
-                session.run(
-                    """
-                    MERGE (p:Person {name: $name})
-                    ON CREATE SET p.age = $age, p.occupation = $occupation, p.description = $description
-                    """,
-                    name=node['name'],
-                    age=node.get('age'),
-                    occupation=node.get('occupation'),
-                    description=node.get('description', '')
-                )
-
-            for rel in data['relationships']:
-                source_idx = int(rel['source']) - 1 if isinstance(rel['source'], str) else rel['source'] - 1
-                target_idx = int(rel['target']) - 1 if isinstance(rel['target'], str) else rel['target'] - 1
-                if 0 <= source_idx < len(data['nodes']) and 0 <= target_idx < len(data['nodes']):
-                    session.run(
-                        """
-                        MATCH (a:Person {name: $source_name}), (b:Person {name: $target_name})
-                        MERGE (a)-[r:RELATES {type: $type}]->(b)
-                        """,
-                        source_name=data['nodes'][source_idx]['name'],
-                        target_name=data['nodes'][target_idx]['name'],
-                        type=rel.get('type', '关系')
-                    )
-
-            return jsonify({'message': '导入成功'}), 200
-        except Exception as e:
-            return jsonify({'error': str(e)}), 400
+    try:
+        nodes = data['nodes']
+        persons = [{
+            'name': node['name'],
+            'age': node.get('age'),
+            'occupation': node.get('occupation'),
+            'description': node.get('description', '')
+        } for node in nodes]
+        relations = []
+        for rel in data['relationships']:
+            source_idx = int(rel['source']) - 1 if isinstance(rel['source'], str) else rel['source'] - 1
+            target_idx = int(rel['target']) - 1 if isinstance(rel['target'], str) else rel['target'] - 1
+            if 0 <= source_idx < len(nodes) and 0 <= target_idx < len(nodes):
+                relations.append({
+                    'source_name': nodes[source_idx]['name'],
+                    'target_name': nodes[target_idx]['name'],
+                    'type': rel.get('type', '关系')
+                })
+        get_store().replace_graph(persons, relations, merge=True)
+        # 向量重建在后台执行，响应只带任务编号，进度见 /api/rag/jobs/<id>
+        job = schedule_rag_rebuild('graph_import')
+        return jsonify({'message': '导入成功', 'ragJobId': job['id']}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
 
 
 @bp.route('/api/graph/export', methods=['POST'])
 def export_graph():
     try:
-        export_data = request.get_json() if request.is_json else neo4j_get_graph()
+        export_data = request.get_json() if request.is_json else get_store().get_graph()
         os.makedirs(EXPORT_DIR, exist_ok=True)
         import time
         timestamp = int(time.time() * 1000)
@@ -494,8 +501,9 @@ def export_graph():
 @bp.route('/api/init', methods=['POST'])
 def init_data():
     dataset = request.args.get('dataset', 'qing-dynasty')
-    neo4j_init_data(dataset)
-    return jsonify({'message': '数据初始化成功'}), 200
+    get_store().init_data(dataset)
+    job = schedule_rag_rebuild(f'init:{dataset}')
+    return jsonify({'message': '数据初始化成功', 'ragJobId': job['id']}), 200
 
 
 @bp.route('/api/query', methods=['GET'])
@@ -503,67 +511,66 @@ def query_person():
     name = request.args.get('name')
     if not name:
         return jsonify({'error': '请提供姓名'}), 400
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
-        result = session.run(
-            """
-            MATCH (p:Person {name: $name})
-            OPTIONAL MATCH (p)-[r:RELATES]-(other)
-            RETURN elementId(p) as id, p.name as name, p.age as age, p.occupation as occupation, p.description as description,
-                   collect(DISTINCT {id: elementId(r), source: elementId(startNode(r)), target: elementId(endNode(r)), type: r.type}) as relationships
-            """,
-            name=name
-        )
-        record = result.single()
-        if not record:
-            return jsonify({'error': '人物未找到'}), 404
-        return jsonify({
-            'person': {
-                'id': record['id'],
-                'name': record['name'],
-                'age': record['age'],
-                'occupation': record['occupation'],
-                'description': record['description']
-            },
-            'relationships': [r for r in record['relationships'] if r['id'] is not None]
-        })
+    try:
+        with read_session() as session:
+            record = session.run(
+                """
+                MATCH (p:Person {name: $name})
+                OPTIONAL MATCH (p)-[r:RELATES]-(other)
+                RETURN elementId(p) as id, p.name as name, p.age as age, p.occupation as occupation, p.description as description,
+                       collect(DISTINCT {id: elementId(r), source: elementId(startNode(r)), target: elementId(endNode(r)), type: r.type}) as relationships
+                """,
+                name=name
+            ).single()
+    except Neo4jUnavailableError as e:
+        return jsonify({'error': str(e)}), e.status
+    if not record:
+        return jsonify({'error': '人物未找到'}), 404
+    return jsonify({
+        'person': {
+            'id': record['id'],
+            'name': record['name'],
+            'age': record['age'],
+            'occupation': record['occupation'],
+            'description': record['description']
+        },
+        'relationships': [r for r in record['relationships'] if r['id'] is not None]
+    })
 
 
 @bp.route('/api/search', methods=['GET'])
 def search_advanced():
     keyword = request.args.get('keyword', '').lower()
     field = request.args.get('field', 'name')
+    limit = request.args.get('limit', default=20, type=int)
     if not keyword:
         return jsonify({'error': '搜索关键词不能为空'}), 400
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
-        query = f"""
-        MATCH (p:Person)
-        WHERE toLower(p.{field}) CONTAINS $keyword
-        RETURN elementId(p) as id, p.name as name, p.age as age, 
-               p.occupation as occupation, p.description as description
-        LIMIT 20
-        """
-        results = session.run(query, keyword=keyword)
-        persons = [dict(record) for record in results]
+    if field != 'all' and field not in SEARCH_FIELDS:
+        return jsonify({'error': '不支持的搜索字段'}), 400
+    try:
+        persons = get_search_index().search(keyword, field=field, limit=limit)
         return jsonify(persons)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
 @bp.route('/api/relationships/type/<rel_type>', methods=['GET'])
 def get_relationships_by_type(rel_type):
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
-        result = session.run(
-            """
-            MATCH (a:Person)-[r:RELATES {type: $type}]->(b:Person)
-            RETURN elementId(a) as source_id, a.name as source_name,
-                   elementId(b) as target_id, b.name as target_name,
-                   elementId(r) as rel_id, r.type as type
-            """,
-            type=rel_type
-        )
-        rels = [dict(record) for record in result]
-        return jsonify(rels)
+    try:
+        with read_session() as session:
+            result = session.run(
+                """
+                MATCH (a:Person)-[r:RELATES {type: $type}]->(b:Person)
+                RETURN elementId(a) as source_id, a.name as source_name,
+                       elementId(b) as target_id, b.name as target_name,
+                       elementId(r) as rel_id, r.type as type
+                """,
+                type=rel_type
+            )
+            rels = [dict(record) for record in result]
+    except Neo4jUnavailableError as e:
+        return jsonify({'error': str(e)}), e.status
+    return jsonify(rels)
 
 
 @bp.route('/api/network/path', methods=['GET'])
@@ -572,24 +579,149 @@ def find_path():
     end_name = request.args.get('end')
     if not start_name or not end_name:
         return jsonify({'error': '起点和终点名称不能为空'}), 400
-    from neo4j_ops import neo4j_driver
-    with neo4j_driver.session() as session:
-        try:
-            result = session.run(
-                """
-                MATCH path = shortestPath((a:Person {name: $start_name})-[*]-(b:Person {name: $end_name}))
-                WITH path, length(path) as pathLength
-                UNWIND nodes(path) as node
-                RETURN node.name as name, pathLength
-                """,
-                start_name=start_name,
-                end_name=end_name
-            )
-            records = list(result)
-            if records:
-                path_length = records[0]['pathLength']
-                nodes_in_path = [{'name': r['name']} for r in records]
-                return jsonify({'pathLength': path_length, 'nodes': nodes_in_path})
-            return jsonify({'error': '未找到路径'}), 404
-        except Exception as e:
-            return jsonify({'error': f'查询失败: {str(e)}'}), 500
+    try:
+        snap = get_snapshot()
+        start_idx = snap.lookup(start_name)
+        end_idx = snap.lookup(end_name)
+        path = None
+        if start_idx is not None and end_idx is not None:
+            path = bidirectional_bfs(snap.adj, start_idx, end_idx)
+        if path:
+            return jsonify({'pathLength': len(path) - 1, 'nodes': [{'name': snap.names[i]} for i in path]})
+        return jsonify({'error': '未找到路径'}), 404
+    except Exception as e:
+        return jsonify({'error': f'查询失败: {str(e)}'}), 500
+
+
+@bp.route('/api/network/path/batch', methods=['POST'])
+def find_paths_batch():
+    data = request.get_json(silent=True) or {}
+    pairs = data.get('pairs')
+    if not isinstance(pairs, list) or not pairs:
+        return jsonify({'error': 'pairs 不能为空'}), 400
+    if len(pairs) > MAX_BATCH_PAIRS:
+        return jsonify({'error': f'单次最多查询 {MAX_BATCH_PAIRS} 对路径'}), 400
+
+    names = []
+    for pair in pairs:
+        if isinstance(pair, dict):
+            start_name, end_name = pair.get('start'), pair.get('end')
+        elif isinstance(pair, (list, tuple)) and len(pair) == 2:
+            start_name, end_name = pair
+        else:
+            return jsonify({'error': '路径对格式应为 {start, end} 或 [start, end]'}), 400
+        if not start_name or not end_name:
+            return jsonify({'error': '起点和终点名称不能为空'}), 400
+        names.append((start_name, end_name))
+
+    try:
+        snap = get_snapshot()
+        resolved = [(snap.lookup(s), snap.lookup(t)) for s, t in names]
+        valid = [i for i, (s, t) in enumerate(resolved) if s is not None and t is not None]
+        paths = batch_shortest_paths(snap.adj, [resolved[i] for i in valid])
+        path_by_pair = dict(zip(valid, paths))
+
+        results = []
+        for i, (start_name, end_name) in enumerate(names):
+            path = path_by_pair.get(i)
+            if path:
+                results.append({
+                    'start': start_name,
+                    'end': end_name,
+                    'pathLength': len(path) - 1,
+                    'nodes': [snap.node_brief(n) for n in path]
+                })
+            else:
+                results.append({'start': start_name, 'end': end_name, 'error': '未找到路径'})
+        return jsonify({'count': len(results), 'results': results})
+    except Exception as e:
+        return jsonify({'error': f'查询失败: {str(e)}'}), 500
+
+
+@bp.route('/api/network/distance', methods=['GET'])
+def estimate_distance():
+    start_name = request.args.get('start')
+    end_name = request.args.get('end')
+    exact = request.args.get('exact', 'true').lower() != 'false'
+    if not start_name or not end_name:
+        return jsonify({'error': '起点和终点名称不能为空'}), 400
+    try:
+        oracle = get_oracle()
+        snap = oracle.snapshot
+        start_idx = snap.lookup(start_name)
+        end_idx = snap.lookup(end_name)
+        if start_idx is None or end_idx is None:
+            return jsonify({'error': '人物未找到'}), 404
+        lower, upper, distance = oracle.distance(start_idx, end_idx, exact=exact)
+        return jsonify({
+            'start': start_name,
+            'end': end_name,
+            'connected': lower is not None,
+            'lowerBound': lower,
+            'upperBound': upper,
+            'distance': distance
+        })
+    except Exception as e:
+        return jsonify({'error': f'查询失败: {str(e)}'}), 500
+
+
+@bp.route('/api/autocomplete', methods=['GET'])
+def autocomplete():
+    prefix = request.args.get('prefix', '').strip()
+    limit = request.args.get('limit', default=10, type=int)
+    if not prefix:
+        return jsonify({'error': '前缀不能为空'}), 400
+    if limit <= 0:
+        return jsonify({'error': 'limit 必须为正整数'}), 400
+    try:
+        return jsonify(get_autocomplete_index().complete(prefix, limit=limit))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/api/db/pool', methods=['GET'])
+def db_pool_stats():
+    return jsonify(dict(get_pool_stats(), store=get_store().name))
+
+
+@bp.route('/api/debug/slow-queries', methods=['GET'])
+def list_slow_queries():
+    limit = request.args.get('limit', default=50, type=int)
+    if limit <= 0:
+        return jsonify({'error': 'limit 必须为正整数'}), 400
+    return jsonify(get_slow_queries(limit))
+
+
+@bp.route('/api/debug/slow-queries/<int:entry_id>', methods=['GET'])
+def slow_query_detail(entry_id):
+    entry = get_slow_query(entry_id)
+    if entry is None:
+        return jsonify({'error': '慢查询记录不存在或已被淘汰'}), 404
+    return jsonify(entry)
+
+
+@bp.route('/api/debug/slow-queries', methods=['DELETE'])
+def reset_slow_queries():
+    clear_slow_queries()
+    return jsonify({'message': '慢查询日志已清空'})
+
+
+@bp.route('/api/rag/rebuild', methods=['POST'])
+def rag_rebuild():
+    return jsonify(schedule_rag_rebuild('manual')), 202
+
+
+@bp.route('/api/rag/jobs', methods=['GET'])
+def rag_jobs():
+    limit = request.args.get('limit', default=20, type=int)
+    if limit <= 0:
+        return jsonify({'error': 'limit 必须为正整数'}), 400
+    return jsonify(get_rag_runner().recent(limit))
+
+
+@bp.route('/api/rag/jobs/<int:job_id>', methods=['GET'])
+def rag_job_status(job_id):
+    job = get_rag_runner().get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在或已从历史中移除'}), 404
+    return jsonify(job)
@@ -0,0 +1,171 @@
+import heapq
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from neo4j_ops import add_graph_listener, get_graph_version
+from graph_cache import get_snapshot
+
+SEARCH_FIELDS = ('name', 'occupation', 'description')
+# field='all' 时各字段命中的权重
+_FIELD_WEIGHTS = {'name': 3.0, 'occupation': 2.0, 'description': 1.0}
+
+
+def _normalize(text) -> str:
+    return str(text).lower() if text is not None else ''
+
+
+def _grams(text: str):
+    """单字与相邻双字（bigram）集合；更长的查询用其全部 bigram 求交集后再做子串校验。"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class SearchIndex:
+    """人物姓名/职业/描述的字符 n-gram 倒排索引，支持子串匹配。
+
+    - 每个字段维护 gram -> 文档编号集合 的倒排表；
+    - 查询时取查询串的全部 bigram（单字查询取单字）对应的倒排集合，从最小的开始求交集，
+      再对候选做 `in` 子串校验，避免 Neo4j 的全标签扫描；
+    - 结果按匹配质量排序：完全相等 > 前缀 > 子串，同级别下文本越短（查询覆盖率越高）越靠前；
+    - 通过 neo4j_ops 的写操作监听器对单个人物的增删改做增量维护，批量变更时整体重建。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = -1
+        self.dirty = True
+        self._docs = {}          # 文档编号 -> 人物记录
+        self._texts = {}         # 文档编号 -> {field: 归一化文本}
+        self._by_id = {}         # elementId -> 文档编号
+        self._postings = {f: defaultdict(set) for f in SEARCH_FIELDS}
+        self._next_doc = 0
+
+    # ---------- 构建与增量维护 ----------
+
+    def rebuild(self, snapshot) -> None:
+        with self._lock:
+            self._docs.clear()
+            self._texts.clear()
+            self._by_id.clear()
+            self._postings = {f: defaultdict(set) for f in SEARCH_FIELDS}
+            for nid, props in zip(snapshot.ids, snapshot.props):
+                self._add(dict(props, id=nid))
+            self.version = snapshot.version
+            self.dirty = False
+
+    def _add(self, person: Dict[str, Any]) -> None:
+        doc = self._next_doc
+        self._next_doc += 1
+        record = {
+            'id': person.get('id'),
+            'name': person.get('name'),
+            'age': person.get('age'),
+            'occupation': person.get('occupation'),
+            'description': person.get('description'),
+        }
+        texts = {f: _normalize(record[f]) for f in SEARCH_FIELDS}
+        self._docs[doc] = record
+        self._texts[doc] = texts
+        self._by_id[record['id']] = doc
+        for f, text in texts.items():
+            postings = self._postings[f]
+            for g in _grams(text):
+                postings[g].add(doc)
+
+    def _remove(self, person_id) -> None:
+        doc = self._by_id.pop(person_id, None)
+        if doc is None:
+            return
+        texts = self._texts.pop(doc)
+        self._docs.pop(doc)
+        for f, text in texts.items():
+            postings = self._postings[f]
+            for g in _grams(text):
+                bucket = postings.get(g)
+                if bucket is not None:
+                    bucket.discard(doc)
+                    if not bucket:
+                        del postings[g]
+
+    def on_graph_change(self, version: int, event: Optional[str], payload: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            if self.dirty:
+                return
+            if event == 'person_upsert' and payload and payload.get('id') is not None:
+                self._remove(payload['id'])
+                self._add(payload)
+            elif event == 'person_delete' and payload:
+                self._remove(payload.get('id'))
+            elif event in ('relationship_add', 'relationship_delete'):
+                pass
+            else:
+                self.dirty = True
+                return
+            self.version = version
+
+    # ---------- 查询 ----------
+
+    def search(self, keyword: str, field: str = 'name', limit: int = 20) -> List[Dict[str, Any]]:
+        q = _normalize(keyword)
+        if not q:
+            return []
+        with self._lock:
+            if field == 'all':
+                best = {}
+                for f in SEARCH_FIELDS:
+                    weight = _FIELD_WEIGHTS[f]
+                    for neg_score, name, doc in self._match(f, q):
+                        score = neg_score * weight
+                        if score < best.get(doc, (0.0,))[0]:
+                            best[doc] = (score, name, doc)
+                scored = best.values()
+            else:
+                scored = self._match(field, q)
+            top = heapq.nsmallest(limit, scored)
+            return [dict(self._docs[doc]) for _, _, doc in top]
+
+    def _match(self, field: str, q: str):
+        """返回 [(-质量, 姓名, 文档编号)]，便于直接按元组排序。
+
+        质量 = 匹配级别（相等 3 / 前缀 2 / 子串 1）+ 查询覆盖率 len(q) / len(text)。
+        """
+        postings = self._postings[field]
+        grams = {q} if len(q) == 1 else {q[i:i + 2] for i in range(len(q) - 1)}
+        sets = []
+        for g in grams:
+            bucket = postings.get(g)
+            if not bucket:
+                return []
+            sets.append(bucket)
+        sets.sort(key=len)
+        candidates = sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+        texts = self._texts
+        qlen = len(q)
+        out = []
+        for doc in candidates:
+            t = texts[doc]
+            text = t[field]
+            pos = text.find(q)
+            if pos < 0:
+                continue
+            level = 3.0 if text == q else (2.0 if pos == 0 else 1.0)
+            out.append((-(level + qlen / len(text)), t['name'], doc))
+        return out
+
+
+_search_index = SearchIndex()
+add_graph_listener(_search_index.on_graph_change)
+_search_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """返回与当前图版本一致的搜索索引；未构建、被标记为需重建或版本落后时从快照全量重建。"""
+    index = _search_index
+    if not index.dirty and index.version == get_graph_version():
+        return index
+    with _search_index_lock:
+        if index.dirty or index.version != get_graph_version():
+            index.rebuild(get_snapshot())
+    return index
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+from metrics import SINGLEFLIGHT_CALLS, SINGLEFLIGHT_CANCELLED, SINGLEFLIGHT_FAILURES, SINGLEFLIGHT_IN_FLIGHT
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Flight:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """合并并发的相同调用：同一 key 同一时刻只执行一次，其余调用方等待并共享其结果或异常。
+
+    - `do` 用于线程（同步视图）：首个调用方（leader）在自身线程中执行，其余调用方阻塞等待；
+    - `do_async` 用于事件循环：计算在独立任务中执行，不属于任何一个请求。某个调用方被取消
+      （如客户端断开）只会让它自己退出等待，其余调用方照常拿到结果；全部调用方都取消后才中止计算。
+
+    调用结束即移除 key，失败结果不会被缓存，之后到达的请求会重新计算。
+    name 用作指标中的 group 标签。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._flights = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            SINGLEFLIGHT_CALLS.inc(self.name, 'follower')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        SINGLEFLIGHT_CALLS.inc(self.name, 'leader')
+        SINGLEFLIGHT_IN_FLIGHT.inc(self.name)
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            # KeyboardInterrupt 等非 Exception 只中断 leader 自己，等待方收到普通错误
+            call.error = e if isinstance(e, Exception) else RuntimeError(f'合并的调用被中断: {e!r}')
+            SINGLEFLIGHT_FAILURES.inc(self.name)
+            raise
+        finally:
+            # 先移除再唤醒，保证此后到达的请求开始新一轮计算
+            with self._lock:
+                self._calls.pop(key, None)
+            SINGLEFLIGHT_IN_FLIGHT.dec(self.name)
+            call.done.set()
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """`await fn(*args, **kwargs)` 的合并版本；须在同一个事件循环中调用。"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn(*args, **kwargs)))
+            flight.task.add_done_callback(lambda task: self._finish(key, flight))
+            SINGLEFLIGHT_CALLS.inc(self.name, 'leader')
+            SINGLEFLIGHT_IN_FLIGHT.inc(self.name)
+        else:
+            SINGLEFLIGHT_CALLS.inc(self.name, 'follower')
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.task.cancelled():
+                # 计算本身被中止（而非当前调用方被取消）：对仍在等待的调用方表现为普通错误
+                raise RuntimeError('合并的调用已被取消') from None
+            raise
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # 所有调用方都已放弃等待：中止计算，并立即让出 key 以免新请求加入一个正在取消的任务
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    def _finish(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        SINGLEFLIGHT_IN_FLIGHT.dec(self.name)
+        if flight.task.cancelled():
+            SINGLEFLIGHT_CANCELLED.inc(self.name)
+        elif flight.task.exception() is not None:
+            SINGLEFLIGHT_FAILURES.inc(self.name)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._flights)
@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import random
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# 常见姓氏与名字用字；名字为 1~2 个字，重名时追加排行后缀
+_SURNAMES = (
+    '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘于蒋蔡余杜叶程苏魏吕丁任沈姚卢姜崔钟谭陆汪范金石廖贾夏韦付方白邹孟熊秦邱江尹薛闫段雷侯龙史陶黎贺顾毛郝龚邵万钱严覃武戴莫孔向汤'
+)
+_GIVEN_CHARS = (
+    '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华玉兰萍鹏辉建国志红金宇浩凯俊峰琳晨欣雪梅林海燕波斌宁云'
+    '飞鑫瑞博文思嘉诗雨晓天子轩涵怡佳乐安然一鸣德成立新正永春秋冬生荣福寿康宏达远'
+)
+_ORDINALS = '甲乙丙丁戊己庚辛壬癸'
+_OCCUPATIONS = (
+    '教师', '医生', '工程师', '商人', '律师', '学生', '农民', '厨师', '画家', '作家',
+    '程序员', '会计', '记者', '护士', '司机', '警察', '设计师', '研究员', '公务员', '音乐家'
+)
+_CITIES = ('北京', '上海', '广州', '深圳', '杭州', '成都', '武汉', '西安', '南京', '苏州', '长沙', '青岛')
+# 社区内部与跨社区关系使用不同的类型分布，便于按关系类型做统计
+_INTRA_TYPES = ('同事', '朋友', '同学', '邻居', '亲戚', '夫妻', '兄弟', '师徒')
+_INTER_TYPES = ('合作伙伴', '客户', '校友', '网友', '点头之交')
+
+MODELS = ('er', 'ba', 'community')
+
+
+def _names(n: int, rng: random.Random) -> List[str]:
+    """生成 n 个互不相同的中文姓名。"""
+    names = []
+    seen = set()
+    while len(names) < n:
+        name = rng.choice(_SURNAMES) + ''.join(rng.choice(_GIVEN_CHARS) for _ in range(rng.choice((1, 2, 2))))
+        if name in seen:
+            # 姓名空间接近饱和时追加排行与序号，保证唯一
+            name = f'{name}{rng.choice(_ORDINALS)}{len(names)}'
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def _er_edges(n: int, avg_degree: float, rng: np.random.Generator) -> np.ndarray:
+    """Erdős–Rényi G(n, m)：均匀采样 m = n·k/2 个不同的无向点对。"""
+    m = min(int(n * avg_degree / 2), n * (n - 1) // 2)
+    edges = set()
+    while len(edges) < m:
+        need = m - len(edges)
+        a = rng.integers(0, n, size=need + need // 10 + 16)
+        b = rng.integers(0, n, size=a.size)
+        for u, v in zip(a.tolist(), b.tolist()):
+            if u != v:
+                edges.add((u, v) if u < v else (v, u))
+                if len(edges) >= m:
+                    break
+    return np.array(sorted(edges), dtype=np.int64).reshape(-1, 2)
+
+
+def _ba_edges(n: int, avg_degree: float, rng: np.random.Generator) -> np.ndarray:
+    """Barabási–Albert 优先连接：每个新节点连 m = k/2 条边，度分布呈幂律（少数枢纽人物）。"""
+    m = max(1, int(round(avg_degree / 2)))
+    m = min(m, max(1, n - 1))
+    # repeated 中每个节点出现的次数等于其度数，均匀抽取即按度数比例抽取
+    repeated = list(range(m))
+    edges = []
+    for v in range(m, n):
+        targets = set()
+        while len(targets) < m:
+            targets.add(repeated[int(rng.integers(0, len(repeated)))] if repeated else int(rng.integers(0, v)))
+        for t in targets:
+            edges.append((t, v))
+        repeated.extend(targets)
+        repeated.extend([v] * m)
+    return np.array(edges, dtype=np.int64).reshape(-1, 2)
+
+
+def _community_edges(n: int, avg_degree: float, rng: np.random.Generator, communities: int,
+                     mixing: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """带社区结构的随机图（种植划分模型）：比例 mixing 的边跨社区，其余落在社区内部。
+
+    返回 (edges, 每条边是否跨社区, 每个节点的社区编号)。
+    """
+    communities = max(1, min(communities, n))
+    membership = np.sort(rng.integers(0, communities, size=n))
+    members = [np.flatnonzero(membership == c) for c in range(communities)]
+    members = [m for m in members if len(m) >= 2] or [np.arange(n)]
+    sizes = np.array([len(m) for m in members], dtype=np.float64)
+    m_total = int(n * avg_degree / 2)
+    m_inter = int(m_total * mixing) if len(members) > 1 else 0
+    m_intra = m_total - m_inter
+
+    edges = set()
+    inter = set()
+    # 社区内部：按社区规模比例分配边数
+    per_comm = rng.multinomial(m_intra, sizes / sizes.sum())
+    for comm, count in zip(members, per_comm):
+        cap = len(comm) * (len(comm) - 1) // 2
+        count = min(int(count), cap)
+        got = 0
+        while got < count:
+            a = comm[rng.integers(0, len(comm), size=count - got + 8)]
+            b = comm[rng.integers(0, len(comm), size=a.size)]
+            for u, v in zip(a.tolist(), b.tolist()):
+                if u != v:
+                    key = (u, v) if u < v else (v, u)
+                    if key not in edges:
+                        edges.add(key)
+                        got += 1
+                        if got >= count:
+                            break
+    got = 0
+    attempts = 0
+    while got < m_inter and attempts < 20:
+        attempts += 1
+        a = rng.integers(0, n, size=m_inter - got + 8)
+        b = rng.integers(0, n, size=a.size)
+        for u, v in zip(a.tolist(), b.tolist()):
+            if membership[u] != membership[v]:
+                key = (u, v) if u < v else (v, u)
+                if key not in edges:
+                    edges.add(key)
+                    inter.add(key)
+                    got += 1
+                    if got >= m_inter:
+                        break
+    ordered = sorted(edges)
+    arr = np.array(ordered, dtype=np.int64).reshape(-1, 2)
+    is_inter = np.array([e in inter for e in ordered], dtype=bool)
+    return arr, is_inter, membership
+
+
+def generate_dataset(num_nodes: int, model: str = 'ba', avg_degree: float = 6.0, communities: int = 0,
+                     mixing: float = 0.1, seed: int = 42, directed_fraction: float = 0.5) -> Dict[str, Any]:
+    """生成与 data/*.json 相同格式的合成人物关系数据集。
+
+    - model: 'er'（Erdős–Rényi）、'ba'（Barabási–Albert 幂律）、'community'（社区结构）；
+    - avg_degree: 期望平均度数；communities 为 0 时取 max(2, n // 200)；
+    - 关系方向随机：以 directed_fraction 的概率从编号大的一端指向编号小的一端，便于有向模体统计。
+    """
+    if model not in MODELS:
+        raise ValueError(f'不支持的生成模型: {model}')
+    rng = random.Random(seed)
+    nrng = np.random.default_rng(seed)
+
+    membership = None
+    is_inter = None
+    if model == 'er':
+        edges = _er_edges(num_nodes, avg_degree, nrng)
+    elif model == 'ba':
+        edges = _ba_edges(num_nodes, avg_degree, nrng)
+    else:
+        k = communities or max(2, num_nodes // 200)
+        edges, is_inter, membership = _community_edges(num_nodes, avg_degree, nrng, k, mixing)
+
+    names = _names(num_nodes, rng)
+    nodes = []
+    for i, name in enumerate(names):
+        occupation = _OCCUPATIONS[rng.randrange(len(_OCCUPATIONS))]
+        city = _CITIES[rng.randrange(len(_CITIES))]
+        group = f'，属于第{int(membership[i]) + 1}个圈子' if membership is not None else ''
+        nodes.append({
+            'id': i + 1,
+            'name': name,
+            'age': rng.randint(18, 80),
+            'occupation': occupation,
+            'description': f'来自{city}的{occupation}{group}'
+        })
+
+    flips = nrng.random(len(edges)) < directed_fraction
+    type_draws = nrng.integers(0, 1 << 30, size=len(edges))
+    relationships = []
+    for i, (u, v) in enumerate(edges.tolist()):
+        if flips[i]:
+            u, v = v, u
+        types = _INTER_TYPES if (is_inter is not None and is_inter[i]) else _INTRA_TYPES
+        relationships.append({
+            'id': i + 1,
+            'source': u + 1,
+            'target': v + 1,
+            'type': types[type_draws[i] % len(types)]
+        })
+
+    return {
+        'name': f'合成数据集（{model}, n={num_nodes}）',
+        'description': f'model={model}, avg_degree={avg_degree}, seed={seed}',
+        'nodes': nodes,
+        'relationships': relationships
+    }
+
+
+def parse_dataset_name(dataset: str):
+    """解析形如 'synthetic-ba-10000' 的数据集名，返回 (model, num_nodes)；不是合成数据集时返回 None。"""
+    parts = dataset.split('-')
+    if len(parts) != 3 or parts[0] != 'synthetic' or parts[1] not in MODELS:
+        return None
+    try:
+        num_nodes = int(parts[2])
+    except ValueError:
+        return None
+    return (parts[1], num_nodes) if num_nodes > 0 else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成合成人物关系数据集（data_loader JSON 格式）')
+    parser.add_argument('--nodes', type=int, default=1000)
+    parser.add_argument('--model', choices=MODELS, default='ba')
+    parser.add_argument('--avg-degree', type=float, default=6.0)
+    parser.add_argument('--communities', type=int, default=0)
+    parser.add_argument('--mixing', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help='输出文件，默认 data/synthetic_<model>_<nodes>.json')
+    args = parser.parse_args()
+
+    data = generate_dataset(args.nodes, args.model, args.avg_degree, args.communities, args.mixing, args.seed)
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data',
+                                   f'synthetic_{args.model}_{args.nodes}.json')
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    print(f"已生成 {len(data['nodes'])} 个人物、{len(data['relationships'])} 条关系 -> {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 测试使用嵌入式 SQLite 后端，不需要 Neo4j 服务
+os.environ.setdefault('GRAPH_STORE', 'sqlite')
+
+from graph_cache import GraphSnapshot  # noqa: E402
+
+
+def to_store_format(data):
+    """把 data/*.json 格式的数据集转换为 read_all 返回的 (nodes, rels)。"""
+    nodes = [{'id': str(n['id']), 'labels': ['Person'], 'props': {k: v for k, v in n.items() if k != 'id'}}
+             for n in data.get('nodes', [])]
+    rels = [{'id': str(r.get('id', i)), 'source': str(r['source']), 'target': str(r['target']),
+             'label': 'REL', 'props': {'type': r.get('type')}}
+            for i, r in enumerate(data.get('relationships', []))]
+    return nodes, rels
+
+
+@pytest.fixture
+def make_snapshot():
+    def make(data):
+        return GraphSnapshot(*to_store_format(data))
+    return make
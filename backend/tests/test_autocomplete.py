@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from autocomplete import AutocompleteIndex
+
+
+def _expected(index, prefix, limit):
+    items = sorted((-deg, name, nid) for nid, (name, deg) in index._entries.items()
+                   if name.lower().startswith(prefix))
+    return [{'id': nid, 'name': name, 'degree': -neg} for neg, name, nid in items[:limit]]
+
+
+def _index(make_snapshot, names, edges, **kwargs):
+    data = {'nodes': [{'id': i, 'name': name} for i, name in enumerate(names)],
+            'relationships': [{'id': i, 'source': s, 'target': t} for i, (s, t) in enumerate(edges)]}
+    index = AutocompleteIndex(**kwargs)
+    index.rebuild(make_snapshot(data))
+    return index
+
+
+def test_non_bmp_names_are_found(make_snapshot):
+    names = ['𠀀一', '𠀀二', '\U0010FFFF甲', 'a\U0010FFFF', 'a\U0010FFFFb', '张三', '张𠀀', '张\uffff']
+    index = _index(make_snapshot, names, [], prefix_len=1)
+    assert {r['name'] for r in index.complete('𠀀')} == {'𠀀一', '𠀀二'}
+    assert [r['name'] for r in index.complete('\U0010FFFF')] == ['\U0010FFFF甲']
+    # 长于 prefix_len 的前缀、或 limit 大于 k 时走区间扫描
+    assert {r['name'] for r in index.complete('张', 20)} == {'张三', '张𠀀', '张\uffff'}
+    assert {r['name'] for r in index.complete('a\U0010FFFF')} == {'a\U0010FFFF', 'a\U0010FFFFb'}
+
+
+@pytest.mark.parametrize('slack', [0, 3])
+def test_incremental_updates_match_brute_force(make_snapshot, slack):
+    rng = random.Random(slack)
+    names = [rng.choice('张王李') + rng.choice('一二三四') + str(i) for i in range(60)]
+    edges = [(rng.randrange(60), rng.randrange(60)) for _ in range(120)]
+    index = _index(make_snapshot, names, edges, prefix_len=2, top_k=4, slack=slack)
+    index.version = 0
+    next_rel = len(edges)
+    for step in range(400):
+        op = rng.random()
+        if op < 0.4:
+            next_rel += 1
+            index.on_graph_change(step, 'relationship_add', {'id': str(next_rel), 'source': str(rng.randrange(60)),
+                                                             'target': str(rng.randrange(60))})
+        elif op < 0.75 and index._rel_ends:
+            index.on_graph_change(step, 'relationship_delete', {'id': rng.choice(sorted(index._rel_ends))})
+        elif op < 0.9:
+            nid = str(rng.randrange(60))
+            index.on_graph_change(step, 'person_upsert', {'id': nid, 'name': rng.choice('张王李') + str(step)})
+        else:
+            index.on_graph_change(step, 'person_delete', {'id': str(rng.randrange(60))})
+        assert not index.dirty
+        for prefix in ('张', '王', '李', '张一', '王二'):
+            assert index.complete(prefix, 4) == _expected(index, prefix, 4)
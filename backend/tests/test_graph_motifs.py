@@ -0,0 +1,41 @@
+import pytest
+
+graph_motifs = pytest.importorskip('graph_motifs')
+if not graph_motifs._has_scipy:
+    pytest.skip('需要 scipy', allow_module_level=True)
+
+
+@pytest.mark.parametrize('num_nodes', [0, 1, 5])
+def test_edgeless_graph_counts_are_zero(make_snapshot, num_nodes):
+    data = {'nodes': [{'id': i, 'name': f'n{i}'} for i in range(num_nodes)], 'relationships': []}
+    census = graph_motifs.MotifCensus(make_snapshot(data))
+    assert all(v == 0 for v in census.overall['undirected'].values())
+    assert all(v == 0 for v in census.overall['directed'].values())
+    assert census.by_type == {}
+
+
+def test_self_loops_only(make_snapshot):
+    data = {'nodes': [{'id': 1, 'name': 'a'}], 'relationships': [{'id': 1, 'source': 1, 'target': 1}]}
+    census = graph_motifs.MotifCensus(make_snapshot(data))
+    assert census.overall['directed']['directedEdge'] == 0
+
+
+def test_chain_counts(make_snapshot):
+    # 1→2→3→4：一条 3 边链、两条 2 边链
+    data = {'nodes': [{'id': i, 'name': f'n{i}'} for i in range(1, 5)],
+            'relationships': [{'id': i, 'source': i, 'target': i + 1} for i in range(1, 4)]}
+    directed = graph_motifs.MotifCensus(make_snapshot(data)).overall['directed']
+    assert (directed['chain2'], directed['chain3']) == (2, 1)
+
+
+def test_pair_with_several_types_counts_for_each(make_snapshot):
+    data = {'nodes': [{'id': i, 'name': f'n{i}'} for i in range(1, 4)],
+            'relationships': [{'id': 1, 'source': 1, 'target': 2, 'type': '朋友'},
+                              {'id': 2, 'source': 1, 'target': 2, 'type': '同事'},
+                              {'id': 3, 'source': 2, 'target': 3, 'type': '同事'}]}
+    census = graph_motifs.MotifCensus(make_snapshot(data))
+    assert census.overall['directed']['directedEdge'] == 2
+    assert census.by_type['朋友']['directed']['directedEdge'] == 1
+    assert census.by_type['同事']['directed']['directedEdge'] == 2
+    assert census.by_type['同事']['directed']['chain2'] == 1
+    assert census.relation_types([0, 1, 2]) == ['朋友', '同事']
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+graph_ppr = pytest.importorskip('graph_ppr')
+if not graph_ppr._has_scipy:
+    pytest.skip('需要 scipy', allow_module_level=True)
+
+# 0-1-2-3 为一条链，4 与 0 相连，5 为孤立节点（无出边）；含一条重复边与一个自环
+SOURCES = [0, 1, 2, 0, 1, 3]
+TARGETS = [1, 2, 3, 4, 0, 3]
+N = 6
+
+
+@pytest.fixture(scope='module')
+def trans():
+    return graph_ppr.transition_matrix(N, SOURCES, TARGETS)
+
+
+def test_transition_matrix_is_column_stochastic(trans):
+    p, dangling = trans
+    assert p.shape == (N, N)
+    assert dangling.tolist() == [False, False, False, False, False, True]
+    col_sums = np.asarray(p.sum(axis=0)).ravel()
+    assert np.allclose(col_sums[~dangling], 1.0)
+    assert col_sums[dangling].tolist() == [0.0]
+    # 重复边去重、自环丢弃：节点 0 的邻居为 1 与 4，各占 1/2
+    assert np.allclose(p[:, 0].toarray().ravel(), [0, 0.5, 0, 0, 0.5, 0])
+    assert p[3, 3] == 0
+
+
+@pytest.mark.parametrize('seeds', [{0: 1.0}, {2: 3.0, 4: 1.0}, {5: 1.0}])
+def test_result_sums_to_one(trans, seeds):
+    x, iterations = graph_ppr.personalized_pagerank(*trans, seeds)
+    assert abs(float(x.sum()) - 1.0) < 1e-4
+    assert (x >= 0).all()
+    assert 1 <= iterations <= graph_ppr.PPR_MAX_ITER
+
+
+def test_seed_dominates(trans):
+    x, _ = graph_ppr.personalized_pagerank(*trans, {2: 1.0})
+    assert int(np.argmax(x)) == 2
+    # 越远离种子分数越低
+    assert x[1] > x[0] > x[4]
+
+
+def test_dangling_seed_keeps_all_mass(trans):
+    x, _ = graph_ppr.personalized_pagerank(*trans, {5: 1.0})
+    assert np.allclose(x, np.eye(N)[5], atol=1e-6)
+
+
+def test_warm_start_matches_cold_start(trans):
+    cold, cold_iter = graph_ppr.personalized_pagerank(*trans, {0: 1.0}, tol=1e-8)
+    warm, warm_iter = graph_ppr.personalized_pagerank(*trans, {0: 1.0}, tol=1e-8, x0=cold)
+    assert np.allclose(warm, cold, atol=1e-6)
+    assert warm_iter < cold_iter
+    near, _ = graph_ppr.personalized_pagerank(*trans, {0: 1.0, 1: 0.5}, tol=1e-8)
+    from_near, _ = graph_ppr.personalized_pagerank(*trans, {0: 1.0}, tol=1e-8, x0=near)
+    assert np.allclose(from_near, cold, atol=1e-6)
+
+
+@pytest.mark.parametrize('max_iter', [0, -1])
+def test_non_positive_max_iter_returns_start_vector(trans, max_iter):
+    x, iterations = graph_ppr.personalized_pagerank(*trans, {1: 2.0, 3: 2.0}, max_iter=max_iter)
+    assert iterations == 0
+    assert np.allclose(x, [0, 0.5, 0, 0.5, 0, 0])
+
+
+def test_rejects_empty_seed_weight(trans):
+    with pytest.raises(ValueError):
+        graph_ppr.personalized_pagerank(*trans, {0: 0.0})
@@ -0,0 +1,25 @@
+import pytest
+
+from synthetic_data import generate_dataset
+
+graph_recommend = pytest.importorskip('graph_recommend')
+if not graph_recommend._has_scipy:
+    pytest.skip('需要 scipy', allow_module_level=True)
+
+
+@pytest.mark.parametrize('metric', graph_recommend.METRICS)
+def test_live_matches_precomputed_with_ties(make_snapshot, metric):
+    snap = make_snapshot(generate_dataset(200, 'ba', avg_degree=4, seed=75))
+    live = graph_recommend.Recommender(snap)
+    table = graph_recommend.Recommender(snap)
+    table.precompute(3)
+    for idx in range(len(snap)):
+        assert live.recommend(idx, metric, 3) == table.recommend(idx, metric, 3)
+
+
+def test_ties_break_by_index(make_snapshot):
+    # 星形图：所有叶子之间的共同邻居数都为 1
+    data = {'nodes': [{'id': i, 'name': f'n{i}'} for i in range(8)],
+            'relationships': [{'id': i, 'source': 0, 'target': i} for i in range(1, 8)]}
+    rec = graph_recommend.Recommender(make_snapshot(data))
+    assert [r['index'] for r in rec.recommend(7, 'common', 3)] == [1, 2, 3]
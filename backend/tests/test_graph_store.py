@@ -0,0 +1,27 @@
+import pytest
+
+from graph_store import GraphStore, Neo4jStore, SQLiteStore
+
+
+def test_backends_implement_every_abstract_method():
+    assert not Neo4jStore.__abstractmethods__
+    assert not SQLiteStore.__abstractmethods__
+
+
+def test_incomplete_backend_fails_at_construction():
+    class Partial(GraphStore):
+        def read_all(self):
+            return [], []
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_sqlite_round_trip():
+    store = SQLiteStore(':memory:')
+    person, error = store.add_person({'name': '孙悟空', 'occupation': '行者'})
+    assert error is None
+    store.add_person({'name': '唐僧'})
+    nodes, rels = store.read_all()
+    assert {n['props']['name'] for n in nodes} == {'孙悟空', '唐僧'}
+    assert rels == []
@@ -0,0 +1,68 @@
+import pytest
+
+from conftest import to_store_format
+from neo4j_ops import build_graph_corpus
+
+import hybrid_retriever
+from hybrid_retriever import HybridIndex
+
+# 链 唐僧 - 孙悟空 - 猪八戒 - 沙僧，另有 唐僧 - 白龙马
+DATA = {
+    'nodes': [{'id': i, 'name': name} for i, name in enumerate(['唐僧', '孙悟空', '猪八戒', '沙僧', '白龙马'])],
+    'relationships': [
+        {'source': 0, 'target': 1, 'type': '师徒'},
+        {'source': 1, 'target': 2, 'type': '师兄弟'},
+        {'source': 2, 'target': 3, 'type': '师兄弟'},
+        {'source': 0, 'target': 4, 'type': '坐骑'},
+    ],
+}
+
+
+@pytest.fixture(scope='module')
+def index():
+    return HybridIndex(*to_store_format(DATA))
+
+
+def _hits(*ids):
+    return [{'id': str(i), 'score': 1.0} for i in ids]
+
+
+def test_expand_orders_hop1_before_hop2(index):
+    facts = index.expand('唐僧的徒弟', _hits(0), hops=2)
+    hops = {(f['source'], f['target']): f['hop'] for f in facts}
+    assert hops == {('0', '1'): 1, ('0', '4'): 1, ('1', '2'): 2}
+    assert [f['hop'] for f in facts] == sorted(f['hop'] for f in facts)
+    assert max(f['score'] for f in facts if f['hop'] == 2) < min(f['score'] for f in facts if f['hop'] == 1)
+
+
+def test_expand_prefers_relations_sharing_terms_with_question(index):
+    facts = index.expand('唐僧的徒弟是谁，师徒关系', _hits(0), hops=1)
+    assert [(f['source'], f['target']) for f in facts][0] == ('0', '1')
+
+
+def test_expand_sentences_match_graph_corpus(index):
+    nodes, rels = to_store_format(DATA)
+    sentences = build_graph_corpus(nodes, rels)['relationships']
+    by_pair = {(r['source'], r['target']): text for r, text in zip(rels, sentences)}
+    for fact in index.expand('唐僧', _hits(0), hops=2):
+        assert fact['text'] == by_pair[(fact['source'], fact['target'])]
+
+
+def test_expand_stops_at_edge_budget(index, monkeypatch):
+    monkeypatch.setattr(hybrid_retriever, 'RAG_EXPAND_MAX_EDGES', 1)
+    assert len(index.expand('唐僧', _hits(0), hops=2)) == 1
+    monkeypatch.setattr(hybrid_retriever, 'RAG_EXPAND_MAX_EDGES', 0)
+    assert index.expand('唐僧', _hits(0), hops=2) == []
+
+
+def test_expand_respects_limit(index):
+    assert len(index.expand('唐僧', _hits(0), hops=2, limit=2)) == 2
+
+
+@pytest.mark.parametrize('kwargs', [{'hops': 0}, {'hops': -1}, {'limit': 0}, {'limit': -2}])
+def test_expand_non_positive_hops_or_limit_returns_nothing(index, kwargs):
+    assert index.expand('唐僧', _hits(0), **kwargs) == []
+
+
+def test_expand_without_known_hits_returns_nothing(index):
+    assert index.expand('唐僧', [{'id': 'missing', 'score': 1.0}]) == []
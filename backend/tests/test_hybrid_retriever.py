@@ -0,0 +1,125 @@
+import asyncio
+import json
+import os
+
+import numpy as np
+import pytest
+
+from conftest import to_store_format
+from neo4j_ops import build_graph_corpus
+
+tfidf_index = pytest.importorskip('tfidf_index')
+if not tfidf_index._has_sklearn:
+    pytest.skip('需要 scikit-learn', allow_module_level=True)
+
+import hybrid_retriever  # noqa: E402
+from hybrid_retriever import HybridIndex  # noqa: E402
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+QUESTIONS = ['孙悟空的师父是谁', '唐僧的徒弟有谁', '猪八戒是什么职业', 'no match here']
+
+
+@pytest.fixture(scope='module')
+def index():
+    with open(os.path.join(DATA_DIR, 'journey_to_west.json'), encoding='utf-8') as f:
+        nodes, rels = to_store_format(json.load(f))
+    texts = build_graph_corpus(nodes, rels)['corpus']
+    # TF-IDF 索引中的节点顺序与图中不同，并多出一个已删除的节点
+    order = list(range(len(nodes)))[::-1]
+    tfidf = tfidf_index.TfidfIndex.fit([nodes[i]['id'] for i in order] + ['gone'],
+                                       [texts[i] for i in order] + ['姓名：孙悟空'])
+    return HybridIndex(nodes, rels, tfidf=tfidf)
+
+
+def test_vector_scores_stay_sparse_and_align_to_documents(index):
+    scores = index.vector_scores(QUESTIONS)
+    assert not isinstance(scores, np.ndarray)
+    assert scores.shape == (len(QUESTIONS), len(index))
+    raw = index.tfidf.scores(index.tfidf.transform(QUESTIONS)).toarray()
+    for doc, nid in enumerate(index.ids):
+        col = index.tfidf.ids.index(nid)
+        assert np.allclose(scores[:, doc].toarray().ravel(), raw[:, col])
+
+
+def test_chinese_questions_get_vector_hits(index):
+    for question in QUESTIONS[:3]:
+        hits = index.search(question, 4)
+        assert any('vector' in h['sources'] for h in hits)
+
+
+def test_search_many_matches_search(index, monkeypatch):
+    # PPR 热启动只保证收敛精度内一致，这里只比较融合本身
+    monkeypatch.setattr(hybrid_retriever, 'RAG_PPR', False)
+    assert index.search_many(QUESTIONS, 4) == [index.search(q, 4) for q in QUESTIONS]
+
+
+def test_chinese_questions_get_bm25_hits(index):
+    for question in QUESTIONS[:3]:
+        assert index.bm25_scores(question).max() > 0
+        hits = index.search(question, 4)
+        assert any('bm25' in h['sources'] for h in hits)
+    assert index.bm25_scores(QUESTIONS[3]).max() == 0
+
+
+class _AsyncOnlyStore:
+    """只提供异步读取的存储：验证异步路径不回退到同步的 read_all。"""
+
+    name = 'async-only'
+
+    def __init__(self, nodes, rels):
+        self.nodes, self.rels = nodes, rels
+        self.reads = 0
+
+    def read_all(self):
+        raise AssertionError('异步路径不应调用同步 read_all')
+
+    async def read_all_async(self):
+        self.reads += 1
+        await asyncio.sleep(0)
+        return self.nodes, self.rels
+
+    async def load_embeddings_async(self, prop_name='embedding'):
+        return {}
+
+
+def test_async_index_rebuild_reads_through_async_store():
+    from graph_proc import GraphProcessor
+
+    with open(os.path.join(DATA_DIR, 'journey_to_west.json'), encoding='utf-8') as f:
+        nodes, rels = to_store_format(json.load(f))
+    store = _AsyncOnlyStore(nodes, rels)
+    gp = GraphProcessor(store=store)
+    hybrid_retriever.invalidate_hybrid_index()
+
+    async def run():
+        return await asyncio.gather(*(hybrid_retriever.get_hybrid_index_async(gp) for _ in range(4)))
+
+    indexes = asyncio.run(run())
+    assert store.reads == 1
+    assert all(index is indexes[0] for index in indexes)
+    assert len(indexes[0]) == len(nodes)
+    assert hybrid_retriever.peek_hybrid_index(gp) is indexes[0]
+    hybrid_retriever.invalidate_hybrid_index()
+
+
+def _name_of(index, hit):
+    return index.nodes[index.ids.index(hit['id'])]['props']['name']
+
+
+@pytest.mark.parametrize('question, entity', [('孙悟空的师父是谁', '孙悟空'), ('唐僧的徒弟有谁', '唐僧')])
+def test_named_entity_ranks_first(index, question, entity):
+    hits = index.search(question, 5)
+    assert _name_of(index, hits[0]) == entity
+
+
+def test_named_entity_kept_when_both_retrievers_miss_it(index, monkeypatch):
+    question = '孙悟空的师父是谁'
+    entity = index.match_entities(question)[0]
+    bm25 = index.bm25_scores(question)
+    bm25[entity] = 0.0
+    # 两路都没有召回该实体，且有其他节点得分更高
+    monkeypatch.setattr(index, 'bm25_scores', lambda q: bm25)
+    monkeypatch.setattr(index, 'vector_scores', lambda questions, query_vectors=None: None)
+    hits = index.search(question, 5)
+    assert hits[0]['id'] == index.ids[entity]
+    assert 'bm25' not in hits[0]['sources']
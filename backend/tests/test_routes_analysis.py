@@ -0,0 +1,60 @@
+import pytest
+
+
+@pytest.fixture
+def client():
+    from app import app
+    client = app.test_client()
+    assert client.post('/api/init?dataset=journey-to-west').status_code < 400
+    return client
+
+
+def test_graph_stats_on_sqlite(client):
+    resp = client.get('/api/graph/stats')
+    assert resp.status_code == 200
+    data = resp.get_json()
+    graph = client.get('/api/graph').get_json()
+    assert data['nodeCount'] == len(graph['nodes'])
+    # 与原 Cypher 的无向匹配一致：每条关系计两次
+    assert data['relationshipCount'] == 2 * len(graph['relationships'])
+    assert sum(c['size'] for c in data['components']) == data['nodeCount']
+    assert data['componentCount'] == len(data['components'])
+    assert data['minDegree'] <= data['avgDegree'] <= data['maxDegree']
+
+
+@pytest.mark.parametrize('limit', [0, -3])
+def test_recommend_rejects_non_positive_limit(client, limit):
+    person = client.get('/api/graph').get_json()['nodes'][0]
+    resp = client.get(f"/api/network/recommend?id={person['id']}&limit={limit}")
+    assert resp.status_code == 400
+
+
+def test_recommend_respects_limit(client):
+    person = client.get('/api/graph').get_json()['nodes'][0]
+    resp = client.get(f"/api/network/recommend?id={person['id']}&limit=2")
+    assert resp.status_code == 200
+    assert len(resp.get_json()['recommendations']) <= 2
+
+
+def test_cycles_report_truncation_at_limit(client):
+    full = client.get('/api/network/pattern?type=cycle&limit=1000').get_json()
+    assert full['count'] >= 2 and not full['truncated']
+    cut = client.get('/api/network/pattern?type=cycle&limit=1').get_json()
+    assert cut['count'] == 1 and cut['truncated']
+    assert cut['patterns'][0] == full['patterns'][0]
+    assert client.get('/api/network/pattern?type=cycle&limit=0').status_code == 400
+
+
+def test_cycle_search_is_not_advanced_past_limit(client, monkeypatch):
+    import routes_analysis
+    pulled = []
+
+    class Counting(routes_analysis.CycleSearch):
+        def __iter__(self):
+            for cycle in super().__iter__():
+                pulled.append(cycle)
+                yield cycle
+
+    monkeypatch.setattr(routes_analysis, 'CycleSearch', Counting)
+    client.get('/api/network/pattern?type=cycle&limit=2')
+    assert len(pulled) == 2
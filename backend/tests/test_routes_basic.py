@@ -0,0 +1,22 @@
+import pytest
+
+
+@pytest.fixture
+def client():
+    from app import app
+    return app.test_client()
+
+
+@pytest.mark.parametrize('url', [
+    '/api/query?name=孙悟空',
+    '/api/relationships/type/师徒',
+    '/api/relationships',
+])
+def test_neo4j_only_routes_return_json_501_on_sqlite(client, url):
+    resp = client.get(url)
+    assert resp.status_code == 501
+    assert 'Neo4j' in resp.get_json()['error']
+
+
+def test_query_requires_name(client):
+    assert client.get('/api/query').status_code == 400
@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+from conftest import to_store_format
+from neo4j_ops import build_graph_corpus
+
+tfidf_index = pytest.importorskip('tfidf_index')
+if not tfidf_index._has_sklearn:
+    pytest.skip('需要 scikit-learn', allow_module_level=True)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+@pytest.fixture(scope='module')
+def journey():
+    with open(os.path.join(DATA_DIR, 'journey_to_west.json'), encoding='utf-8') as f:
+        nodes, rels = to_store_format(json.load(f))
+    names = {n['id']: n['props']['name'] for n in nodes}
+    index = tfidf_index.TfidfIndex.fit([n['id'] for n in nodes], build_graph_corpus(nodes, rels)['corpus'])
+    return index, names
+
+
+@pytest.mark.parametrize('question, expected', [
+    ('孙悟空的师父是谁', '孙悟空'),
+    ('唐僧的徒弟有谁', '唐僧'),
+    ('猪八戒是什么职业', '猪八戒'),
+])
+def test_chinese_questions_hit_matching_nodes(journey, question, expected):
+    index, names = journey
+    scores = index.scores(index.transform([question]))
+    assert scores.nnz > 0
+    top = sorted(zip(scores.indices.tolist(), scores.data.tolist()), key=lambda x: -x[1])[:3]
+    assert expected in {names[index.ids[c]] for c, _ in top}
+
+
+def test_save_load_round_trip(journey, tmp_path):
+    index, _ = journey
+    path = str(tmp_path / 'tfidf_index.pkl')
+    index.save(path)
+    loaded = tfidf_index.load_tfidf_index(path)
+    question = index.transform(['孙悟空'])
+    assert loaded.ids == index.ids
+    assert (loaded.scores(question) != index.scores(question)).nnz == 0
+
+
+def test_graph_processor_tfidf_mode_keeps_queries_sparse(journey, monkeypatch):
+    import scipy.sparse as sp
+    from graph_proc import GraphProcessor
+
+    index, _ = journey
+    gp = GraphProcessor()
+    if gp._embed_model is not None:
+        pytest.skip('已加载 SBERT 模型')
+    monkeypatch.setattr(tfidf_index, 'load_tfidf_index', lambda: index)
+    qv = gp.embed_query('孙悟空的师父是谁')
+    assert sp.issparse(qv) and qv.shape == (1, index.dims)
+    # 不再对传入文本临时拟合词表
+    with pytest.raises(RuntimeError):
+        gp.embed_texts(['孙悟空'])
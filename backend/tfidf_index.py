@@ -0,0 +1,104 @@
+import os
+import pickle
+import threading
+
+import numpy as np
+
+from data_loader import TFIDF_INDEX_FILE
+
+# 词表上限：按字 1~2 元组计，中文语料的常用字与双字组合都能保留
+TFIDF_MAX_FEATURES = int(os.getenv('TFIDF_MAX_FEATURES', '8192'))
+# 出现在超过该比例节点中的词项（如每条描述都有的“姓名”“职业”）不入词表，否则每个问题都会命中几乎全部节点
+TFIDF_MAX_DF = float(os.getenv('TFIDF_MAX_DF', '0.5'))
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    _has_sklearn = True
+except Exception:
+    _has_sklearn = False
+
+
+class TfidfIndex:
+    """未安装 sentence-transformers 时的回退检索索引：在节点语料上拟合一次的 TF-IDF，全程保持 CSR 稀疏矩阵。
+
+    节点行向量与查询向量均经 L2 归一化，稀疏点积即余弦相似度；查询只做 transform，与节点处于同一向量空间。
+    特征为字的 1~2 元组（char_wb）：中文没有空格，按词切分会把整句当作一个词项，问题几乎无法命中。
+    """
+
+    def __init__(self, vectorizer, ids, matrix, fingerprint: str = ''):
+        self.vectorizer = vectorizer
+        self.ids = list(ids)
+        self.matrix = matrix.tocsr().astype(np.float32)
+        self.fingerprint = fingerprint
+        # 词项 × 节点：查询（CSR）右乘时无需再转置
+        self._by_term = self.matrix.T.tocsr()
+
+    @classmethod
+    def fit(cls, ids, texts, fingerprint: str = '', max_features: int = TFIDF_MAX_FEATURES,
+            max_df: float = TFIDF_MAX_DF):
+        if not _has_sklearn:
+            raise RuntimeError("没有可用的向量化工具：请安装 'sentence-transformers' 或 'scikit-learn'。")
+        error = None
+        # 节点很少时按比例过滤可能把词项删光，此时不做过滤重新拟合
+        for df in dict.fromkeys((max_df, 1.0)):
+            vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(1, 2), max_features=max_features,
+                                         max_df=df, dtype=np.float32)
+            try:
+                return cls(vectorizer, ids, vectorizer.fit_transform(texts), fingerprint)
+            except ValueError as e:
+                error = e
+        # 语料为空或全部是空白文本时词表为空
+        raise RuntimeError(f'无法拟合 TF-IDF 词表: {error}')
+
+    @property
+    def dims(self) -> int:
+        return self.matrix.shape[1]
+
+    def transform(self, texts):
+        """返回 CSR 矩阵，每行一条文本；不含词表中词项的文本为全零行。"""
+        return self.vectorizer.transform(['' if t is None else str(t) for t in texts])
+
+    def scores(self, queries):
+        """queries 为 transform 的结果；返回 (查询数 × 节点数) 的 CSR 余弦相似度矩阵，列顺序同 self.ids。
+
+        结果只含与查询有共同词项的节点，全程不展开为稠密矩阵。
+        """
+        return (queries @ self._by_term).tocsr()
+
+    def save(self, path: str = TFIDF_INDEX_FILE) -> None:
+        """写入临时文件后原子替换，读取方不会看到写了一半的索引。"""
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump({'vectorizer': self.vectorizer, 'ids': self.ids, 'matrix': self.matrix,
+                         'fingerprint': self.fingerprint}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = TFIDF_INDEX_FILE):
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        return cls(data['vectorizer'], data['ids'], data['matrix'], data.get('fingerprint', ''))
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_tfidf_index(path: str = TFIDF_INDEX_FILE):
+    """读取持久化的索引，按文件修改时间缓存（重建后自动重新加载）；文件不存在时返回 None。"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    index = TfidfIndex.load(path)
+    with _cache_lock:
+        _cache[path] = (stamp, index)
+    return index
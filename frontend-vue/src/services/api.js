@@ -84,6 +84,15 @@ export const personService = {
     url.searchParams.append('field', field)
     const response = await fetch(url)
     return await response.json()
+  },
+
+  // 姓名前缀补全（按关系数降序）
+  async autocomplete(prefix, limit = 10) {
+    const url = new URL(`${API_URL}/autocomplete`)
+    url.searchParams.append('prefix', prefix)
+    url.searchParams.append('limit', limit)
+    const response = await fetch(url)
+    return await response.json()
   }
 }
 
@@ -121,6 +130,17 @@ export const networkService = {
     const response = await fetch(url)
     if (!response.ok) throw new Error('查询失败')
     return await response.json()
+  },
+
+  // 批量查找路径：pairs 为 [[start, end], ...]
+  async findPaths(pairs) {
+    const response = await fetch(`${API_URL}/network/path/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ pairs })
+    })
+    if (!response.ok) throw new Error('查询失败')
+    return await response.json()
   }
 }
 